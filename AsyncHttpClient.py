@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import threading
+import weakref
+from collections import deque
+
+import aiohttp
+
+from worker_pool import on_thread_loop_close
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_clients = weakref.WeakSet()
+
+
+class _SharedSemaphore:
+    """
+    A semaphore for coroutines on different event loops (one per worker
+    thread), so a limit holds across the process; asyncio.Semaphore is bound
+    to a single loop. A release hands its slot straight to the oldest waiter.
+    """
+
+    def __init__(self, value):
+        self._lock = threading.Lock()
+        self._value = value
+        self._waiters = deque()
+
+    async def __aenter__(self):
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    queued = True
+                except ValueError:
+                    queued = False
+            if not queued and waiter.done() and not waiter.cancelled():
+                # Granted, then cancelled before it could run: pass the slot on
+                self._release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+                    return
+                except RuntimeError:  # its loop is closed
+                    continue
+            self._value += 1
+
+    def _grant(self, waiter):
+        if waiter.done():  # cancelled while the grant was in transit
+            self._release()
+        else:
+            waiter.set_result(None)
+
+
+class AsyncHttpClient:
+    def __init__(self, pool_size=100, pool_size_per_host=10, max_concurrency=50,
+                 connect_timeout=3.05, read_timeout=30, max_retries=3,
+                 backoff_factor=0.3, verify=False):
+        """
+        asyncio counterpart of HttpClient with the same get/post/request surface.
+        Connection pools are per event loop, i.e. per worker thread under
+        worker_pool.run_on_thread_loop, and are closed with the thread's loop;
+        callers running their own loops (asyncio.run) close() before it ends.
+        :param pool_size: Max open connections in each loop's pool.
+        :param pool_size_per_host: Max open connections to a single host, per pool.
+        :param max_concurrency: Max requests in flight at once across all loops
+            and threads; extra callers wait.
+        :param connect_timeout: Seconds to wait for a connection.
+        :param read_timeout: Seconds to wait for a response once connected.
+        :param max_retries: Retries for GET on connection errors and 429/5xx,
+            with exponential backoff. POST is never retried.
+        :param backoff_factor: Base delay for the exponential backoff.
+        :param verify: TLS verification for GET requests, off as in HttpClient.
+        """
+        self.default_headers = {
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'en-US,en;q=0.9',
+        }
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.verify = verify
+        # aiohttp sessions are bound to the event loop that created them, and
+        # agent turns run on one long-lived loop per worker thread
+        # (worker_pool.run_on_thread_loop), so keep one pool per loop.
+        self._per_loop = weakref.WeakKeyDictionary()
+        self._semaphore = _SharedSemaphore(max_concurrency)
+        _clients.add(self)
+
+    def _session(self):
+        loop = asyncio.get_running_loop()
+        session = self._per_loop.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size_per_host)
+            session = aiohttp.ClientSession(connector=connector, headers=self.default_headers,
+                                            timeout=self.timeout)
+            self._per_loop[loop] = session
+        return session
+
+    async def _send(self, method, url, retries, **kwargs):
+        session = self._session()
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        if response.status in RETRY_STATUSES and attempt < retries:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status)
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                if not retryable or attempt >= retries:
+                    raise
+                delay = self.backoff_factor * (2 ** attempt)
+                attempt += 1
+                logger.debug("%s %s failed (%s), retry %d in %.2fs", method, url, e, attempt, delay)
+                await asyncio.sleep(delay)
+
+    async def get(self, url, headers=None, timeout=None):
+        """
+        Perform a GET request.
+        :param url: The URL to send the GET request to.
+        :param headers: Optional headers to include in the request.
+        :param timeout: Optional aiohttp.ClientTimeout overriding the client default.
+        :return: JSON response.
+        """
+        logger.debug("GET %s headers=%s", url, headers)
+        return await self._send('GET', url, self.max_retries, headers=headers,
+                                ssl=None if self.verify else False, timeout=timeout or self.timeout)
+
+    async def post(self, url, data=None, headers=None, timeout=None):
+        """
+        Perform a POST request.
+        :param url: The URL to send the POST request to.
+        :param data: The data to include in the POST request.
+        :param headers: Optional headers to include in the request.
+        :param timeout: Optional aiohttp.ClientTimeout overriding the client default.
+        :return: JSON response.
+        """
+        logger.debug("POST %s headers=%s", url, headers)
+        return await self._send('POST', url, 0, json=data, headers=headers,
+                                timeout=timeout or self.timeout)
+
+    async def request(self, method, url, data=None, headers=None, timeout=None):
+        """
+        Perform a request based on the method (GET or POST).
+        :param method: The HTTP method ('GET' or 'POST').
+        :param url: The URL to send the request to.
+        :param data: The data to include in the request (for POST).
+        :param headers: Optional headers to include in the request.
+        :param timeout: Optional aiohttp.ClientTimeout overriding the client default.
+        :return: JSON response.
+        """
+        if method.upper() == 'GET':
+            return await self.get(url, headers=headers, timeout=timeout)
+        elif method.upper() == 'POST':
+            return await self.post(url, data=data, headers=headers, timeout=timeout)
+        else:
+            raise ValueError("Unsupported HTTP method: " + method)
+
+    async def close(self):
+        """Close the connection pool of the running event loop."""
+        session = self._per_loop.pop(asyncio.get_running_loop(), None)
+        if session:
+            await session.close()
+
+
+async def _close_loop_sessions():
+    for client in list(_clients):
+        await client.close()
+
+
+on_thread_loop_close(_close_loop_sessions)
+
+# Exportable for use in other files
+__all__ = ['AsyncHttpClient']
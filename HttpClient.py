@@ -1,55 +1,94 @@
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
 
 class HttpClient:
-    def __init__(self):
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_factor=0.3, verify=False):
+        """
+        HTTP client backed by one pooled, keep-alive requests.Session.
+        :param pool_size: Max connections kept alive per host.
+        :param connect_timeout: Seconds to wait for a connection.
+        :param read_timeout: Seconds to wait for a response once connected.
+        :param max_retries: Retries for idempotent requests (GET etc., never POST)
+            on connection errors and 429/5xx responses, with exponential backoff.
+        :param backoff_factor: Base delay for the exponential backoff.
+        :param verify: TLS verification for GET requests (internal hosts use
+            self-signed certificates, so it has always been off).
+        """
         self.default_headers = {
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en-US,en;q=0.9',
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.verify = verify
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # idempotent methods only
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.default_headers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
-    def get(self, url, headers=None):
+    def get(self, url, headers=None, timeout=None):
         """
         Perform a GET request.
         :param url: The URL to send the GET request to.
         :param headers: Optional headers to include in the request.
+        :param timeout: Optional (connect, read) timeout overriding the client default.
         :return: JSON response.
         """
-        merged_headers = {**self.default_headers, **(headers or {})}
-        print(f"GET Request Headers: {merged_headers}")  # Debugging line
-        response = requests.get(url, headers=merged_headers, verify=False)
+        logger.debug("GET %s headers=%s", url, headers)
+        response = self.session.get(url, headers=headers, verify=self.verify,
+                                    timeout=timeout or self.timeout)
         response.raise_for_status()
         return response.json()
 
-    def post(self, url, data=None, headers=None):
+    def post(self, url, data=None, headers=None, timeout=None):
         """
         Perform a POST request.
         :param url: The URL to send the POST request to.
         :param data: The data to include in the POST request.
         :param headers: Optional headers to include in the request.
+        :param timeout: Optional (connect, read) timeout overriding the client default.
         :return: JSON response.
         """
-        merged_headers = {**self.default_headers, **(headers or {})}
-        response = requests.post(url, json=data, headers=merged_headers)
+        logger.debug("POST %s headers=%s", url, headers)
+        response = self.session.post(url, json=data, headers=headers,
+                                     timeout=timeout or self.timeout)
         response.raise_for_status()
         return response.json()
 
-    def request(self, method, url, data=None, headers=None):
+    def request(self, method, url, data=None, headers=None, timeout=None):
         """
         Perform a request based on the method (GET or POST).
         :param method: The HTTP method ('GET' or 'POST').
         :param url: The URL to send the request to.
         :param data: The data to include in the request (for POST).
         :param headers: Optional headers to include in the request.
+        :param timeout: Optional (connect, read) timeout overriding the client default.
         :return: JSON response.
         """
-        merged_headers = {**self.default_headers, **(headers or {})}
         if method.upper() == 'GET':
-            return self.get(url, headers=merged_headers)
+            return self.get(url, headers=headers, timeout=timeout)
         elif method.upper() == 'POST':
-            return self.post(url, data=data, headers=merged_headers)
+            return self.post(url, data=data, headers=headers, timeout=timeout)
         else:
             raise ValueError("Unsupported HTTP method: " + method)
 
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
 # Exportable for use in other files
-__all__ = ['HttpClient']
\ No newline at end of file
+__all__ = ['HttpClient']
@@ -0,0 +1,15 @@
+import importlib
+
+# Resolved on first access so `import agent` does not load langchain.
+_EXPORTS = {
+    "ChatAgent": "agent.agent_base",
+    "AgentPool": "agent.session_pool",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
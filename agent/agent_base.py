@@ -1,48 +1,423 @@
-from langchain.agents import initialize_agent, AgentType, load_tools
-from langchain.memory import ConversationBufferMemory
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
 
-from archive.agent import add
-from tools import get_user_details
-from tools import ALL_TOOLS
-from config import GOOGLE_API_KEY
+from agent.instrumentation import TurnTrace, callback_handler, span
+from config import AGENT_MODE, AGENT_VERBOSE, MEMORY_MODE, MEMORY_MAX_TURNS, MEMORY_MAX_TOKENS
+from config import SEMANTIC_CACHE_CONTEXT_MESSAGES, TOOL_SELECTION_HISTORY_MESSAGES
+from worker_pool import run_on_thread_loop
+
+logger = logging.getLogger(__name__)
+
+# langchain, the Gemini client and the tools are imported where they are first
+# needed rather than here, so importing this module (and app_live) stays cheap.
+
+# Start of the answer string in the chat-conversational agent's JSON blob, e.g.
+# {"action": "Final Answer", "action_input": "...
+_FINAL_ANSWER_START = re.compile(r'"action"\s*:\s*"Final Answer"\s*,\s*"action_input"\s*:\s*"')
+_JSON_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+# "react": chat-conversational ReAct, one tool per LLM round-trip.
+# "tool_calling": native Gemini function calling, every tool call the model
+# asks for in a turn is dispatched concurrently.
+AGENT_MODES = ("react", "tool_calling")
+
+# Executors kept per agent for the tool subsets picked by a ToolSelector
+MAX_SUBSET_AGENTS = 8
+
+
+class _FinalAnswerExtractor:
+    """Incrementally decodes the Final Answer string from a streamed agent output."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None  # next undecoded index inside the answer string
+        self.done = False
+
+    def feed(self, text: str) -> str:
+        """Add a chunk of model output and return any newly available answer text."""
+        self.buffer += text
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = _FINAL_ANSWER_START.search(self.buffer)
+            if not match:
+                return ""
+            self.pos = match.end()
+
+        buf, i, out = self.buffer, self.pos, []
+        while i < len(buf):
+            char = buf[i]
+            if char == '"':
+                self.done = True
+                break
+            if char == '\\':
+                # Wait for the rest of an escape sequence split across chunks
+                if i + 1 >= len(buf):
+                    break
+                if buf[i + 1] == 'u':
+                    if i + 6 > len(buf):
+                        break
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                out.append(_JSON_ESCAPES.get(buf[i + 1], buf[i + 1]))
+                i += 2
+                continue
+            out.append(char)
+            i += 1
+        self.pos = i
+        return "".join(out)
+
+
+def _timed_convo_parser():
+    """The chat-conversational agent's parser, with a "parser" span around each parse."""
+    from langchain.agents.conversational_chat.output_parser import ConvoOutputParser
+
+    class TimedConvoOutputParser(ConvoOutputParser):
+        def parse(self, text: str):
+            with span("parser", parser="ConvoOutputParser"):
+                return super().parse(text)
+
+    return TimedConvoOutputParser()
 
 
 class ChatAgent:
-    def __init__(self, temperature: float = 0.3):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash", temperature=temperature
+    def __init__(self, temperature: float = 0.3, llm=None, tools=None, tool_names=None,
+                 memory_mode: str = MEMORY_MODE, memory_max_turns: int = MEMORY_MAX_TURNS,
+                 memory_max_tokens: int = MEMORY_MAX_TOKENS, agent_mode: str = AGENT_MODE,
+                 semantic_cache=None, verbose: bool = AGENT_VERBOSE, history=None, router=None,
+                 tool_selector=None, room=None):
+        from agent.memory import build_memory
+
+        if agent_mode not in AGENT_MODES:
+            raise ValueError(f"Unsupported agent mode: {agent_mode}. Expected one of {AGENT_MODES}")
+        self.agent_mode = agent_mode
+        self.verbose = verbose
+        self.last_trace = None  # TurnTrace of the most recent turn
+        # Optional SemanticCache, FastPathRouter and ToolSelector, usually shared by every agent in the process
+        self.semantic_cache = semantic_cache
+        self.router = router
+        self.tool_selector = tool_selector
+        # Room the agent serves; answers it got from tools are only cached for this room
+        self.room = room
+
+        # llm and tools can be passed in so several agents (e.g. one per room)
+        # share a single client and tool list; only the memory is per agent.
+        if llm is None:
+            from agent.llm_gateway import shared_llm
+
+            # One Gemini client per process, behind the rate-limiting gateway
+            llm = shared_llm(temperature)
+        self.llm = llm
+        # `tool_names` picks a subset of the registry (tools/registry.py) instead
+        self.tools = tools if tools is not None else self._load_tools(tool_names)
+        self._tools_by_name = {tool.name: tool for tool in self.tools}
+        # "summary" keeps recent turns verbatim and summarizes older ones;
+        # `history` (e.g. a PersistentChatMessageHistory) backs it with a store.
+        # Summaries are background work, queued behind interactive turns.
+        summary_llm = self.llm.with_lane("background") if hasattr(self.llm, "with_lane") else self.llm
+        self.memory = build_memory(
+            summary_llm, memory_mode, max_turns=memory_max_turns, max_tokens=memory_max_tokens,
+            chat_memory=history,
         )
-        self.tools = self._load_all_tools()
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history", return_messages=True
+        # (CompiledPrompt, AgentExecutor, prompt version the executor was built from)
+        self._agent = self._build_agent(self.tools)
+        # The same per tool subset picked by the tool selector, least recently used first
+        self._subset_agents = OrderedDict()
+
+    def _load_tools(self, tool_names=None):
+        from tools.registry import registry
+
+        # Arithmetic runs locally through the calculator tool instead of
+        # LangChain's llm-math, which spent an extra Gemini call per question.
+        return registry.load(tool_names)
+
+    def _build_agent(self, tools, context_cache: bool = True):
+        """
+        :param context_cache: False to never upload a Gemini context cache for this prompt.
+        :return: (CompiledPrompt, AgentExecutor, prompt version) for running with `tools`
+        """
+        from agent.prompts import compile_prompt
+
+        # Static prompt text is rendered once per process and shared by every
+        # agent with the same tools; see agent/prompts.py.
+        prompt = compile_prompt(self.agent_mode, tools, self.llm, context_cache=context_cache)
+        return prompt, self._build_executor(prompt, tools), prompt.version
+
+    def _build_executor(self, prompt, tools):
+        if self.agent_mode == "tool_calling":
+            return self._build_tool_calling_agent(prompt, tools)
+
+        from langchain.agents import AgentExecutor
+        from langchain.agents.conversational_chat.base import ConversationalChatAgent
+        from langchain.chains import LLMChain
+
+        agent = ConversationalChatAgent(
+            llm_chain=LLMChain(llm=self.llm, prompt=prompt.template, llm_kwargs=prompt.llm_kwargs),
+            allowed_tools=[tool.name for tool in tools],
+            output_parser=_timed_convo_parser(),
+        )
+        return AgentExecutor.from_agent_and_tools(
+            agent=agent, tools=tools, memory=self.memory, verbose=self.verbose,
         )
-        self.agent = self._build_agent()
-
-    def _load_all_tools(self):
-        # Load built-in tools
-        tool_names = ["llm-math"]  # Load tools that come with LangChain (e.g., math)
-        tools = load_tools(tool_names, llm=self.llm)
-
-        # Add custom tools
-        for tool in ALL_TOOLS:
-            tools.append(tool)
-        # self.llm.bind_tools(self.tools)
-        return tools   
-    
-
-    def _build_agent(self):
-        return initialize_agent(
-            tools=self.tools,
-            llm=self.llm,
-            agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
-            memory=self.memory,
-            verbose=True,
+
+    def _build_tool_calling_agent(self, prompt, tools):
+        from langchain.agents import AgentExecutor
+        from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+        from langchain.agents.output_parsers.tools import ToolsAgentOutputParser
+        from langchain_core.runnables import RunnablePassthrough
+
+        if prompt.context_cache:
+            # Tool schemas live in the context cache; Gemini rejects requests
+            # that also declare tools, so the model is not bound to them here.
+            llm = self.llm.bind(**prompt.llm_kwargs)
+        else:
+            from tools.registry import registry
+
+            # Schemas come from the registry's per-process cache; converting
+            # each tool again for every room's agent dominated binding time.
+            llm = self.llm.bind_tools(registry.schemas(tools))
+        # What create_tool_calling_agent builds, minus its per-call schema conversion
+        agent = (
+            RunnablePassthrough.assign(
+                agent_scratchpad=lambda x: format_to_tool_messages(x["intermediate_steps"])
+            )
+            | prompt.template
+            | llm
+            | ToolsAgentOutputParser()
         )
+        return AgentExecutor(agent=agent, tools=tools, memory=self.memory, verbose=self.verbose)
+
+    async def _agent_for(self, user_input: str):
+        """
+        The executor for this turn: with all tools, or only those the tool
+        selector ranks highest for the message and recent user messages.
+        """
+        tools = self.tools
+        if self.tool_selector is not None:
+            with span("tools.select"):
+                recent = [message.content for message in self.memory.chat_memory.messages
+                          if message.type == "human"][-TOOL_SELECTION_HISTORY_MESSAGES:] \
+                    if TOOL_SELECTION_HISTORY_MESSAGES else []
+                tools = self.tool_selector.select(self.tools, user_input, recent)
+        if len(tools) == len(self.tools):
+            self._agent = await self._refreshed(self._agent, self.tools)
+            return self._agent[1]
+        key = tuple(tool.name for tool in tools)
+        # Subsets send their prefix inline: a cache upload would be billed and
+        # waited for inside this turn, for a prompt few turns may reuse
+        entry = self._subset_agents.pop(key, None) or self._build_agent(tools, context_cache=False)
+        entry = self._subset_agents[key] = await self._refreshed(entry, tools)
+        while len(self._subset_agents) > MAX_SUBSET_AGENTS:
+            self._subset_agents.popitem(last=False)
+        return entry[1]
+
+    async def _refreshed(self, entry, tools):
+        """Keep the prompt's context cache alive; rebuild the executor if the cache was replaced."""
+        prompt, executor, version = entry
+        if prompt.refresh_due:
+            # A blocking Gemini API call, kept off the event loop
+            await asyncio.to_thread(prompt.refresh)
+        if prompt.version != version:
+            return prompt, self._build_executor(prompt, tools), prompt.version
+        return entry
+
+    def memory_metrics(self) -> dict:
+        """Prompt-token savings of the bounded memory; empty for the plain buffer."""
+        metrics = getattr(self.memory, "metrics", None)
+        return metrics() if metrics else {}
+
+    def _sync_history(self):
+        """Catch the memory up with turns another worker process stored for this room."""
+        sync = getattr(self.memory.chat_memory, "sync", None)
+        if sync is None:
+            return
+        with span("memory.sync"):
+            if sync() and hasattr(self.memory, "adopt_history"):
+                # The reloaded window and stored summary replace the summary memory's own
+                self.memory.adopt_history()
+
+    def _cache_lookup(self, user_input: str):
+        """
+        Check the semantic cache. On a hit the turn is still saved to memory.
+        :return: (context digest or None when caching is off, cached answer or None)
+        """
+        if self.semantic_cache is None:
+            return None, None
+        recent = self.memory.chat_memory.messages[-SEMANTIC_CACHE_CONTEXT_MESSAGES:] \
+            if SEMANTIC_CACHE_CONTEXT_MESSAGES else []
+        context = self.semantic_cache.context_digest(recent)
+        answer = self.semantic_cache.lookup(user_input, context, room=self.room)
+        if answer is not None:
+            self.memory.save_context({"input": user_input}, {"output": answer})
+        return context, answer
+
+    def _cache_store(self, user_input: str, context, output, trace: TurnTrace):
+        """Cache the turn's answer, if caching is on (`context` from _cache_lookup)."""
+        if context is not None and output is not None:
+            self.semantic_cache.store(user_input, context, output, trace.tools_used, room=self.room)
+
+    def _classify(self, user_input: str):
+        """Fast-path route for the input, or None to run the agent loop."""
+        if self.router is None:
+            return None
+        with span("router"):
+            route = self.router.classify(user_input)
+        if route.kind == "agent" or (route.kind == "tool" and route.tool not in self._tools_by_name):
+            self.router.record("agent")
+            return None
+        return route
+
+    def _finish_route(self, user_input: str, route, output=None):
+        """
+        Reply for a routed turn, saved to memory like any other turn.
+        :return: the reply, or None when the tool failed and the agent should take over
+        """
+        if route.kind == "tool":
+            if output is None or str(output).startswith("Error"):
+                self.router.record("agent")
+                return None
+            reply = route.format(output)
+        else:
+            reply = route.reply
+        self.router.record(route.kind, route.intent)
+        self.memory.save_context({"input": user_input}, {"output": reply})
+        return reply
+
+    async def _arun_routed_tool(self, route, run_config):
+        try:
+            return await self._tools_by_name[route.tool].ainvoke(route.tool_input, config=run_config)
+        except Exception:
+            logger.debug("Fast-path %s call failed, falling back to the agent", route.tool, exc_info=True)
+            return None
+
+    def _finish_trace(self, trace: TurnTrace):
+        self.last_trace = trace
+        logger.debug("Turn breakdown (ms): %s", trace.breakdown())
 
     def handle_input(self, user_input: str) -> str:
+        """
+        One turn, blocking: ahandle_input on the calling thread's event loop.
+        Raises RuntimeError on a thread already running an event loop; await
+        ahandle_input there instead.
+        """
+        return run_on_thread_loop(self.ahandle_input(user_input))
+
+    async def ahandle_input(self, user_input: str) -> str:
+        """
+        Run one turn on the caller's event loop and return the reply; a failed
+        turn returns an error message and sets `last_trace.error`. Tool
+        coroutines run on the loop, sync tools on the default thread pool.
+        """
+        trace = TurnTrace(agent_mode=self.agent_mode)
         try:
-            response = self.agent.invoke({"input": user_input})
-            return response["output"]
+            with trace.activate(), trace.span("turn"):
+                run_config = {"callbacks": [callback_handler(trace)]}
+                self._sync_history()
+                route = self._classify(user_input)
+                if route is not None:
+                    output = await self._arun_routed_tool(route, run_config) if route.kind == "tool" else None
+                    reply = self._finish_route(user_input, route, output)
+                    if reply is not None:
+                        return reply
+
+                context, cached = self._cache_lookup(user_input)
+                if cached is not None:
+                    return cached
+
+                agent = await self._agent_for(user_input)
+                response = await agent.ainvoke({"input": user_input}, config=run_config)
+
+                self._cache_store(user_input, context, response["output"], trace)
+                return response["output"]
         except Exception as e:
+            trace.error = str(e)
             return f"An error occurred while processing your input: {str(e)}"
+        finally:
+            self._finish_trace(trace)
+
+    async def astream_input(self, user_input: str):
+        """
+        Run one turn, yielding events as they happen instead of waiting for the
+        whole ReAct loop:
+
+        - {"type": "token", "text": ...} for each piece of the final answer
+        - {"type": "tool_start", "tool": ..., "input": ...} / {"type": "tool_end", "tool": ..., "output": ...}
+          for intermediate tool steps
+        - {"type": "final", "message": ...} once, last, with the complete answer
+        """
+        trace = TurnTrace(agent_mode=self.agent_mode, streaming=True)
+        start_ns = time.time_ns()
+        try:
+            # Stays active while the caller handles each event, so its emits are traced too
+            with trace.activate():
+                async for event in self._astream_turn(user_input, trace):
+                    yield event
+        finally:
+            trace.add("turn", start_ns, time.time_ns())
+            self._finish_trace(trace)
+
+    async def _astream_turn(self, user_input: str, trace: TurnTrace):
+        extractors = {}  # one per LLM run
+        tool_runs = set()
+        output = None
+        try:
+            run_config = {"callbacks": [callback_handler(trace)]}
+            self._sync_history()
+            route = self._classify(user_input)
+            if route is not None:
+                output = None
+                if route.kind == "tool":
+                    yield {"type": "tool_start", "tool": route.tool, "input": str(route.tool_input)}
+                    output = await self._arun_routed_tool(route, run_config)
+                    yield {"type": "tool_end", "tool": route.tool, "output": str(output)}
+                reply = self._finish_route(user_input, route, output)
+                if reply is not None:
+                    yield {"type": "final", "message": reply}
+                    return
+
+            context, cached = self._cache_lookup(user_input)
+            if cached is not None:
+                yield {"type": "final", "message": cached}
+                return
+
+            agent = await self._agent_for(user_input)
+            async for event in agent.astream_events({"input": user_input}, version="v2", config=run_config):
+                kind = event["event"]
+                if kind == "on_tool_start":
+                    tool_runs.add(event["run_id"])
+                elif kind == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    # Skip LLM calls made inside tools (e.g. llm-math)
+                    if not isinstance(content, str) or tool_runs.intersection(event["parent_ids"]):
+                        continue
+                    if self.agent_mode == "tool_calling":
+                        text = content  # plain text; tool-call steps carry no content
+                    else:
+                        extractor = extractors.setdefault(event["run_id"], _FinalAnswerExtractor())
+                        text = extractor.feed(content)
+                    if text:
+                        yield {"type": "token", "text": text}
+                elif kind == "on_chain_stream" and not event["parent_ids"]:
+                    # The executor's own stream: planned actions, finished steps, the output
+                    chunk = event["data"]["chunk"]
+                    for action in chunk.get("actions", []):
+                        yield {"type": "tool_start", "tool": action.tool,
+                               "input": str(action.tool_input)}
+                    for step in chunk.get("steps", []):
+                        yield {"type": "tool_end", "tool": step.action.tool,
+                               "output": str(step.observation)}
+                    if "output" in chunk:
+                        output = chunk["output"]
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    # A turn that finishes without any tool step streams no output chunk
+                    output = event["data"]["output"]["output"]
+
+            self._cache_store(user_input, context, output, trace)
+        except Exception as e:
+            trace.error = str(e)
+            output = f"An error occurred while processing your input: {str(e)}"
+        yield {"type": "final", "message": output}
@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+# langchain_core is imported inside the (de)serializers: the store is opened
+# when app_live starts, which must not pull in langchain (see benchmarks/startup_importtime.py)
+
+from config import HISTORY_BACKEND, HISTORY_DB_PATH, HISTORY_POSTGRES_URL
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+
+class HistoryStore(ABC):
+    """
+    Append-only, per-room message log.
+
+    Rows are (room, seq) -> message, with seq increasing per room, so the most
+    recent page of a conversation is an index range scan rather than a replay
+    of the whole transcript.
+    """
+
+    @abstractmethod
+    def append(self, room: str, messages: Sequence["BaseMessage"]) -> List[int]:
+        """Append messages to a room's log and return their sequence numbers."""
+
+    @abstractmethod
+    def load_page(self, room: str, limit: int, before_seq: Optional[int] = None,
+                  after_seq: Optional[int] = None) -> List[dict]:
+        """
+        Return the newest `limit` messages with `after_seq < seq < before_seq`
+        (either bound may be None), oldest first, as {"seq": ..., "message": BaseMessage}.
+        """
+
+    @abstractmethod
+    def save_summary(self, room: str, summary: str, through_seq: int) -> None:
+        """
+        Store the running summary of a room's messages up to and including
+        `through_seq`, unless a summary reaching further is stored already.
+        """
+
+    @abstractmethod
+    def load_summary(self, room: str) -> Tuple[str, int]:
+        """Return the room's stored summary and the seq it reaches, or ("", 0)."""
+
+    def close(self):
+        pass
+
+
+class SQLiteHistoryStore(HistoryStore):
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets other worker processes read while one appends
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_messages ("
+            "room TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (room, seq)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_summaries ("
+            "room TEXT PRIMARY KEY, summary TEXT NOT NULL, through_seq INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def append(self, room, messages):
+        if not messages:
+            return []
+        rows = [_dump(m) for m in messages]
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so concurrent processes
+            # cannot hand out the same seq
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (last,) = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM chat_messages WHERE room = ?", (room,)
+                ).fetchone()
+                seqs = list(range(last + 1, last + 1 + len(rows)))
+                self._conn.executemany(
+                    "INSERT INTO chat_messages (room, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                    [(room, seq, row, now) for seq, row in zip(seqs, rows)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seqs
+
+    def load_page(self, room, limit, before_seq=None, after_seq=None):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, message FROM chat_messages WHERE room = ? AND seq > ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (room, after_seq or 0, before_seq if before_seq is not None else 2 ** 62, limit),
+            ).fetchall()
+        return _to_page(reversed(rows), json.loads)
+
+    def save_summary(self, room, summary, through_seq):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO chat_summaries (room, summary, through_seq, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (room) DO UPDATE SET summary = excluded.summary, "
+                "through_seq = excluded.through_seq, updated_at = excluded.updated_at "
+                "WHERE excluded.through_seq > chat_summaries.through_seq",
+                (room, summary, through_seq, time.time()),
+            )
+
+    def load_summary(self, room):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, through_seq FROM chat_summaries WHERE room = ?", (room,)
+            ).fetchone()
+        return tuple(row) if row else ("", 0)
+
+    def close(self):
+        self._conn.close()
+
+
+class PostgresHistoryStore(HistoryStore):
+    """
+    Postgres log in the table layout of langchain-postgres'
+    PostgresChatMessageHistory (its SERIAL id is the sequence number), plus a
+    (session_id, id) index for paginated reads. Room ids map to UUIDv5
+    session ids because that table requires UUIDs.
+    """
+
+    def __init__(self, url: str = HISTORY_POSTGRES_URL, table_name: str = "chat_messages"):
+        import psycopg
+        from langchain_postgres import PostgresChatMessageHistory
+
+        self.table_name = table_name
+        self._conn = psycopg.connect(url, autocommit=True)
+        PostgresChatMessageHistory.create_tables(self._conn, table_name)
+        self._conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_session_id_id" '
+            f'ON "{table_name}" (session_id, id)'
+        )
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table_name}_summaries" ('
+            "session_id UUID PRIMARY KEY, summary TEXT NOT NULL, through_id BIGINT NOT NULL, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _session_id(room: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"room:{room}"))
+
+    def append(self, room, messages):
+        session_id = self._session_id(room)
+        seqs = []
+        with self._lock, self._conn.transaction():
+            for message in messages:
+                (seq,) = self._conn.execute(
+                    f'INSERT INTO "{self.table_name}" (session_id, message) VALUES (%s, %s) RETURNING id',
+                    (session_id, _dump(message)),
+                ).fetchone()
+                seqs.append(seq)
+        return seqs
+
+    def load_page(self, room, limit, before_seq=None, after_seq=None):
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id, message FROM "{self.table_name}" WHERE session_id = %s AND id > %s AND id < %s '
+                "ORDER BY id DESC LIMIT %s",
+                (self._session_id(room), after_seq or 0, before_seq if before_seq is not None else 2 ** 62,
+                 limit),
+            ).fetchall()
+        return _to_page(reversed(rows), lambda value: value)  # JSONB arrives decoded
+
+    def save_summary(self, room, summary, through_seq):
+        table = f"{self.table_name}_summaries"
+        with self._lock:
+            self._conn.execute(
+                f'INSERT INTO "{table}" (session_id, summary, through_id) VALUES (%s, %s, %s) '
+                "ON CONFLICT (session_id) DO UPDATE SET summary = EXCLUDED.summary, "
+                "through_id = EXCLUDED.through_id, updated_at = now() "
+                f'WHERE EXCLUDED.through_id > "{table}".through_id',
+                (self._session_id(room), summary, through_seq),
+            )
+
+    def load_summary(self, room):
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT summary, through_id FROM "{self.table_name}_summaries" WHERE session_id = %s',
+                (self._session_id(room),),
+            ).fetchone()
+        return tuple(row) if row else ("", 0)
+
+    def close(self):
+        self._conn.close()
+
+
+def _dump(message) -> str:
+    from langchain_core.messages import message_to_dict
+
+    return json.dumps(message_to_dict(message))
+
+
+def _to_page(rows, decode) -> List[dict]:
+    from langchain_core.messages import messages_from_dict
+
+    rows = list(rows)
+    messages = messages_from_dict([decode(message) for _, message in rows])
+    return [{"seq": seq, "message": message} for (seq, _), message in zip(rows, messages)]
+
+
+def build_history_store(backend: str = HISTORY_BACKEND) -> Optional[HistoryStore]:
+    """Create the configured store: "sqlite" (default), "postgres" or "none"."""
+    if backend == "sqlite":
+        return SQLiteHistoryStore(HISTORY_DB_PATH)
+    if backend == "postgres":
+        return PostgresHistoryStore(HISTORY_POSTGRES_URL)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unsupported history backend: {backend}")
+
+
+__all__ = ['HistoryStore', 'SQLiteHistoryStore', 'PostgresHistoryStore', 'build_history_store']
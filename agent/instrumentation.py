@@ -0,0 +1,270 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# OpenTelemetry is optional: spans go to whatever SDK/exporter the process
+# configured, and are no-ops with only the API installed.
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("agent_turn_trace", default=None)
+
+
+class Metrics:
+    """
+    Process-wide span latency histograms and token counters, rendered for
+    Prometheus, plus the stats() of components registered with `register_stats`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # span name -> [bucket counts..., count, sum]
+        self._tokens = defaultdict(int)  # "input" / "output" -> total
+        self._routes = defaultdict(int)  # router route ("canned" / "tool" / "agent") -> turns
+        self._tool_tokens = defaultdict(int)  # "offered" (all tools) / "sent" (selected tools) -> total
+        self._collectors = {}  # metric name -> (help text, stats callable, label name or None)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            hist = self._histograms.setdefault(name, [0] * len(LATENCY_BUCKETS) + [0, 0.0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += seconds
+
+    def add_tokens(self, kind: str, count: int):
+        with self._lock:
+            self._tokens[kind] += count
+
+    def add_route(self, route: str):
+        with self._lock:
+            self._routes[route] += 1
+
+    def add_tool_tokens(self, kind: str, count: int):
+        with self._lock:
+            self._tool_tokens[kind] += count
+
+    def register_stats(self, name: str, description: str, collect, label: Optional[str] = None):
+        """
+        Export a component's stats on every render, as the gauge `agent_<name>`
+        with one sample per numeric stat: agent_<name>{stat="hits"}. With
+        `label`, `collect` returns {label value: stats} instead, e.g. one dict
+        per tool. Registering a name again replaces it.
+        """
+        with self._lock:
+            self._collectors[name] = (description, collect, label)
+
+    def _render_collected(self, collectors) -> list:
+        lines = []
+        for name, (description, collect, label) in sorted(collectors.items()):
+            try:
+                stats = collect()
+            except Exception:
+                logger.warning("Collecting %s metrics failed", name, exc_info=True)
+                continue
+            lines += [f"# HELP agent_{name} {description}", f"# TYPE agent_{name} gauge"]
+            for value_label, group in sorted(stats.items()) if label else [(None, stats)]:
+                prefix = f'{label}="{value_label}",' if label else ""
+                for stat, value in sorted(group.items()):
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        lines.append(f'agent_{name}{{{prefix}stat="{stat}"}} {value}')
+        return lines
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            collectors = dict(self._collectors)
+            lines = [
+                "# HELP agent_span_duration_seconds Time spent per agent turn stage.",
+                "# TYPE agent_span_duration_seconds histogram",
+            ]
+            for name, hist in sorted(self._histograms.items()):
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    lines.append(f'agent_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {hist[i]}')
+                lines.append(f'agent_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist[-2]}')
+                lines.append(f'agent_span_duration_seconds_count{{span="{name}"}} {hist[-2]}')
+                lines.append(f'agent_span_duration_seconds_sum{{span="{name}"}} {hist[-1]:.6f}')
+            lines += [
+                "# HELP agent_llm_tokens_total Tokens reported by the LLM.",
+                "# TYPE agent_llm_tokens_total counter",
+            ]
+            for kind, count in sorted(self._tokens.items()):
+                lines.append(f'agent_llm_tokens_total{{kind="{kind}"}} {count}')
+            lines += [
+                "# HELP agent_turn_routes_total Turns by fast-path router outcome.",
+                "# TYPE agent_turn_routes_total counter",
+            ]
+            for route, count in sorted(self._routes.items()):
+                lines.append(f'agent_turn_routes_total{{route="{route}"}} {count}')
+            lines += [
+                "# HELP agent_tool_prompt_tokens_total Estimated prompt tokens of tool descriptions, "
+                "for all of an agent's tools (offered) and the per-turn selection (sent).",
+                "# TYPE agent_tool_prompt_tokens_total counter",
+            ]
+            for kind, count in sorted(self._tool_tokens.items()):
+                lines.append(f'agent_tool_prompt_tokens_total{{kind="{kind}"}} {count}')
+        # Outside the lock: collectors take their components' own locks
+        lines += self._render_collected(collectors)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class TurnTrace:
+    """
+    Spans recorded during one agent turn: "turn", "llm", "tool", "parser",
+    "memory.sync", "memory.load", "memory.save" and "socketio.emit". Every span is also fed
+    to METRICS and, when available, exported as an OpenTelemetry span.
+    """
+
+    def __init__(self, **attributes):
+        self.attributes = attributes
+        self.spans = []
+        self.tools_used = set()
+        self.error = None  # message of the exception that failed the turn
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start_ns: int, end_ns: int, **attributes):
+        span = {"name": name, "start_ns": start_ns, "end_ns": end_ns,
+                "duration_ms": (end_ns - start_ns) / 1e6, "attributes": attributes}
+        with self._lock:
+            self.spans.append(span)
+        METRICS.observe(name, (end_ns - start_ns) / 1e9)
+        if otel_trace is not None:
+            otel_span = otel_trace.get_tracer("agent").start_span(
+                name, start_time=start_ns, attributes={**self.attributes, **attributes})
+            otel_span.end(end_time=end_ns)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        start = time.time_ns()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.time_ns(), **attributes)
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that memory and emit spans are recorded into."""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def breakdown(self) -> dict:
+        """Total milliseconds per span name."""
+        totals = defaultdict(float)
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] += span["duration_ms"]
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block into the active turn trace, or straight into METRICS if there is none."""
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace.span(name, **attributes):
+            yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(name, time.perf_counter() - start)
+
+
+_handler_cls = None
+
+
+def callback_handler(trace: TurnTrace):
+    """
+    LangChain callback handler recording LLM (with token counts), tool and
+    output-parser spans into `trace`. Built on first use so importing this
+    module does not load langchain.
+    """
+    global _handler_cls
+    if _handler_cls is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class TraceCallbackHandler(BaseCallbackHandler):
+            run_inline = True
+
+            def __init__(self, trace):
+                self.trace = trace
+                self._starts = {}  # run_id -> (span name, start_ns, attributes)
+
+            def _start(self, run_id, name, **attributes):
+                self._starts[run_id] = (name, time.time_ns(), attributes)
+
+            def _end(self, run_id, **attributes):
+                started = self._starts.pop(run_id, None)
+                if started:
+                    name, start_ns, attrs = started
+                    self.trace.add(name, start_ns, time.time_ns(), **attrs, **attributes)
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                self._start(run_id, "llm")
+
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                self._start(run_id, "llm")
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                input_tokens = output_tokens = 0
+                for generations in response.generations:
+                    for generation in generations:
+                        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                        input_tokens += usage.get("input_tokens", 0)
+                        output_tokens += usage.get("output_tokens", 0)
+                METRICS.add_tokens("input", input_tokens)
+                METRICS.add_tokens("output", output_tokens)
+                self._end(run_id, input_tokens=input_tokens, output_tokens=output_tokens)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self._end(run_id, error=type(error).__name__)
+
+            def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+                tool = (serialized or {}).get("name") or kwargs.get("name")
+                self.trace.tools_used.add(tool)
+                self._start(run_id, "tool", tool=tool)
+
+            def on_tool_end(self, output, *, run_id, **kwargs):
+                self._end(run_id)
+
+            def on_tool_error(self, error, *, run_id, **kwargs):
+                self._end(run_id, error=type(error).__name__)
+
+            def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+                name = kwargs.get("name") or (serialized or {}).get("name") or ""
+                if "OutputParser" in name:
+                    self._start(run_id, "parser", parser=name)
+
+            def on_chain_end(self, outputs, *, run_id, **kwargs):
+                self._end(run_id)
+
+            def on_chain_error(self, error, *, run_id, **kwargs):
+                self._end(run_id, error=type(error).__name__)
+
+        _handler_cls = TraceCallbackHandler
+    return _handler_cls(trace)
+
+
+__all__ = ['TurnTrace', 'METRICS', 'callback_handler', 'current_trace', 'span']
@@ -0,0 +1,461 @@
+"""
+Process-wide gateway in front of the Gemini chat model.
+
+Every agent in the process shares one ChatGoogleGenerativeAI client (so one
+connection pool) behind one LLMGateway, so Gemini quotas are enforced in a
+single place instead of by each room on its own:
+
+- token buckets for requests per minute and tokens per minute (LLM_RPM /
+  LLM_TPM); a call is admitted once both have room
+- priority lanes: waiting interactive turns are admitted before background
+  work such as conversation summarization
+- a 429 pauses the whole gateway for a jittered, exponentially growing
+  delay before the call is retried, so a burst backs off together instead
+  of every caller hammering the quota with its own retries; the Gemini
+  client's built-in retry is off inside gateway calls, so every 429 reaches
+  this backoff
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from pydantic import Field
+
+import config
+from agent.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Lower is admitted first
+LANES = {"interactive": 0, "background": 1}
+
+# Output tokens charged up front for a call; corrected from usage_metadata afterwards
+OUTPUT_TOKENS_ESTIMATE = 256
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for quota errors: google.api_core ResourceExhausted or any HTTP 429."""
+    return getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429
+
+
+def estimate_call_tokens(messages) -> int:
+    """Input (~4 characters per token) plus the expected output."""
+    return sum(len(str(message.content)) for message in messages) // 4 + OUTPUT_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute / 60` units per second up to `burst_seconds` worth.
+    Not thread-safe; LLMGateway holds its lock around every use.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken; requests above capacity need a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return max(needed - self.level, 0.0) / self.rate
+
+    def take(self, amount: float):
+        # May go negative for oversized requests; later callers wait off the debt
+        self.level -= amount
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMGateway:
+    """
+    Admission control for LLM calls shared by every agent in the process.
+
+    :param rpm: Requests per minute; 0 disables the limit.
+    :param tpm: Tokens per minute (input + output); 0 disables the limit.
+    :param burst_seconds: How many seconds of quota may be spent at once.
+    :param max_retries: Retries of a call after a 429.
+    :param retry_base_delay: First backoff in seconds; doubles per retry, with full jitter.
+    :param retry_max_delay: Cap on a single backoff.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, burst_seconds: float = 5.0, max_retries: int = 5,
+                 retry_base_delay: float = 1.0, retry_max_delay: float = 30.0):
+        self.requests = TokenBucket(rpm, burst_seconds) if rpm else None
+        self.tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (lane priority, arrival) tickets
+        self._async_waiters = []  # (loop, future) of aacquire callers, woken by _notify_all
+        self._arrivals = itertools.count()
+        self._paused_until = 0.0
+        self._admitted = {lane: 0 for lane in LANES}
+        self._waited = {lane: 0.0 for lane in LANES}
+        self._rate_limited = 0
+        self._retries = 0
+
+    def _delay(self, tokens: int, now: float) -> float:
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def _next_wait(self, ticket, tokens: int) -> Optional[float]:
+        """
+        Under the lock: seconds `ticket` must still wait (None: until another
+        waiter is admitted), or 0 once it can be admitted.
+        """
+        if self._waiting[0] != ticket:
+            return None
+        return max(self._delay(tokens, time.monotonic()), 0.0)
+
+    def _admit(self, lane: str, tokens: int, start: float) -> float:
+        """Under the lock: admit the head ticket. :return: seconds it waited"""
+        heapq.heappop(self._waiting)
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        waited = time.monotonic() - start
+        self._admitted[lane] += 1
+        self._waited[lane] += waited
+        self._notify_all()
+        return waited
+
+    def _leave(self, ticket):
+        """Under the lock: drop a ticket whose caller gave up (cancelled, interrupted)."""
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._notify_all()
+
+    def _notify_all(self):
+        """Under the lock: wake every waiter, blocking or async, to recheck its turn."""
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, wakeup)
+            except RuntimeError:  # its loop has closed
+                pass
+
+    def acquire(self, lane: str = "interactive", tokens: int = 0) -> float:
+        """
+        Block until the call is admitted: it is the highest-priority, longest
+        waiting ticket and both buckets have room.
+        :return: seconds spent waiting
+        """
+        ticket = (LANES[lane], next(self._arrivals))
+        start = time.monotonic()
+        with span("llm.queue", lane=lane), self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    timeout = self._next_wait(ticket, tokens)
+                    if timeout == 0:
+                        return self._admit(lane, tokens, start)
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._leave(ticket)
+                raise
+
+    async def aacquire(self, lane: str = "interactive", tokens: int = 0) -> float:
+        """
+        `acquire` without blocking the event loop or holding a thread: the
+        caller waits on a future that admissions and pauses wake up.
+        """
+        loop = asyncio.get_running_loop()
+        ticket = (LANES[lane], next(self._arrivals))
+        start = time.monotonic()
+        with span("llm.queue", lane=lane):
+            with self._cond:
+                heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    with self._cond:
+                        timeout = self._next_wait(ticket, tokens)
+                        if timeout == 0:
+                            return self._admit(lane, tokens, start)
+                        # Registered under the lock, so a wake-up between here and the await is not lost
+                        wakeup = loop.create_future()
+                        self._async_waiters.append((loop, wakeup))
+                    try:
+                        await asyncio.wait_for(wakeup, timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                with self._cond:
+                    self._leave(ticket)
+                raise
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the real usage of a call is known."""
+        if self.tokens is None or actual is None:
+            return
+        with self._cond:
+            self.tokens.give(estimated - actual)
+
+    def handle_error(self, error: Exception, attempt: int):
+        """
+        After a failed attempt: on a 429, pause every caller for a jittered,
+        exponentially growing delay so the call can be retried. Re-raises
+        any other error, and the 429 of the last attempt.
+        """
+        if not is_rate_limited(error):
+            raise error
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        with self._cond:
+            self._rate_limited += 1
+            if attempt >= self.max_retries:
+                raise error
+            self._retries += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._notify_all()
+        logger.warning("LLM rate limited (attempt %d), pausing the gateway for %.2fs", attempt + 1, delay)
+
+    def call(self, fn, lane: str = "interactive", tokens: int = 0):
+        """Run `fn()` once admitted, retrying after 429s."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(lane, tokens)
+            try:
+                return fn()
+            except Exception as e:
+                self.handle_error(e, attempt)
+
+    async def acall(self, fn, lane: str = "interactive", tokens: int = 0):
+        """Async `call`: `fn()` returns an awaitable."""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(lane, tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                self.handle_error(e, attempt)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "admitted": dict(self._admitted),
+                "mean_wait_s": {
+                    lane: self._waited[lane] / count if count else 0.0
+                    for lane, count in self._admitted.items()
+                },
+                "waiting": len(self._waiting),
+                "rate_limited": self._rate_limited,
+                "retries": self._retries,
+            }
+
+
+# Set while GatewayChatModel calls its inner model. The gateway retries 429s
+# itself, so the Gemini client's own retry (see _disable_client_retries) is
+# off for those calls.
+_gateway_call = contextvars.ContextVar("gateway_call", default=False)
+
+
+@contextlib.contextmanager
+def _gateway_retries():
+    token = _gateway_call.set(True)
+    try:
+        yield
+    finally:
+        _gateway_call.reset(token)
+
+
+def _disable_client_retries():
+    """
+    langchain_google_genai wraps every request in its own tenacity retry:
+    two attempts, at least a second apart, on any GoogleAPIError including
+    429, with no setting to turn it off. Under the gateway that doubles the
+    calls against a spent quota and hides the 429 from the backoff shared by
+    every caller, so inside gateway calls the retry is one attempt. Calls
+    made outside a gateway keep the library's behaviour.
+    """
+    from langchain_google_genai import chat_models
+    from tenacity import retry, stop_after_attempt
+
+    create = chat_models._create_retry_decorator
+    if getattr(create, "gateway_aware", False):
+        return
+
+    def create_retry_decorator():
+        if _gateway_call.get():
+            return retry(reraise=True, stop=stop_after_attempt(1))
+        return create()
+
+    create_retry_decorator.gateway_aware = True
+    chat_models._create_retry_decorator = create_retry_decorator
+
+
+def _usage_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    Chat model that sends every call of `inner` through an LLMGateway.
+
+    Streams are admitted once and retried after a 429 only if nothing has
+    been yielded yet. `with_lane("background")` gives a view of the same
+    model in the low-priority lane.
+    """
+
+    inner: BaseChatModel
+    gateway: Any = Field(exclude=True)
+    lane: str = "interactive"
+
+    @property
+    def _llm_type(self) -> str:
+        return f"gateway-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"inner": self.inner._identifying_params, "lane": self.lane}
+
+    def with_lane(self, lane: str) -> "GatewayChatModel":
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}. Expected one of {tuple(LANES)}")
+        return self.model_copy(update={"lane": lane})
+
+    def bind_tools(self, tools, **kwargs):
+        # Format the tools the way the wrapped model expects, then pass them
+        # through this model's own calls
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages: List, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = estimate_call_tokens(messages)
+
+        def attempt():
+            with _gateway_retries():
+                return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        result = self.gateway.call(attempt, self.lane, tokens)
+        self.gateway.settle(tokens, _usage_tokens(result.generations[0].message))
+        return result
+
+    async def _agenerate(self, messages: List, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = estimate_call_tokens(messages)
+
+        async def attempt():
+            with _gateway_retries():
+                return await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        result = await self.gateway.acall(attempt, self.lane, tokens)
+        self.gateway.settle(tokens, _usage_tokens(result.generations[0].message))
+        return result
+
+    def _stream(self, messages: List, stop=None, run_manager=None, **kwargs):
+        tokens = estimate_call_tokens(messages)
+        for attempt in range(self.gateway.max_retries + 1):
+            self.gateway.acquire(self.lane, tokens)
+            usage, started = None, False
+            try:
+                chunks = self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+                while True:
+                    # Only around the inner model's own code, not across our yields
+                    with _gateway_retries():
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    started = True
+                    usage = _usage_tokens(chunk.message) or usage
+                    yield chunk
+                self.gateway.settle(tokens, usage)
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self.gateway.handle_error(e, attempt)
+
+    async def _astream(self, messages: List, stop=None, run_manager=None, **kwargs):
+        tokens = estimate_call_tokens(messages)
+        for attempt in range(self.gateway.max_retries + 1):
+            await self.gateway.aacquire(self.lane, tokens)
+            usage, started = None, False
+            try:
+                chunks = self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+                while True:
+                    with _gateway_retries():
+                        chunk = await anext(chunks, None)
+                    if chunk is None:
+                        break
+                    started = True
+                    usage = _usage_tokens(chunk.message) or usage
+                    yield chunk
+                self.gateway.settle(tokens, usage)
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self.gateway.handle_error(e, attempt)
+
+
+_gateway = None
+_shared_llms = {}
+_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """The process-wide gateway, configured from LLM_RPM / LLM_TPM and friends."""
+    global _gateway
+    with _lock:
+        if _gateway is None:
+            _gateway = LLMGateway(
+                rpm=config.LLM_RPM,
+                tpm=config.LLM_TPM,
+                burst_seconds=config.LLM_BURST_SECONDS,
+                max_retries=config.LLM_MAX_RETRIES,
+                retry_base_delay=config.LLM_RETRY_BASE_DELAY,
+            )
+        return _gateway
+
+
+def shared_llm(temperature: float = 0.3) -> GatewayChatModel:
+    """
+    The process-wide Gemini model for `temperature`: one client (and gRPC
+    connection pool) shared by every agent, behind the shared gateway.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    gateway = get_gateway()
+    with _lock:
+        llm = _shared_llms.get(temperature)
+        if llm is None:
+            config.require_google_api_key()
+            _disable_client_retries()
+            inner = ChatGoogleGenerativeAI(model=config.GEMINI_MODEL, temperature=temperature)
+            llm = _shared_llms[temperature] = GatewayChatModel(inner=inner, gateway=gateway)
+        return llm
+
+
+__all__ = [
+    "GatewayChatModel",
+    "LANES",
+    "LLMGateway",
+    "TokenBucket",
+    "get_gateway",
+    "is_rate_limited",
+    "shared_llm",
+]
@@ -0,0 +1,251 @@
+from typing import Any, Dict, List, Sequence
+
+from langchain.memory import ConversationBufferMemory, ConversationSummaryBufferMemory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, get_buffer_string
+
+from agent.instrumentation import span
+
+MEMORY_MODES = ("buffer", "summary")
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """
+    Cheap local token estimate (~4 characters per token).
+    Gemini's own counter is a network call, far too slow to run on every prune.
+    """
+    return len(get_buffer_string(messages)) // 4
+
+
+class _TimedMemory:
+    """Records memory.load / memory.save spans into the active turn trace."""
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with span("memory.load"):
+            return super().load_memory_variables(inputs)
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with span("memory.load"):
+            return await super().aload_memory_variables(inputs)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with span("memory.save"):
+            super().save_context(inputs, outputs)
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with span("memory.save"):
+            await super().asave_context(inputs, outputs)
+
+
+class BufferMemory(_TimedMemory, ConversationBufferMemory):
+    """The unbounded buffer, with memory spans."""
+
+
+class SummaryWindowMemory(_TimedMemory, ConversationSummaryBufferMemory):
+    """
+    Keeps the last `max_turns` turns verbatim, within `max_token_limit` tokens,
+    and folds anything older into a rolling summary.
+
+    The summary is updated incrementally: only the turns being dropped are sent
+    to the LLM along with the previous summary, never the whole transcript.
+    Per-turn metrics compare the tokens loaded into the prompt against what an
+    unbounded buffer would have sent.
+    """
+
+    max_turns: int = 6
+    kept_messages: int = 0  # buffer length after the last prune
+    full_history_tokens: int = 0  # tokens an unbounded buffer would replay
+    last_prompt_tokens: int = 0
+    last_tokens_saved: int = 0
+    total_tokens_saved: int = 0
+    turns: int = 0
+
+    def _record_load(self, messages: List[BaseMessage]):
+        prompt_tokens = estimate_tokens(messages)
+        self.last_prompt_tokens = prompt_tokens
+        self.last_tokens_saved = max(self.full_history_tokens - prompt_tokens, 0)
+        self.total_tokens_saved += self.last_tokens_saved
+        self.turns += 1
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        variables = super().load_memory_variables(inputs)
+        self._record_load(self._as_messages(variables[self.memory_key]))
+        return variables
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        variables = await super().aload_memory_variables(inputs)
+        self._record_load(self._as_messages(variables[self.memory_key]))
+        return variables
+
+    def _as_messages(self, buffer) -> List[BaseMessage]:
+        if isinstance(buffer, str):
+            return [self.summary_message_cls(content=buffer)]
+        return buffer
+
+    def _pop_overflow(self) -> List[BaseMessage]:
+        buffer = self.chat_memory.messages
+        pruned = []
+        while buffer and (len(buffer) > 2 * self.max_turns
+                          or estimate_tokens(buffer) > self.max_token_limit):
+            pruned.append(buffer.pop(0))
+        return pruned
+
+    def _pop_new_overflow(self) -> List[BaseMessage]:
+        # save_context prunes after every turn, so anything past kept_messages is new
+        self.full_history_tokens += estimate_tokens(self.chat_memory.messages[self.kept_messages:])
+        pruned = self._pop_overflow()
+        self.kept_messages = len(self.chat_memory.messages)
+        return pruned
+
+    def _save_summary(self):
+        # Persisted with the history, so a reloaded window starts after the summarized messages
+        save_summary = getattr(self.chat_memory, "save_summary", None)
+        if save_summary is not None:
+            save_summary(self.moving_summary_buffer)
+
+    def prune(self) -> None:
+        pruned = self._pop_new_overflow()
+        if pruned:
+            self.moving_summary_buffer = self.predict_new_summary(
+                pruned, self.moving_summary_buffer
+            )
+            self._save_summary()
+
+    async def aprune(self) -> None:
+        pruned = self._pop_new_overflow()
+        if pruned:
+            self.moving_summary_buffer = await self.apredict_new_summary(
+                pruned, self.moving_summary_buffer
+            )
+            self._save_summary()
+
+    def adopt_history(self) -> None:
+        """Take over the window and summary the chat history just reloaded (e.g. after a sync)."""
+        self.moving_summary_buffer = getattr(self.chat_memory, "summary", "")
+        self.kept_messages = len(self.chat_memory.messages)
+
+    def clear(self) -> None:
+        super().clear()
+        self.kept_messages = self.full_history_tokens = 0
+
+    async def aclear(self) -> None:
+        await super().aclear()
+        self.kept_messages = self.full_history_tokens = 0
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "turns": self.turns,
+            "full_history_tokens": self.full_history_tokens,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "last_tokens_saved": self.last_tokens_saved,
+            "total_tokens_saved": self.total_tokens_saved,
+        }
+
+
+class PersistentChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history for one room: an in-memory window that memory classes read
+    and prune, written through to an append-only HistoryStore. It starts from
+    the last `load_limit` stored messages, so a restarted process or another
+    worker picks the conversation up without replaying the full transcript.
+
+    A summary memory prunes the window from the front and stores its running
+    summary with `save_summary`; the window is then reloaded from the messages
+    after the summary only, which are never summarized twice.
+
+    `last_seqs` holds the sequence numbers of the most recently added messages,
+    so a turn's reply can tell clients how far their copy of the log reaches.
+
+    Another worker process may serve the same room (e.g. a second browser tab)
+    and append to the log; `sync` reloads the window when it has.
+    """
+
+    def __init__(self, store, room: str, load_limit: int = 20):
+        self.store = store
+        self.room = room
+        self.load_limit = load_limit
+        self.messages = []
+        self.seqs = []  # seqs of `messages`, plus those of any pruned from its front since
+        self.last_seqs = []
+        self.seq = 0  # newest seq the window is known to include
+        self.summary = ""
+        self.summary_seq = 0  # newest seq folded into `summary`
+        self._appended = set()  # seqs added by this process after `seq`
+        self._reload()
+
+    def _reload(self):
+        self.summary, self.summary_seq = self.store.load_summary(self.room)
+        rows = self.store.load_page(self.room, self.load_limit, after_seq=self.summary_seq)
+        self.messages = [row["message"] for row in rows]
+        self.seqs = [row["seq"] for row in rows]
+        self.seq = rows[-1]["seq"] if rows else max(self.seq, self.summary_seq)
+        self._appended.clear()
+
+    def sync(self) -> bool:
+        """
+        Reload the window if the store has messages this process did not add.
+        One indexed read of the rows after `seq`, normally just the last turn's.
+        :return: True if the window was reloaded.
+        """
+        rows = self.store.load_page(self.room, self.load_limit, after_seq=self.seq)
+        if any(row["seq"] not in self._appended for row in rows):
+            self._reload()
+            return True
+        if rows:
+            self.seq = rows[-1]["seq"]
+        self._appended.clear()
+        return False
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.last_seqs = self.store.append(self.room, messages)
+        self._appended.update(self.last_seqs)
+        self.messages.extend(messages)
+        self.seqs.extend(self.last_seqs)
+
+    def save_summary(self, summary: str) -> None:
+        """
+        Store `summary` as covering every message pruned from the front of the
+        window so far.
+        """
+        pruned = len(self.seqs) - len(self.messages)
+        if pruned <= 0:
+            return
+        self.summary, self.summary_seq = summary, self.seqs[pruned - 1]
+        del self.seqs[:pruned]
+        self.store.save_summary(self.room, summary, self.summary_seq)
+
+    def clear(self) -> None:
+        # The store is append-only; clearing only resets the in-memory window
+        self.messages = []
+        self.seqs = []
+
+
+def build_memory(llm, mode: str = "buffer", max_turns: int = 6, max_tokens: int = 2000,
+                 chat_memory=None):
+    """
+    Create the conversation memory for a ChatAgent.
+    :param llm: The model used to write summaries (mode "summary" only).
+    :param mode: "buffer" keeps the full history, "summary" keeps the last
+        `max_turns` turns / `max_tokens` tokens and summarizes the rest.
+    :param chat_memory: Optional message history to back the memory, e.g. a
+        PersistentChatMessageHistory; defaults to an in-process list.
+    :return: A memory exposing `chat_history` as messages.
+    """
+    extra = {"chat_memory": chat_memory} if chat_memory is not None else {}
+    if mode == "buffer":
+        return BufferMemory(memory_key="chat_history", return_messages=True, **extra)
+    if mode == "summary":
+        return SummaryWindowMemory(
+            **extra,
+            llm=llm,
+            moving_summary_buffer=getattr(chat_memory, "summary", ""),
+            memory_key="chat_history",
+            return_messages=True,
+            max_turns=max_turns,
+            max_token_limit=max_tokens,
+        )
+    raise ValueError(f"Unsupported memory mode: {mode}. Expected one of {MEMORY_MODES}")
+
+
+__all__ = ['build_memory', 'estimate_tokens', 'BufferMemory', 'SummaryWindowMemory',
+           'PersistentChatMessageHistory', 'MEMORY_MODES']
@@ -0,0 +1,303 @@
+"""
+Agent prompts, compiled once per process.
+
+The chat-conversational agent normally renders its tool descriptions and
+format instructions into the human message, so they are re-sent (and
+re-formatted) on every turn after the chat history. Here the static text
+(system text, tool descriptions, format instructions) is rendered once
+into a single system message, which every agent with the same tools reuses
+unchanged as a frozen prefix. Per-turn formatting then only touches the
+chat history, the user's input and the scratchpad.
+
+With GEMINI_CONTEXT_CACHE on, the prefix (and, in tool-calling mode, the
+tool schemas) is uploaded once as Gemini cached content and requests refer
+to it by name, so per-turn input tokens cover only the new message and the
+recent history.
+"""
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# The chat-conversational agent's static instructions, as in
+# langchain.agents.conversational_chat.prompt but rendered into the system
+# message. Only the short reminder that precedes the input stays per turn.
+REACT_TOOLS_TEMPLATE = """TOOLS
+------
+Assistant can ask the user to use tools to look up information that may be helpful in answering the users original question. The tools the human can use are:
+
+{tools}
+
+{format_instructions}"""
+
+REACT_HUMAN_TEMPLATE = """USER'S INPUT
+--------------------
+Here is the user's input (remember to respond with a markdown code snippet of a json blob with a single action, and NOTHING else):
+
+{input}"""
+
+TOOL_CALLING_SYSTEM_PROMPT = (
+    "You are a helpful assistant that can use tools to answer questions. "
+    "When several tool calls are needed and they do not depend on each other, "
+    "request them all at once. Format your responses in Markdown."
+)
+
+# Extend a context cache's TTL once less than this much of it is left
+_CACHE_REFRESH_MARGIN = 300  # seconds
+
+
+def render_react_prefix(tools) -> str:
+    """The chat-conversational agent's system text with tools and format instructions filled in."""
+    from langchain.agents.conversational_chat.output_parser import ConvoOutputParser
+    from langchain.agents.conversational_chat.prompt import PREFIX
+
+    tool_strings = "\n".join(f"> {tool.name}: {tool.description}" for tool in tools)
+    tool_names = ", ".join(tool.name for tool in tools)
+    # The stock instructions are escaped for two more rounds of str.format
+    format_instructions = ConvoOutputParser().get_format_instructions().format(tool_names=tool_names)
+    format_instructions = format_instructions.replace("{{", "{").replace("}}", "}")
+    return PREFIX + "\n\n" + REACT_TOOLS_TEMPLATE.format(tools=tool_strings, format_instructions=format_instructions)
+
+
+class GeminiContextCache:
+    """
+    A Gemini cached-content entry holding the prompt prefix, kept alive while in use.
+
+    :param model: Gemini model name, e.g. "models/gemini-2.0-flash".
+    :param system_text: The frozen system prompt.
+    :param tools: Tools whose schemas are cached with it (tool-calling mode), or None.
+    :param ttl: Lifetime in seconds; extended by `refresh` as it runs out.
+    """
+
+    def __init__(self, model: str, system_text: str, tools=None, ttl: int = config.GEMINI_CONTEXT_CACHE_TTL):
+        from google.ai.generativelanguage_v1beta import CacheServiceClient, CachedContent, Content, Part
+
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._client = CacheServiceClient(client_options={"api_key": config.require_google_api_key()})
+        cached = CachedContent(
+            model=model if model.startswith("models/") else f"models/{model}",
+            system_instruction=Content(parts=[Part(text=system_text)]),
+            ttl=datetime.timedelta(seconds=ttl),
+        )
+        if tools:
+            from langchain_google_genai._function_utils import convert_to_genai_function_declarations
+
+            cached.tools = [convert_to_genai_function_declarations(tools)]
+        self.name = self._client.create_cached_content(cached_content=cached).name
+        self.expires_at = time.time() + ttl
+
+    @property
+    def refresh_due(self) -> bool:
+        """Whether the TTL is about to run out, i.e. `refresh` would make a network call."""
+        return self.expires_at - time.time() <= _CACHE_REFRESH_MARGIN
+
+    def refresh(self):
+        """Extend the TTL when it is about to run out; called before each turn."""
+        if not self.refresh_due:
+            return
+        with self._lock:
+            if not self.refresh_due:
+                return
+            from google.ai.generativelanguage_v1beta import CachedContent
+            from google.protobuf import field_mask_pb2
+
+            self._client.update_cached_content(
+                cached_content=CachedContent(name=self.name, ttl=datetime.timedelta(seconds=self.ttl)),
+                update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+            )
+            self.expires_at = time.time() + self.ttl
+
+
+class CompiledPrompt:
+    """
+    The per-turn prompt template of an agent, with its static prefix rendered once.
+
+    If the context cache cannot be refreshed (e.g. it expired while the
+    process sat idle), it is recreated with `cache_factory`, and if that fails
+    too the prefix is sent inline from then on. Either way `version` is
+    bumped, and agents rebuild anything made from the old `template` and
+    `llm_kwargs`.
+
+    :param agent_mode: "react" or "tool_calling".
+    :param system_text: The frozen system prompt.
+    :param context_cache: GeminiContextCache holding `system_text`, or None to send it inline.
+    :param cache_factory: Creates a replacement GeminiContextCache.
+    """
+
+    def __init__(self, agent_mode: str, system_text: str, context_cache: GeminiContextCache = None,
+                 cache_factory=None):
+        self.agent_mode = agent_mode
+        self.system_text = system_text
+        self.prefix_tokens = len(system_text) // 4  # same estimate as agent.memory
+        self.version = 0
+        self._cache_factory = cache_factory
+        self._lock = threading.Lock()
+        self._use(context_cache)
+
+    def _use(self, context_cache):
+        from langchain_core.messages import SystemMessage
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+        self.context_cache = context_cache
+        # Extra generation arguments for every LLM call of the agent
+        self.llm_kwargs = {"cached_content": context_cache.name} if context_cache else {}
+
+        # A message object (not a template) is passed through as is on every turn.
+        # With a context cache the prefix lives server side, and Gemini rejects
+        # requests that set a system instruction alongside cached content.
+        messages = [] if context_cache else [SystemMessage(content=self.system_text)]
+        if self.agent_mode == "react":
+            messages += [
+                MessagesPlaceholder("chat_history"),
+                ("human", REACT_HUMAN_TEMPLATE),
+                MessagesPlaceholder("agent_scratchpad"),
+            ]
+        else:
+            messages += [
+                MessagesPlaceholder("chat_history", optional=True),
+                ("human", "{input}"),
+                MessagesPlaceholder("agent_scratchpad"),
+            ]
+        self.template = ChatPromptTemplate.from_messages(messages)
+
+    @property
+    def refresh_due(self) -> bool:
+        """Whether `refresh` has network work to do; it blocks, so run it off the event loop then."""
+        return self.context_cache is not None and self.context_cache.refresh_due
+
+    def refresh(self):
+        """Keep the context cache alive; called at the start of each turn."""
+        context_cache = self.context_cache
+        if context_cache is None:
+            return
+        try:
+            context_cache.refresh()
+            return
+        except Exception:
+            logger.warning("Refreshing Gemini context cache %s failed, recreating it", context_cache.name,
+                           exc_info=True)
+        with self._lock:
+            if self.context_cache is not context_cache:
+                return  # another turn replaced it already
+            replacement = None
+            if self._cache_factory is not None:
+                try:
+                    replacement = self._cache_factory()
+                except Exception:
+                    logger.warning("Gemini context cache unavailable, sending the prompt prefix inline",
+                                   exc_info=True)
+            self._use(replacement)
+            self.version += 1
+
+
+# Distinct (mode, tools, model) prompts kept for sharing, least recently used
+# first. Rooms pick their own tool sets and the tool selector makes subsets,
+# so the number of keys is open-ended. An evicted prompt stays in use by the
+# agents holding it, and its context cache expires on its TTL.
+MAX_COMPILED_PROMPTS = 64
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+_building = {}  # key -> lock held while that prompt is compiled, outside _compiled_lock
+
+
+def _supports_context_cache(llm) -> bool:
+    if not config.GEMINI_CONTEXT_CACHE:
+        return False
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return isinstance(llm, ChatGoogleGenerativeAI)
+
+
+def _cached_prompt(key):
+    """Under _compiled_lock: the shared prompt for `key`, marked as recently used."""
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        _compiled.move_to_end(key)
+    return compiled
+
+
+def compile_prompt(agent_mode: str, tools, llm=None, context_cache: bool = True) -> CompiledPrompt:
+    """
+    Return the compiled prompt for `agent_mode` and `tools`, building it on first use.
+
+    Agents with the same mode, tools and model share one CompiledPrompt (and
+    one context cache) while it is among the MAX_COMPILED_PROMPTS most
+    recently used.
+
+    :param agent_mode: "react" or "tool_calling".
+    :param tools: The agent's tools.
+    :param llm: The agent's chat model; a context cache is only created for Gemini.
+    :param context_cache: False to always send the prefix inline, for prompts
+        too short-lived to pay for a cache upload (e.g. per-turn tool subsets).
+    :return: CompiledPrompt
+    """
+    llm = getattr(llm, "inner", llm)  # the Gemini model behind a GatewayChatModel
+    use_cache = context_cache and _supports_context_cache(llm)
+    model = getattr(llm, "model", None) if use_cache else None
+    key = (agent_mode, tuple((tool.name, tool.description) for tool in tools), model)
+    with _compiled_lock:
+        compiled = _cached_prompt(key)
+        if compiled is not None:
+            return compiled
+        building = _building.setdefault(key, threading.Lock())
+
+    # Creating a context cache is a network call: only agents waiting for this
+    # same prompt queue behind it, not every agent being built
+    with building:
+        with _compiled_lock:
+            compiled = _cached_prompt(key)
+            if compiled is not None:
+                return compiled
+
+        try:
+            compiled = _compile(agent_mode, tools, use_cache, model)
+            with _compiled_lock:
+                _compiled[key] = compiled
+                while len(_compiled) > MAX_COMPILED_PROMPTS:
+                    _compiled.popitem(last=False)
+            return compiled
+        finally:
+            with _compiled_lock:
+                if _building.get(key) is building:
+                    del _building[key]
+
+
+def _compile(agent_mode: str, tools, use_cache: bool, model) -> CompiledPrompt:
+    """Render the prompt and, with `use_cache`, upload its prefix as a context cache for `model`."""
+    system_text = render_react_prefix(tools) if agent_mode == "react" else TOOL_CALLING_SYSTEM_PROMPT
+    if not use_cache:
+        return CompiledPrompt(agent_mode, system_text)
+
+    def create_context_cache():
+        created = GeminiContextCache(model, system_text,
+                                     tools=tools if agent_mode == "tool_calling" else None)
+        logger.info("Created Gemini context cache %s for the %s prompt (~%d tokens)",
+                    created.name, agent_mode, len(system_text) // 4)
+        return created
+
+    context_cache = None
+    try:
+        context_cache = create_context_cache()
+    except Exception:
+        # Usually a prefix below the API's minimum cacheable size
+        logger.warning("Gemini context cache unavailable, sending the prompt prefix inline",
+                       exc_info=True)
+    return CompiledPrompt(agent_mode, system_text, context_cache, create_context_cache)
+
+
+__all__ = [
+    "CompiledPrompt",
+    "GeminiContextCache",
+    "MAX_COMPILED_PROMPTS",
+    "REACT_HUMAN_TEMPLATE",
+    "TOOL_CALLING_SYSTEM_PROMPT",
+    "compile_prompt",
+    "render_react_prefix",
+]
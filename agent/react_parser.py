@@ -0,0 +1,244 @@
+"""
+Single-pass, incremental parser for text ReAct output:
+
+    Thought: ...
+    Action: <tool name>
+    Action Input: <input>
+    Observation: ...
+    Final Answer: ...
+
+GeminiFlashOutputParser (archive/gemini_langchain_agent.py) splits the whole
+output several times per parse and only works once generation has finished.
+StreamingReActParser consumes the output chunk by chunk and looks at each
+character once. It returns the AgentAction as soon as the Action Input is
+complete, so the tool can start while trailing tokens are still arriving,
+and sets `stopped` at the first "Observation:" so the caller can close the
+stream instead of paying for a hallucinated observation.
+"""
+import asyncio
+from typing import Optional, Union
+
+from langchain.agents import AgentOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+FINAL_ANSWER = "Final Answer:"
+ACTION_INPUT = "Action Input:"
+ACTION = "Action:"
+OBSERVATION = "Observation:"
+THOUGHT = "Thought:"
+# Longest first, so "Action Input:" is not mistaken for "Action:"
+_MARKERS = (FINAL_ANSWER, ACTION_INPUT, ACTION, OBSERVATION, THOUGHT)
+# Enough of a line's start to recognise any marker behind some indentation
+_HEAD_CHARS = 32
+_OPEN = "{[("
+_CLOSE = "}])"
+
+
+def _find_markers(line: str):
+    """
+    (start, marker) of every marker in a line, in order. Markers count
+    anywhere, e.g. "Thought: done. Final Answer: Paris". They all end with
+    ":", so only the (rare) colons are checked rather than searching the
+    line once per marker.
+    """
+    found = []
+    colon = line.find(":")
+    while colon != -1:
+        for marker in _MARKERS:
+            start = colon + 1 - len(marker)
+            if start >= 0 and line.startswith(marker, start):
+                found.append((start, marker))
+                break
+        colon = line.find(":", colon + 1)
+    return found
+
+
+def _bracket_balance(text: str) -> int:
+    return sum(text.count(c) for c in _OPEN) - sum(text.count(c) for c in _CLOSE)
+
+
+class StreamingReActParser:
+    """
+    Incremental ReAct parser for one LLM generation.
+
+    Call `feed` with each chunk; it returns the AgentAction once, as soon as
+    the Action Input is complete: at the end of its line when brackets are
+    balanced (so multi-line JSON inputs are waited for), or when the next
+    marker line starts. After that, `stopped` becomes True at "Observation:"
+    and later chunks are ignored. `finish` returns the final result at the
+    end of the stream.
+    """
+
+    def __init__(self):
+        self.stopped = False
+        self.action: Optional[AgentAction] = None  # set once emitted
+        self._log = []  # every chunk fed, for AgentAction.log / AgentFinish.log
+        self._line = []  # pieces of the current, incomplete line
+        self._head = ""  # first _HEAD_CHARS of the current line
+        self._field = None  # "input" while Action Input continues on the next lines
+        self._tool = None
+        self._input = []
+        self._balance = 0
+        self._final = None  # pieces of the final answer once "Final Answer:" is seen
+
+    def feed(self, chunk: str) -> Optional[AgentAction]:
+        """
+        Consume one chunk of model output.
+        :return: the AgentAction the first time it becomes complete, else None
+        """
+        if self.stopped or not chunk:
+            return None
+        self._log.append(chunk)
+        if self._final is not None:
+            # Everything after "Final Answer:" belongs to the answer
+            self._final.append(chunk)
+            return None
+
+        emitted = None
+        start = 0
+        while start < len(chunk):
+            end = chunk.find("\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            self._line.append(piece)
+            if len(self._head) < _HEAD_CHARS:
+                self._head = (self._head + piece)[:_HEAD_CHARS]
+                if self._head.lstrip().startswith(OBSERVATION) and (self.action is not None or self._field == "input"):
+                    emitted = self._emit_action() or emitted
+                    self.stopped = True
+                    return emitted
+            if end == -1:
+                break
+            emitted = self._end_line() or emitted
+            if self.stopped or self._final is not None:
+                # Keep the rest of the chunk in the answer
+                if self._final is not None:
+                    self._final.append(chunk[end:])
+                return emitted
+            start = end + 1
+        return emitted
+
+    def _end_line(self) -> Optional[AgentAction]:
+        line = "".join(self._line)
+        self._line, self._head = [], ""
+        markers = _find_markers(line)
+        if not markers:
+            return self._text(line)
+
+        emitted = None
+        if line[:markers[0][0]].strip():
+            emitted = self._text(line[:markers[0][0]])
+        for i, (start, marker) in enumerate(markers):
+            end = len(line) if marker == FINAL_ANSWER or i + 1 == len(markers) else markers[i + 1][0]
+            # A final answer runs to the end of the line, whatever it mentions
+            emitted = self._marker(marker, line[start + len(marker):end]) or emitted
+            if self.stopped or self._final is not None:
+                break
+        return emitted
+
+    def _text(self, text: str) -> Optional[AgentAction]:
+        """Text outside any marker: more of a multi-line Action Input, or ignored."""
+        if self._field == "input":
+            self._input.append("\n" + text)
+            self._balance += _bracket_balance(text)
+            if self._balance <= 0:
+                return self._emit_action()
+        return None
+
+    def _marker(self, marker: str, value: str) -> Optional[AgentAction]:
+        emitted = None
+        if self._field == "input":
+            # A new marker ends an Action Input whatever its brackets
+            emitted = self._emit_action()
+        self._field = None
+        if marker == FINAL_ANSWER and self.action is None:
+            self._final = [value]
+        elif marker == OBSERVATION and self.action is not None:
+            self.stopped = True
+        elif marker == ACTION and self.action is None:
+            self._tool = value.strip()
+        elif marker == ACTION_INPUT and self.action is None and self._tool is not None:
+            self._input = [value]
+            self._balance = _bracket_balance(value)
+            if value.strip() and self._balance <= 0:
+                return self._emit_action()
+            self._field = "input"
+        return emitted
+
+    def _emit_action(self) -> Optional[AgentAction]:
+        self._field = None
+        if self.action is not None:
+            return None
+        self.action = AgentAction(tool=self._tool, tool_input="".join(self._input).strip(), log="".join(self._log))
+        return self.action
+
+    def finish(self) -> Union[AgentAction, AgentFinish]:
+        """
+        End of the stream: return the action (even if its input never balanced)
+        or the final answer.
+        :raises OutputParserException: when the output has neither
+        """
+        if not self.stopped and self._final is None and self._line:
+            self._end_line()
+        if self.action is None and self._field == "input":
+            self._emit_action()
+        if self.action is not None:
+            return self.action
+        text = "".join(self._log)
+        if self._final is not None:
+            return AgentFinish(return_values={"output": "".join(self._final).strip()}, log=text)
+        raise OutputParserException(f"Could not parse output:\n{text}")
+
+
+class IncrementalReActOutputParser(AgentOutputParser):
+    """Drop-in AgentOutputParser that parses a complete output in one pass."""
+
+    def parse(self, text: str) -> Union[AgentAction, AgentFinish]:
+        parser = StreamingReActParser()
+        parser.feed(text)
+        return parser.finish()
+
+    @property
+    def _type(self) -> str:
+        return "incremental_react"
+
+
+async def astream_react_step(chunks, run_tool):
+    """
+    Run one ReAct step from a stream of model output, e.g. `llm.astream(prompt)`.
+
+    The tool is started as soon as its Action Input is complete, while the
+    rest of the output is still streaming, and the stream is closed at
+    "Observation:" so the model stops generating.
+
+    :param chunks: async iterable of str or message chunks
+    :param run_tool: coroutine function taking the AgentAction and returning the observation
+    :return: (AgentAction, observation) or (AgentFinish, None)
+    """
+    parser = StreamingReActParser()
+    task = None
+    try:
+        async for chunk in chunks:
+            action = parser.feed(getattr(chunk, "content", chunk))
+            if action is not None:
+                task = asyncio.ensure_future(run_tool(action))
+            if parser.stopped:
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    result = parser.finish()
+    if isinstance(result, AgentFinish):
+        return result, None
+    if task is None:
+        task = asyncio.ensure_future(run_tool(result))
+    return result, await task
+
+
+__all__ = [
+    "IncrementalReActOutputParser",
+    "StreamingReActParser",
+    "astream_react_step",
+]
@@ -0,0 +1,181 @@
+"""
+Pre-dispatch router: answers trivial input without the agent loop.
+
+Every message used to go through the full ReAct prompt, so even "hi" cost a
+large-prompt Gemini call. FastPathRouter classifies the input locally first:
+
+- greetings, thanks and goodbyes get a canned reply. By default only exact
+  known phrases match; with a threshold, short messages made only of
+  small-talk words also match by HashingEmbedder similarity. Anything with
+  another word ("take care of it", "no thanks") goes to the agent.
+- direct tool-shaped requests ("get user detail for 123", "what is 3 * 4",
+  "multiply 6 and 7") go straight to the tool
+- anything else, or a tool call that fails, goes to the LLM agent
+
+The router only classifies and counts; ChatAgent runs the tool and records
+the outcome, so `stats()` reports the routed vs. full-agent ratio.
+"""
+import re
+import threading
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from agent.instrumentation import METRICS
+from agent.semantic_cache import HashingEmbedder, normalize_query
+
+CANNED_REPLIES = {
+    "greeting": "Hello! How can I help you today?",
+    "thanks": "You're welcome! Let me know if there is anything else I can help with.",
+    "farewell": "Goodbye! Come back any time.",
+}
+
+INTENT_PHRASES = {
+    "greeting": (
+        "hi", "hello", "hey", "hi there", "hello there", "hey there", "good morning",
+        "good afternoon", "good evening", "greetings", "howdy", "yo", "hiya",
+    ),
+    "thanks": (
+        "thanks", "thank you", "thx", "ty", "thanks a lot", "thank you so much", "many thanks",
+        "cheers", "great thanks", "ok thanks", "perfect thanks", "awesome thanks",
+    ),
+    "farewell": (
+        "bye", "goodbye", "good bye", "see you", "see you later", "bye bye", "take care",
+        "good night", "later", "cya",
+    ),
+}
+
+# Similarity matching only applies to short messages; longer ones probably ask something
+MAX_SMALL_TALK_WORDS = 5
+
+# Words the small-talk phrases are made of; a message with any other word is not small talk
+SMALL_TALK_WORDS = frozenset(word for phrases in INTENT_PHRASES.values() for phrase in phrases
+                             for word in phrase.split())
+
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_USER_DETAILS = re.compile(
+    r"^(?:please\s+)?(?:(?:can\s+you\s+)?(?:get|fetch|show|find|look\s*up|give)(?:\s+me)?\s+)?(?:the\s+)?"
+    r"user(?:'s)?\s*(?:details?|info(?:rmation)?|profile|record)?\s+(?:for\s+|of\s+)?"
+    r"(?:(?:this|the|user)\s+)?(?:id\s*:?\s*)?(?P<id>(?=[\w-]*\d)[\w-]{1,64})$",
+    re.IGNORECASE,
+)
+_EXPRESSION_PREFIX = re.compile(r"^(?:what\s+is|what's|whats|calculate|compute|evaluate|calc)\s+", re.IGNORECASE)
+_EXPRESSION = re.compile(r"^[\d\s.+\-*/%^()]+$")
+_OPERATOR = re.compile(r"\d\s*(?:\*\*|//|[+\-*/%^])\s*[\d(]")
+_WORD_ARITHMETIC = (
+    (re.compile(rf"^(?:multiply|times)\s+{_NUMBER}\s+(?:and|by|with)\s+{_NUMBER}$", re.I), "{0} * {1}"),
+    (re.compile(rf"^(?:add|sum)\s+{_NUMBER}\s+(?:and|to|with)\s+{_NUMBER}$", re.I), "{0} + {1}"),
+    (re.compile(rf"^(?:what\s+is\s+)?(?:the\s+)?sum\s+of\s+{_NUMBER}\s+and\s+{_NUMBER}$", re.I), "{0} + {1}"),
+    (re.compile(rf"^(?:what\s+is\s+)?(?:the\s+)?product\s+of\s+{_NUMBER}\s+and\s+{_NUMBER}$", re.I), "{0} * {1}"),
+    (re.compile(rf"^divide\s+{_NUMBER}\s+by\s+{_NUMBER}$", re.I), "{0} / {1}"),
+    (re.compile(rf"^subtract\s+{_NUMBER}\s+from\s+{_NUMBER}$", re.I), "{1} - {0}"),
+)
+
+
+class Route(NamedTuple):
+    """Where a message goes: "canned" (reply set), "tool" (tool, tool_input and template set) or "agent"."""
+    kind: str
+    intent: str = ""
+    reply: Optional[str] = None
+    tool: Optional[str] = None
+    tool_input: Optional[dict] = None
+    template: Optional[str] = None  # reply with the tool output filled in as {output}
+
+    def format(self, output) -> str:
+        return self.template.format(output=output)
+
+
+AGENT_ROUTE = Route("agent")
+
+
+class FastPathRouter:
+    """
+    Local classifier in front of ChatAgent, usually shared by every agent in a process.
+
+    :param threshold: Cosine similarity to a known small-talk phrase needed for a canned
+        reply to a message that is not one exactly; None matches exact phrases only.
+    :param embeddings: Embedding model for that comparison; a HashingEmbedder by default.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, embeddings=None):
+        self.threshold = threshold
+        self._exact = {phrase: intent for intent, phrases in INTENT_PHRASES.items() for phrase in phrases}
+        self._intents = [intent for intent, phrases in INTENT_PHRASES.items() for _ in phrases]
+        self.embeddings = self._vectors = None
+        if threshold is not None:
+            self.embeddings = embeddings or HashingEmbedder()
+            vectors = np.asarray(self.embeddings.embed_documents(list(self._exact)), dtype=np.float32)
+            self._vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self._counts = {"canned": 0, "tool": 0, "agent": 0}
+        self._intent_counts = {}
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Route:
+        """Pick a route for a message. Pure and cheap: nothing is executed."""
+        query = normalize_query(text)
+        if not query:
+            return AGENT_ROUTE
+        return self._tool_call(text) or self._small_talk(query) or AGENT_ROUTE
+
+    def _small_talk(self, query: str) -> Optional[Route]:
+        query = query.replace(",", "").replace("!", "")  # "thanks, bye!"
+        intent = self._exact.get(query)
+        if intent is None:
+            words = query.split()
+            if self.threshold is None or len(words) > MAX_SMALL_TALK_WORDS \
+                    or not SMALL_TALK_WORDS.issuperset(words):
+                return None
+            vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            intent = self._intents[best]
+        return Route("canned", intent=intent, reply=CANNED_REPLIES[intent])
+
+    @staticmethod
+    def _tool_call(text: str) -> Optional[Route]:
+        text = " ".join(text.split()).rstrip("?!. ")
+        match = _USER_DETAILS.match(text)
+        if match:
+            user_id = match.group("id")
+            return Route("tool", intent="user_details", tool="get_user_details", tool_input={"id": user_id},
+                         template=f"Here are the details for user {user_id}:\n\n{{output}}")
+
+        expression = None
+        for pattern, template in _WORD_ARITHMETIC:
+            match = pattern.match(text)
+            if match:
+                expression = template.format(*match.groups())
+                break
+        if expression is None:
+            candidate = _EXPRESSION_PREFIX.sub("", text)
+            if _EXPRESSION.match(candidate) and _OPERATOR.search(candidate):
+                expression = candidate.strip()
+        if expression is not None:
+            return Route("tool", intent="arithmetic", tool="calculator", tool_input={"expression": expression},
+                         template=f"{expression} = {{output}}")
+        return None
+
+    def record(self, kind: str, intent: str = ""):
+        """Count the route a turn actually took ("canned", "tool" or "agent", after any fallback)."""
+        METRICS.add_route(kind)
+        with self._lock:
+            self._counts[kind] += 1
+            if intent:
+                self._intent_counts[intent] = self._intent_counts.get(intent, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self._counts.values())
+            routed = self._counts["canned"] + self._counts["tool"]
+            return {
+                **self._counts,
+                "intents": dict(self._intent_counts),
+                "routed_ratio": routed / total if total else 0.0,
+                "agent_ratio": self._counts["agent"] / total if total else 0.0,
+            }
+
+
+__all__ = ['AGENT_ROUTE', 'CANNED_REPLIES', 'FastPathRouter', 'Route']
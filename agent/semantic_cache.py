@@ -0,0 +1,215 @@
+import hashlib
+import heapq
+import itertools
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_WS = re.compile(r"\s+")
+_TERM = re.compile(r"[\w@%+-]+(?:[.:/][\w@%+-]+)*")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _WS.sub(" ", text.lower()).strip().rstrip("?!. ")
+
+
+def key_terms(text: str) -> tuple:
+    """
+    The terms of a query that must match exactly for an answer to be reused:
+    numbers, ids and anything else with a digit or an "@" (years, amounts,
+    emails). Embeddings score "user 98765" and "user 98766" as near-identical.
+    """
+    return tuple(sorted(term for term in _TERM.findall(normalize_query(text))
+                        if "@" in term or any(c.isdigit() for c in term)))
+
+
+class HashingEmbedder:
+    """
+    Local, deterministic embedding: hashed word and character-trigram counts.
+    Good enough to match near-identical phrasings without a network call; any
+    LangChain Embeddings object (e.g. GoogleGenerativeAIEmbeddings) can be
+    passed to SemanticCache instead.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = text.split()
+        padded = f" {text} "
+        features = words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            vector[zlib.crc32(feature.encode()) % self.dim] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class SemanticCache:
+    """
+    In-process vector index of past answers, shared by every agent in a process.
+
+    A lookup matches when the cosine similarity of the normalized query is at
+    least `threshold`, its numbers and ids (`key_terms`) are the same, and the
+    conversation-context digest is identical, so an answer is only reused
+    where the surrounding conversation was the same. Answers that used a tool
+    are only served back to the room they were produced in, unless
+    `share_tool_answers` is set; answers without tools are shared by all rooms.
+    Answers that used a tool expire after that tool's entry in `tool_ttl`
+    (falling back to `ttl`); answers that used a tool in `uncacheable_tools`
+    are never stored, and `invalidate_tool` drops everything that used a tool.
+
+    Vectors live in one array of `max_entries` rows, allocated on the first
+    store; an entry takes a free row, so storing never copies the index. Once
+    full, the oldest entry gives up its row.
+    """
+
+    def __init__(self, embeddings=None, threshold: float = 0.92, ttl: float = 3600,
+                 max_entries: int = 10000, tool_ttl: Optional[Dict[str, float]] = None,
+                 uncacheable_tools: Iterable[str] = (), share_tool_answers: bool = False):
+        self.embeddings = embeddings or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tool_ttl = dict(tool_ttl or {})
+        self.uncacheable_tools = set(uncacheable_tools)
+        self.share_tool_answers = share_tool_answers
+        self.hits = 0
+        self.misses = 0
+        self._reset()
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self._vectors = None  # (max_entries, dim) unit vectors, row i <-> self._entries[i]
+        self._entries = []  # per row: dict of answer, context, terms, room, tools, expires_at, id; None if free
+        self._rows = 0  # rows handed out so far; lookups only score these
+        self._free = []  # heap of released rows below self._rows, reused lowest first
+        self._order = OrderedDict()  # row -> None, oldest entry first
+        self._expiry = []  # heap of (expires_at, entry id, row)
+        self._ids = itertools.count()
+
+    @staticmethod
+    def context_digest(messages) -> str:
+        """Digest of the conversation context an answer was produced in."""
+        digest = hashlib.sha1()
+        for message in messages:
+            digest.update(f"{message.type}:{message.content}\n".encode())
+        return digest.hexdigest()
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(normalize_query(query)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query: str, context: str, room: Optional[str] = None) -> Optional[str]:
+        """
+        Return a cached answer for a similar query in the same context, or None.
+        :param room: The asking room; answers from tools in other rooms are not returned.
+        """
+        vector = self._embed(query)
+        terms = key_terms(query)
+        now = time.time()
+        with self._lock:
+            if self._rows:
+                scores = self._vectors[:self._rows] @ vector
+                # Usually a handful of rows pass the threshold; only those are sorted
+                candidates = np.flatnonzero(scores >= self.threshold)
+                for i in candidates[np.argsort(-scores[candidates], kind="stable")]:
+                    entry = self._entries[i]
+                    if (entry is not None and entry["context"] == context and entry["terms"] == terms
+                            and entry["room"] in (None, room) and entry["expires_at"] > now):
+                        self.hits += 1
+                        return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, query: str, context: str, answer: str, tools_used: Iterable[str] = (),
+              room: Optional[str] = None):
+        """
+        Cache an answer unless it depends on an uncacheable tool.
+        :param room: The room the answer was produced in. Answers from tools
+            are not cached without one, unless they are shared.
+        """
+        tools_used = set(tools_used)
+        if tools_used & self.uncacheable_tools:
+            return
+        scoped = bool(tools_used) and not self.share_tool_answers
+        if scoped and room is None:
+            return
+        ttl = min([self.ttl] + [self.tool_ttl[t] for t in tools_used if t in self.tool_ttl])
+        if ttl <= 0:
+            return
+        vector = self._embed(query)
+        entry = {"answer": answer, "context": context, "terms": key_terms(query),
+                 "room": room if scoped else None, "tools": tools_used,
+                 "expires_at": time.time() + ttl}
+        with self._lock:
+            self._prune(time.time())
+            if len(self._order) >= self.max_entries:
+                self._release(next(iter(self._order)))
+            row = self._allocate(vector.shape[0])
+            entry["id"] = next(self._ids)
+            self._vectors[row] = vector
+            self._entries[row] = entry
+            self._order[row] = None
+            heapq.heappush(self._expiry, (entry["expires_at"], entry["id"], row))
+
+    def invalidate_tool(self, tool_name: str) -> int:
+        """Drop every answer that used `tool_name`. Returns how many were dropped."""
+        with self._lock:
+            rows = [row for row in self._order if tool_name in self._entries[row]["tools"]]
+            for row in rows:
+                self._release(row)
+            return len(rows)
+
+    def _allocate(self, dim: int) -> int:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+            self._entries = [None] * self.max_entries
+        if self._free:
+            return heapq.heappop(self._free)
+        self._rows += 1
+        return self._rows - 1
+
+    def _release(self, row: int):
+        self._entries[row] = None
+        self._vectors[row] = 0.0
+        del self._order[row]
+        heapq.heappush(self._free, row)
+
+    def _prune(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, entry_id, row = heapq.heappop(self._expiry)
+            entry = self._entries[row]
+            if entry is not None and entry["id"] == entry_id:
+                self._release(row)
+        if len(self._expiry) > 2 * self.max_entries:
+            # Mostly entries already evicted or invalidated; keep the live ones
+            self._expiry = [(self._entries[row]["expires_at"], self._entries[row]["id"], row)
+                            for row in self._order]
+            heapq.heapify(self._expiry)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._order),
+            }
+
+
+__all__ = ['SemanticCache', 'HashingEmbedder', 'key_terms', 'normalize_query']
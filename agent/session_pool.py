@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from agent.agent_base import ChatAgent
+from config import MAX_LIVE_SESSIONS, SESSION_IDLE_TIMEOUT, TOOL_CACHE_TTL, HISTORY_LOAD_LIMIT, MEMORY_MODE
+from config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL
+from config import SEMANTIC_CACHE_SHARE_TOOL_ANSWERS
+from config import ROUTER_ENABLED, ROUTER_THRESHOLD, TOOL_SELECTION_ENABLED, TOOL_SELECTION_TOP_K
+from config import TOOL_SELECTION_EMBEDDING_MODEL
+
+_CONFIGURED = object()  # history_store default: build the store selected in config
+
+
+class AgentPool:
+    """
+    Room-keyed pool of ChatAgents.
+
+    Every room gets its own ChatAgent (and so its own conversation memory),
+    while the Gemini client and the tools are built once and shared. A room
+    can be limited to a subset of the registered tools with `set_tools`.
+    Sessions are evicted least-recently-used once more than `max_sessions`
+    are live, and after `idle_timeout` seconds without a message. Pass `llm`
+    to share an existing chat model instead of building a Gemini client.
+
+    With a history store (the configured backend by default), each room's
+    memory is written through to it and reloaded from its last
+    HISTORY_LOAD_LIMIT messages when the room comes back.
+
+    Agents are built outside the pool lock (building one may load history or
+    create a context cache), so a cold room only holds up callers for that
+    same room, which wait for the one build in flight.
+    """
+
+    def __init__(self, max_sessions: int = MAX_LIVE_SESSIONS,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 temperature: float = 0.3, llm=None, history_store=_CONFIGURED):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.temperature = temperature
+        self._llm = llm
+        self._room_tools = OrderedDict()  # room -> tool names, for rooms not using the default tools
+        self.semantic_cache = self._build_semantic_cache() if SEMANTIC_CACHE_ENABLED else None
+        self.router = self._build_router() if ROUTER_ENABLED else None
+        self.tool_selector = self._build_tool_selector() if TOOL_SELECTION_ENABLED else None
+        if history_store is _CONFIGURED:
+            from agent.history_store import build_history_store
+
+            history_store = build_history_store()
+        self.history_store = history_store
+        self._sessions = OrderedDict()  # room -> (agent, last_used)
+        self._building = {}  # room -> Future of the agent being built for it
+        self._lock = threading.Lock()
+        if MEMORY_MODE == "summary":
+            from agent.instrumentation import METRICS
+
+            METRICS.register_stats("memory", "Summary memory turns and prompt tokens saved, over live rooms.",
+                                   self.memory_stats)
+
+    def get(self, room: str) -> ChatAgent:
+        """
+        Return the agent for a room, creating it if needed.
+        :param room: The Socket.IO room id.
+        :return: The room's ChatAgent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            entry = self._sessions.pop(room, None)
+            if entry is not None:
+                self._sessions[room] = (entry[0], now)
+                return entry[0]
+            building = self._building.get(room)
+            leader = building is None
+            if leader:
+                building = self._building[room] = Future()
+        if not leader:
+            return building.result()
+
+        try:
+            agent = self._new_agent(room)
+        except BaseException as e:
+            with self._lock:
+                if self._building.get(room) is building:
+                    del self._building[room]
+            building.set_exception(e)
+            raise
+        with self._lock:
+            # Unless set_tools or evict dropped the room while it was being built
+            if self._building.get(room) is building:
+                del self._building[room]
+                self._sessions[room] = (agent, time.monotonic())
+                while len(self._sessions) > self.max_sessions:
+                    self._drop_oldest()
+        building.set_result(agent)
+        return agent
+
+    def set_tools(self, room: str, tool_names=None):
+        """
+        Select the registry tools a room's agent gets; None for the defaults.
+        A change drops the room's live agent, as `evict` does, so its next
+        message builds one with the new tools. The selection lasts as long as
+        the room's agent (clients send it again when they join); selections
+        for rooms without an agent are kept for the latest `max_sessions`.
+        :raise ValueError: On a name that is not a registered tool.
+        """
+        if tool_names is not None:
+            from tools.registry import registry
+
+            unknown = set(tool_names).difference(registry.names())
+            if unknown:
+                raise ValueError(f"Unknown tools: {', '.join(sorted(unknown))}")
+            tool_names = list(tool_names)
+        with self._lock:
+            if self._room_tools.get(room) == tool_names:
+                return
+            if tool_names is None:
+                self._room_tools.pop(room, None)
+            else:
+                self._room_tools[room] = tool_names
+                self._room_tools.move_to_end(room)
+            self._sessions.pop(room, None)
+            self._building.pop(room, None)
+            idle = [name for name in self._room_tools if name not in self._sessions]
+            for name in idle[:max(len(self._room_tools) - self.max_sessions, 0)]:
+                del self._room_tools[name]
+
+    def evict(self, room: str) -> bool:
+        """Drop a room's agent, its memory and its tool selection. Returns True if it was live."""
+        with self._lock:
+            self._building.pop(room, None)
+            self._room_tools.pop(room, None)
+            return self._sessions.pop(room, None) is not None
+
+    def llm_stats(self) -> dict:
+        """
+        Counters of the shared chat model: its own call counters if it keeps
+        them (the offline fake model), plus the LLM gateway's stats when it
+        runs behind one.
+        """
+        if self._llm is None:
+            from agent.llm_gateway import get_gateway
+
+            return {"gateway": get_gateway().stats()}
+        stats = {}
+        counters = getattr(self._llm, "counters", None)
+        if counters:
+            stats.update(counters)
+        gateway = getattr(self._llm, "gateway", None)
+        if gateway is not None:
+            stats["gateway"] = gateway.stats()
+        return stats
+
+    def memory_stats(self) -> dict:
+        """
+        The live rooms' memory metrics (ChatAgent.memory_metrics) summed, except
+        the per-turn `last_*` values; empty apart from `rooms` for the plain buffer.
+        """
+        with self._lock:
+            agents = [agent for agent, _ in self._sessions.values()]
+        totals = {"rooms": len(agents)}
+        for agent in agents:
+            for stat, value in agent.memory_metrics().items():
+                if not stat.startswith("last_"):
+                    totals[stat] = totals.get(stat, 0) + value
+        return totals
+
+    def _new_agent(self, room: str) -> ChatAgent:
+        history = None
+        if self.history_store is not None:
+            from agent.memory import PersistentChatMessageHistory
+
+            history = PersistentChatMessageHistory(self.history_store, room, HISTORY_LOAD_LIMIT)
+        with self._lock:
+            tool_names = self._room_tools.get(room)
+        # Without an llm, ChatAgent uses the process-wide model for this temperature
+        return ChatAgent(temperature=self.temperature, llm=self._llm, tool_names=tool_names,
+                         semantic_cache=self.semantic_cache, history=history, router=self.router,
+                         tool_selector=self.tool_selector, room=room)
+
+    @staticmethod
+    def _build_semantic_cache():
+        from agent.instrumentation import METRICS
+        from agent.semantic_cache import SemanticCache
+
+        # Answers built from user details go stale with the tool's own cache
+        cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                              tool_ttl={"get_user_details": TOOL_CACHE_TTL},
+                              share_tool_answers=SEMANTIC_CACHE_SHARE_TOOL_ANSWERS)
+        METRICS.register_stats("semantic_cache", "Semantic answer cache hits, misses, hit rate and entries.",
+                               cache.stats)
+        return cache
+
+    @staticmethod
+    def _build_router():
+        from agent.router import FastPathRouter
+
+        return FastPathRouter(threshold=ROUTER_THRESHOLD)
+
+    @staticmethod
+    def _build_tool_selector():
+        from agent.tool_selector import ToolSelector
+
+        embeddings = None
+        if TOOL_SELECTION_EMBEDDING_MODEL:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+            embeddings = GoogleGenerativeAIEmbeddings(model=TOOL_SELECTION_EMBEDDING_MODEL)
+        return ToolSelector(top_k=TOOL_SELECTION_TOP_K, embeddings=embeddings)
+
+    def _evict_idle(self, now: float):
+        # The OrderedDict is kept in last-used order, so stale rooms are at the front.
+        while self._sessions:
+            room, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        room, _ = self._sessions.popitem(last=False)
+        self._room_tools.pop(room, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def __contains__(self, room):
+        with self._lock:
+            return room in self._sessions
+
+
+__all__ = ['AgentPool']
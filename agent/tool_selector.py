@@ -0,0 +1,149 @@
+"""
+Per-turn tool retrieval: describe only the tools a message is likely to need.
+
+Every tool an agent has is described in its prompt (the ReAct system text,
+or the function declarations in tool-calling mode), so input tokens grow
+with the catalog. ToolSelector embeds each tool's name and description once
+per process. Each turn it ranks the tools by similarity to the message,
+plus a weaker pull from the user's recent messages so follow-ups ("and for
+Lisbon?") keep their tool. The agent then runs with the top `top_k`.
+"""
+import json
+import re
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from agent.instrumentation import METRICS
+from agent.semantic_cache import HashingEmbedder, normalize_query
+
+# Words that carry no signal about which tool fits; they only add noise to hashed embeddings
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from get give how i in is it me my of on or please "
+    "show tell that the this to use what when where which who why will with would you your".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _content_words(text: str) -> str:
+    return " ".join(word for word in _WORD.findall(normalize_query(text)) if word not in _STOPWORDS)
+
+
+def tool_text(tool) -> str:
+    """What a tool is matched on: its name (split into words) and description."""
+    return _content_words(f"{tool.name.replace('_', ' ')} {tool.description}")
+
+
+def tool_prompt_tokens(tool) -> int:
+    """Approximate prompt cost of describing a tool: ~4 characters per token of name, description and args."""
+    return (len(tool.name) + len(tool.description) + len(json.dumps(tool.args))) // 4
+
+
+class ToolSelector:
+    """
+    Picks the `top_k` tools most relevant to a turn. Usually shared by every
+    agent in a process; tool vectors are cached by (name, description).
+
+    :param top_k: Tools kept per turn. Agents with at most this many tools are left alone.
+    :param embeddings: Embedding model; a HashingEmbedder by default.
+    :param history_weight: Weight of the recent user messages against the current one.
+    :param always: Tool names included on every turn, on top of the top_k.
+    """
+
+    def __init__(self, top_k: int = 4, embeddings=None, history_weight: float = 0.5,
+                 always: Sequence[str] = ()):
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        self.top_k = top_k
+        self.embeddings = embeddings or HashingEmbedder()
+        self.history_weight = history_weight
+        self.always = frozenset(always)
+        self._vectors = {}  # (name, description) -> unit vector
+        self._tokens = {}  # (name, description) -> prompt tokens
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._tools_offered = 0
+        self._tools_sent = 0
+        self._tokens_offered = 0
+        self._tokens_sent = 0
+
+    def _unit(self, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _tool_vectors(self, tools) -> np.ndarray:
+        keys = [(tool.name, tool.description) for tool in tools]
+        with self._lock:
+            missing = [tool for tool, key in zip(tools, keys) if key not in self._vectors]
+        if missing:
+            vectors = self.embeddings.embed_documents([tool_text(tool) for tool in missing])
+            with self._lock:
+                for tool, vector in zip(missing, vectors):
+                    key = (tool.name, tool.description)
+                    self._vectors[key] = self._unit(vector)
+        with self._lock:
+            return np.stack([self._vectors[key] for key in keys])
+
+    def rank(self, tools, message: str, history: Sequence[str] = ()) -> List[float]:
+        """Relevance score of each tool for the turn, in `tools` order."""
+        matrix = self._tool_vectors(tools)
+        scores = matrix @ self._unit(self.embeddings.embed_query(_content_words(message)))
+        context = _content_words(" ".join(history))
+        if context and self.history_weight:
+            scores = scores + self.history_weight * (matrix @ self._unit(self.embeddings.embed_query(context)))
+        return scores.tolist()
+
+    def select(self, tools, message: str, history: Sequence[str] = (), top_k: Optional[int] = None) -> list:
+        """
+        The tools to describe for this turn, in their original order (so
+        identical selections share one compiled prompt).
+        :param tools: Every tool the agent has.
+        :param message: The user's message.
+        :param history: The user's recent messages, oldest first.
+        """
+        top_k = top_k or self.top_k
+        tools = list(tools)
+        if len(tools) <= top_k:
+            selected = tools
+        else:
+            scores = self.rank(tools, message, history)
+            best = set(np.argsort(scores)[::-1][:top_k].tolist())
+            selected = [tool for i, tool in enumerate(tools) if i in best or tool.name in self.always]
+        self._record(tools, selected)
+        return selected
+
+    def _cost(self, tool) -> int:
+        # tool.args builds the pydantic JSON schema, so the estimate is cached too
+        key = (tool.name, tool.description)
+        tokens = self._tokens.get(key)
+        if tokens is None:
+            tokens = self._tokens[key] = tool_prompt_tokens(tool)
+        return tokens
+
+    def _record(self, tools, selected):
+        offered = sum(self._cost(tool) for tool in tools)
+        sent = sum(self._cost(tool) for tool in selected)
+        with self._lock:
+            self._turns += 1
+            self._tools_offered += len(tools)
+            self._tools_sent += len(selected)
+            self._tokens_offered += offered
+            self._tokens_sent += sent
+        METRICS.add_tool_tokens("offered", offered)
+        METRICS.add_tool_tokens("sent", sent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = self._turns
+            return {
+                "turns": turns,
+                "mean_tools_offered": self._tools_offered / turns if turns else 0.0,
+                "mean_tools_sent": self._tools_sent / turns if turns else 0.0,
+                "tool_tokens_offered": self._tokens_offered,
+                "tool_tokens_sent": self._tokens_sent,
+                "tool_token_reduction": 1 - self._tokens_sent / self._tokens_offered if self._tokens_offered else 0.0,
+            }
+
+
+__all__ = ['ToolSelector', 'tool_prompt_tokens', 'tool_text']
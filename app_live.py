@@ -1,18 +1,38 @@
-from flask import Flask, send_from_directory
-from flask_socketio import SocketIO, join_room, emit
-from agent.agent_base import ChatAgent
+from flask import Flask, Response, render_template, request, send_from_directory
+from flask_socketio import SocketIO, join_room, leave_room, emit
+from agent.instrumentation import METRICS, span
+from agent.session_pool import AgentPool
+from worker_pool import RoomWorkerPool, run_on_thread_loop
+from config import AGENT_MAX_WORKERS, AGENT_MAX_PENDING, AGENT_MAX_PENDING_PER_ROOM, HISTORY_PAGE_SIZE
+from config import SOCKETIO_MESSAGE_QUEUE, SOCKETIO_SERIALIZER
+from wire import WireEncoder
 import os
 
-app = Flask(__name__, static_folder="static")
-socketio = SocketIO(app, cors_allowed_origins="*")
+app = Flask(__name__, static_folder="static", template_folder="static")
+# With several worker processes (see gunicorn.conf.py) the message queue lets
+# any of them emit to a room whose socket is connected to another.
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE,
+                    serializer=SOCKETIO_SERIALIZER)
 
-# Initialize agent
-chat_agent = ChatAgent()
+# Compresses large event payloads for clients that can decode them
+wire = WireEncoder()
+
+# One agent (and memory) per room; the Gemini client and tools are shared
+agent_pool = AgentPool()
+
+# Agent turns run off the Socket.IO handler thread, in order per room
+worker_pool = RoomWorkerPool(
+    max_workers=AGENT_MAX_WORKERS,
+    max_pending=AGENT_MAX_PENDING,
+    max_pending_per_room=AGENT_MAX_PENDING_PER_ROOM,
+)
 
 
 @app.route('/')
 def index():
-    return send_from_directory('static', 'index.html')
+    # The page loads the Socket.IO client bundle matching the server's packet format
+    return render_template('index.html', socketio_serializer=SOCKETIO_SERIALIZER,
+                           wire_compression=wire.compression)
 
 
 @app.route('/static/<path:path>')
@@ -20,10 +40,102 @@ def send_static(path):
     return send_from_directory('static', path)
 
 
+@app.route('/metrics')
+def metrics():
+    # Prometheus scrape endpoint: per-stage turn latency histograms and token counts
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
+def transport_deflate():
+    # Extensions the browser offered on the WebSocket upgrade; simple-websocket accepts permessage-deflate
+    return 'permessage-deflate' in request.environ.get('HTTP_SEC_WEBSOCKET_EXTENSIONS', '')
+
+
+def history_page(rows):
+    """
+    Client payload for a page of stored messages. `rows` holds one more than
+    HISTORY_PAGE_SIZE when possible; its presence means older messages are left.
+    """
+    return {
+        'messages': [
+            {'seq': row['seq'], 'user': row['message'].content} if row['message'].type == 'human'
+            else {'seq': row['seq'], 'ai': row['message'].content}
+            for row in rows[-HISTORY_PAGE_SIZE:]
+        ],
+        'has_more': len(rows) > HISTORY_PAGE_SIZE,
+    }
+
+
 @socketio.on('join')
 def handle_join(data):
     room = data['room']
     join_room(room)
+    codec = wire.negotiate(room, request.sid, data.get('accept'), deflate=transport_deflate())
+    if 'tools' in data:
+        # Optional subset of the registered tools for this room's agent
+        try:
+            agent_pool.set_tools(room, data['tools'])
+        except ValueError as e:
+            emit('join_error', {'message': str(e)})
+
+    # Replay the stored conversation this client hasn't seen: everything after
+    # its last seen seq when that fits in a page, otherwise the latest page.
+    # A live agent is kept: each turn first syncs its memory with turns other
+    # workers stored for the room.
+    store = agent_pool.history_store
+    if store is not None:
+        last_seq = data.get('last_seq')
+        page = history_page(store.load_page(room, HISTORY_PAGE_SIZE + 1, after_seq=last_seq))
+        # A client whose copy is too far behind starts over from the latest page
+        page['reset'] = last_seq is None or page['has_more']
+        emit('history', wire.encode(page, codec))
+
+
+@socketio.on('leave')
+def handle_leave(data):
+    leave_room(data['room'])
+    wire.leave(request.sid, data['room'])
+
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    # Rooms are per socket, so the client's codec entries go with it
+    wire.leave(request.sid)
+
+
+@socketio.on('history_page')
+def handle_history_page(data):
+    # Scroll-back: the page of messages just before the oldest one the client has
+    store = agent_pool.history_store
+    if store is not None:
+        rows = store.load_page(data['room'], HISTORY_PAGE_SIZE + 1, before_seq=data['before_seq'])
+        emit('history_page', wire.encode(history_page(rows), wire.codec(() if transport_deflate() else data.get('accept', ()))))
+
+
+def run_turn(room, user_msg):
+    # The worker thread's own loop, so HTTP connection pools carry over between turns
+    run_on_thread_loop(stream_turn(room, user_msg))
+
+
+async def stream_turn(room, user_msg):
+    agent = agent_pool.get(room)
+    # Seqs the turn is stored under, so clients can resume from it
+    history = agent.memory.chat_memory if agent_pool.history_store is not None else None
+    if history is not None:
+        history.last_seqs = []
+
+    codec = wire.room_codec(room)
+    # Runs on a worker thread, so emit through the server rather than the request context
+    async for event in agent.astream_input(user_msg):
+        with span("socketio.emit", event=event["type"]):
+            if event["type"] == "final":
+                print(f"[DEBUG] AI response: {event['message']}")
+                payload = {'message': event['message']}
+                if history is not None and history.last_seqs:
+                    payload['user_seq'], payload['seq'] = history.last_seqs[0], history.last_seqs[-1]
+                socketio.emit('ai_message', wire.encode(payload, codec), to=room)
+            else:
+                socketio.emit('ai_chunk', wire.encode(event, codec), to=room)
 
 
 @socketio.on('message')
@@ -32,10 +144,8 @@ def handle_message(data):
     user_msg = data['message']
     print(f"[DEBUG] Message from room {room}: {user_msg}")
 
-    ai_response = chat_agent.handle_input(user_msg)
-
-    print(f"[DEBUG] AI response: {ai_response}")
-    emit('ai_message', {'message': ai_response}, room=room)
+    if not worker_pool.submit(room, run_turn, room, user_msg):
+        emit('busy', {'message': "The agent is busy right now, please try again in a moment."})
 
 
 if __name__ == '__main__':
@@ -10,6 +10,7 @@ from langchain.chains import LLMChain
 from langchain_core.messages import HumanMessage, AIMessage
 
 from HttpClient import HttpClient
+from agent.react_parser import IncrementalReActOutputParser, astream_react_step
 
 
 http_client = HttpClient()
@@ -140,7 +141,7 @@ llm_chain = LLMChain(llm=llm, prompt=prompt)
 agent = LLMSingleActionAgent(
     llm_chain=llm_chain,
     prompt=prompt,
-    output_parser=GeminiFlashOutputParser(),
+    output_parser=IncrementalReActOutputParser(),
     stop=["\nObservation:"],
     allowed_tools=[tool.name for tool in tools],
 )
@@ -166,43 +167,72 @@ def format_history(history: List[Dict[str, str]]) -> str:
     return "\n".join(lines)
 
 # --- Exposed function for chat agent ---
+# Tool descriptions never change after startup, so render them once
+TOOL_NAMES_STR = ", ".join([tool.name for tool in tools])
+TOOL_DESCRIPTIONS = "\n".join([f"{tool.name}: {tool.description}" for tool in tools])
+_REACT_MARKERS = ("Thought:", "Action:", "Observation:", "Final Answer:")
+
+
+def build_agent_scratchpad(history: List[Dict[str, str]]) -> str:
+    """Build agent_scratchpad from history for multi-turn ReAct agents."""
+    parts = []
+    for msg in history:
+        if msg.get('user'):
+            parts.append(f"Question: {msg['user']}\n")
+        if msg.get('ai'):
+            ai = str(msg['ai'])
+            if any(x in ai for x in _REACT_MARKERS):
+                parts.append(ai + "\n")
+    return "".join(parts)
+
+
 def run_agent_with_history(user_input: str, history: List[Dict[str, str]]) -> str:
     """
     Run the agent with chat history and return the AI's response using the agent executor (tool-calling).
     history: list of dicts with keys 'user' and 'ai'.
     """
-    tool_names_str = ", ".join([tool.name for tool in tools])
-    tool_descriptions = "\n".join([f"{tool.name}: {tool.description}" for tool in tools])
-    # Build agent_scratchpad from history for multi-turn ReAct agents
-    def build_agent_scratchpad(history: List[Dict[str, str]]) -> str:
-        scratchpad = ""
-        for msg in history:
-            if msg.get('user'):
-                scratchpad += f"Question: {msg['user']}\n"
-            if msg.get('ai'):
-                ai = str(msg['ai'])
-                if any(x in ai for x in ["Thought:", "Action:", "Observation:", "Final Answer:"]):
-                    scratchpad += ai + "\n"
-        return scratchpad
-    agent_scratchpad = build_agent_scratchpad(history)
     input_dict = {
         "input": user_input,
-        "tools": tool_descriptions,
-        "tool_names": tool_names_str,
-        "agent_scratchpad": agent_scratchpad,
+        "tools": TOOL_DESCRIPTIONS,
+        "tool_names": TOOL_NAMES_STR,
+        "agent_scratchpad": build_agent_scratchpad(history),
     }
     response = agent_executor.run(input_dict)
     return response
 
 
+async def arun_agent_streaming(user_input: str, max_iterations: int = 3) -> str:
+    """
+    Streamed version of the ReAct loop: each tool starts as soon as its
+    Action Input has been generated, and generation stops at "Observation:".
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    async def run_tool(action):
+        tool = tools_by_name.get(action.tool)
+        if tool is None:
+            return f"{action.tool} is not a valid tool, try one of [{TOOL_NAMES_STR}]."
+        return await tool.ainvoke(action.tool_input)
+
+    scratchpad = ""
+    for _ in range(max_iterations):
+        prompt_text = prompt.format(
+            input=user_input, tools=TOOL_DESCRIPTIONS, tool_names=TOOL_NAMES_STR, agent_scratchpad=scratchpad,
+        )
+        result, observation = await astream_react_step(llm.astream(prompt_text), run_tool)
+        if isinstance(result, AgentFinish):
+            return result.return_values["output"]
+        scratchpad += f"{result.log.rstrip()}\nObservation: {observation}\nThought: "
+    return "Agent stopped due to iteration limit."
+
 
 # Example run
 if __name__ == "__main__":
     query = "Get me user detail for this id a22a5fe7-fd06-4526-bd98-a9189283c25d"
     input_dict = {
         "input": query,
-        "tools": "\n".join([f"{tool.name}: {tool.description}" for tool in tools]),
-        "tool_names": ", ".join([tool.name for tool in tools]),
+        "tools": TOOL_DESCRIPTIONS,
+        "tool_names": TOOL_NAMES_STR,
         "agent_scratchpad": "",  # initial scratchpad (usually empty)
     }
     response = agent_executor.run(input_dict)
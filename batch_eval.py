@@ -0,0 +1,278 @@
+"""
+Offline batch runs of ChatAgent over a JSONL file of conversations, for
+regression checks and backfills of logged questions.
+
+    python batch_eval.py questions.jsonl results.jsonl --concurrency 16
+    python batch_eval.py questions.jsonl results.jsonl --fake   # scripted offline model, no API key
+
+Each input line is one conversation:
+
+    {"id": "c-1", "messages": ["get user 42", "and multiply 6 and 7"], "expected": "..."}
+    {"id": "c-2", "input": "what is the capital of France"}
+
+`id` defaults to the line number; any other fields are copied to the output.
+Conversations run concurrently, up to `--concurrency` at a time, each in a
+fresh agent with its own memory; turns within one conversation run in
+order, since every turn reads the memory of the previous ones. Each
+finished conversation is appended to the output as one line:
+
+    {"id": "c-1", "expected": "...", "turns": [{"input": ..., "output": ..., "latency_ms": ...,
+     "tools": [...]}, ...]}
+
+A turn that failed also has "error". The output doubles as the checkpoint:
+rerunning the same command skips the ids already in it (after dropping a
+line cut off by a crash), so an interrupted run resumes where it stopped.
+A conversation that fails outside the agent (e.g. building it) is logged
+and left out, so the next run retries it. A throughput report is printed
+as JSON at the end.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Iterable, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_conversations(path: str) -> Iterator[dict]:
+    """
+    Conversations from a JSONL file, as {"id", "messages", **other fields}.
+    :raise ValueError: On a line without "messages" or "input", or a repeated id.
+    """
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            messages = record.pop("messages", None)
+            if messages is None:
+                if "input" not in record:
+                    raise ValueError(f"{path}:{number}: expected \"messages\" or \"input\"")
+                messages = [record.pop("input")]
+            if isinstance(messages, str):
+                messages = [messages]
+            conversation_id = str(record.pop("id", number))
+            if conversation_id in seen:
+                raise ValueError(f"{path}:{number}: duplicate id {conversation_id}")
+            seen.add(conversation_id)
+            yield {"id": conversation_id, "messages": list(messages), **record}
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """
+    Ids already written to an output file. A trailing partial line (the
+    process died mid-write) is truncated so appending starts on a clean line.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        good = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                break
+            good += len(line)
+        if good < f.seek(0, os.SEEK_END):
+            logger.warning("Dropping a partial record at the end of %s", path)
+            f.truncate(good)
+    return done
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class BatchRunner:
+    """
+    Runs conversations through agents from an AgentPool with bounded
+    concurrency, streaming results to a JSONL file.
+
+    :param pool: Builds one agent per conversation; should not have a history
+        store, or batch turns are written to the chat history.
+    :param concurrency: Conversations in flight at once.
+    :param sync_every: Records written between fsyncs of the output.
+    :param progress_every: Seconds between progress log lines; 0 for none.
+    """
+
+    def __init__(self, pool, concurrency: int = 8, sync_every: int = 100, progress_every: float = 10.0):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if pool.max_sessions < concurrency:
+            raise ValueError("pool.max_sessions must be at least the concurrency, "
+                             "or agents are evicted mid-conversation")
+        self.pool = pool
+        self.concurrency = concurrency
+        self.sync_every = sync_every
+        self.progress_every = progress_every
+        self._reset()
+
+    def _reset(self):
+        self._written = 0
+        self._failed = 0
+        self._turns = 0
+        self._turn_errors = 0
+        self._latencies = []
+        self._start = time.perf_counter()
+
+    async def run_conversation(self, conversation: dict) -> dict:
+        """One conversation in a fresh agent, as its output record."""
+        room = f"batch:{conversation['id']}"
+        self.pool.evict(room)
+        agent = self.pool.get(room)
+        turns = []
+        try:
+            for message in conversation["messages"]:
+                start = time.perf_counter()
+                output = await agent.ahandle_input(message)
+                latency = time.perf_counter() - start
+                trace = agent.last_trace
+                turn = {"input": message, "output": output, "latency_ms": round(latency * 1e3, 3),
+                        "tools": sorted(tool for tool in trace.tools_used if tool)}
+                if trace.error is not None:
+                    turn["error"] = trace.error
+                    self._turn_errors += 1
+                turns.append(turn)
+                self._turns += 1
+                self._latencies.append(latency)
+        finally:
+            self.pool.evict(room)
+        # The inputs are in the turns; other fields (e.g. expected answers) are kept
+        return {**{key: value for key, value in conversation.items() if key != "messages"}, "turns": turns}
+
+    async def run(self, conversations: Iterable[dict], output_path: str, resume: bool = True) -> dict:
+        """
+        Run every conversation not already in `output_path` and append the results.
+        :param conversations: Dicts with "id" and "messages", e.g. from read_conversations.
+        :param resume: Skip ids already in the output; False starts it over.
+        :return: The throughput report.
+        """
+        self._reset()
+        done = load_checkpoint(output_path) if resume else set()
+        skipped = 0
+
+        def pending():
+            nonlocal skipped
+            for conversation in conversations:
+                if conversation["id"] in done:
+                    skipped += 1
+                else:
+                    yield conversation
+
+        todo = pending()
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+            async def worker():
+                # Workers share one iterator, so input is read only as fast as it is processed
+                for conversation in todo:
+                    try:
+                        record = await self.run_conversation(conversation)
+                    except Exception:
+                        self._failed += 1
+                        logger.exception("Conversation %s failed; it is retried on the next run",
+                                         conversation["id"])
+                        continue
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    self._written += 1
+                    if self.sync_every and self._written % self.sync_every == 0:
+                        os.fsync(out.fileno())
+
+            progress = asyncio.ensure_future(self._log_progress()) if self.progress_every else None
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            finally:
+                if progress is not None:
+                    progress.cancel()
+                out.flush()
+                os.fsync(out.fileno())
+        return self.report(skipped)
+
+    async def _log_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_every)
+            elapsed = time.perf_counter() - self._start
+            logger.info("%d conversations, %d turns in %.0fs (%.2f turns/s)",
+                        self._written, self._turns, elapsed, self._turns / elapsed)
+
+    def report(self, skipped: int = 0) -> dict:
+        elapsed = time.perf_counter() - self._start
+        latencies = self._latencies
+        return {
+            "conversations": self._written,
+            "skipped": skipped,
+            "failed": self._failed,
+            "turns": self._turns,
+            "turn_errors": self._turn_errors,
+            "concurrency": self.concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "conversations_per_s": round(self._written / elapsed, 3) if elapsed else 0.0,
+            "turns_per_s": round(self._turns / elapsed, 3) if elapsed else 0.0,
+            "turn_latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1e3, 3),
+                "p95": round(percentile(latencies, 95) * 1e3, 3),
+                "p99": round(percentile(latencies, 99) * 1e3, 3),
+            },
+        }
+
+
+def build_pool(concurrency: int, fake: bool = False, fake_latency: float = 0.2):
+    """An AgentPool for batch runs: no chat history, room for every conversation in flight."""
+    from agent.session_pool import AgentPool
+
+    llm = None
+    if fake:
+        sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+        from fake_gemini import FakeGeminiChatModel
+
+        llm = FakeGeminiChatModel(latency=fake_latency)
+    return AgentPool(max_sessions=concurrency, llm=llm, history_store=None)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of conversations")
+    parser.add_argument("output", help="JSONL results, appended to and resumed from")
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations in flight")
+    parser.add_argument("--agent-mode", choices=("react", "tool_calling"), help="default: AGENT_MODE")
+    parser.add_argument("--overwrite", action="store_true", help="start the output over instead of resuming")
+    parser.add_argument("--fake", action="store_true", help="use the scripted offline model (benchmarks/fake_gemini.py)")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="fake model seconds to first token")
+    parser.add_argument("--progress", type=float, default=10.0, help="seconds between progress lines; 0 for none")
+    parser.add_argument("--report", help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.agent_mode:
+        os.environ["AGENT_MODE"] = args.agent_mode  # read when config is first imported
+    pool = build_pool(args.concurrency, fake=args.fake, fake_latency=args.fake_latency)
+    runner = BatchRunner(pool, concurrency=args.concurrency, progress_every=args.progress)
+    report = asyncio.run(runner.run(read_conversations(args.input), args.output, resume=not args.overwrite))
+    llm_stats = pool.llm_stats()
+    if llm_stats:
+        report["llm"] = llm_stats
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+__all__ = ['BatchRunner', 'build_pool', 'load_checkpoint', 'read_conversations']
+
+
+if __name__ == "__main__":
+    main()
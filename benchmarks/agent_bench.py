@@ -0,0 +1,171 @@
+"""
+Offline throughput / latency benchmark for ChatAgent and the Socket.IO server.
+
+Gemini is replaced by FakeGeminiChatModel (benchmarks/fake_gemini.py), so runs
+are deterministic and need no API key or network. N simulated rooms each send
+`--turns` messages in order while rooms run concurrently.
+
+    python benchmarks/agent_bench.py --target agent --rooms 20 --turns 5
+    python benchmarks/agent_bench.py --target socketio --rooms 20 --agent-mode tool_calling
+    python benchmarks/agent_bench.py --output bench.json   # JSON for CI comparison
+
+Reports p50/p95/p99 turn latency, turns/sec, traced memory growth per turn,
+and LLM / tool-call counts.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_gemini import FakeGeminiChatModel  # noqa: E402
+
+QUESTIONS = [
+    "hi there",
+    "get user detail for 123",
+    "multiply 3 and 4",
+    "get user 456 and multiply 6 and 7",
+    "what is the capital of France",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_agent(pool, rooms, turns, concurrency):
+    """Drive ChatAgent.handle_input directly; one thread per room, rooms in parallel."""
+    latencies = []
+    lock = threading.Lock()
+
+    def room_session(room):
+        for turn in range(turns):
+            start = time.perf_counter()
+            pool.get(room).handle_input(QUESTIONS[turn % len(QUESTIONS)])
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(room_session, [f"room_{i}" for i in range(rooms)]))
+    return latencies
+
+
+def run_socketio(pool, rooms, turns, concurrency, timeout=60):
+    """
+    Drive app_live end to end through Flask-SocketIO test clients.
+    :return: (latencies of answered turns, number of turns rejected as busy)
+    """
+    import app_live
+
+    app_live.agent_pool = pool
+    latencies = []
+    busy = [0]
+    lock = threading.Lock()
+
+    def room_session(room):
+        client = app_live.socketio.test_client(app_live.app)
+        client.emit('join', {'room': room})
+        for turn in range(turns):
+            start = time.perf_counter()
+            client.emit('message', {'room': room, 'message': QUESTIONS[turn % len(QUESTIONS)]})
+            while True:
+                events = [e['name'] for e in client.get_received()]
+                if 'ai_message' in events or 'busy' in events:
+                    break
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"{room} got no reply within {timeout}s")
+                time.sleep(0.001)
+            with lock:
+                # A busy reply is a rejected turn, not a fast one
+                if 'ai_message' in events:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    busy[0] += 1
+        client.disconnect()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(room_session, [f"room_{i}" for i in range(rooms)]))
+    return latencies, busy[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("agent", "socketio"), default="agent")
+    parser.add_argument("--agent-mode", choices=("react", "tool_calling"), default="react")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=None, help="rooms in flight (default: all)")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    os.environ["AGENT_MODE"] = args.agent_mode
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    from agent.session_pool import AgentPool
+
+    llm = FakeGeminiChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    pool = AgentPool(llm=llm, max_sessions=max(args.rooms, 1), history_store=None)
+    pool.get("warmup")  # build the shared tools outside the measurement
+    pool.evict("warmup")
+    llm.reset_counters()
+
+    concurrency = args.concurrency or args.rooms
+    tracemalloc.start()
+    mem_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    busy = 0
+    if args.target == "agent":
+        latencies = run_agent(pool, args.rooms, args.turns, concurrency)
+    else:
+        latencies, busy = run_socketio(pool, args.rooms, args.turns, concurrency)
+    elapsed = time.perf_counter() - start
+    mem_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    turns = len(latencies)
+    counters = llm.counters
+    report = {
+        "target": args.target,
+        "agent_mode": args.agent_mode,
+        "rooms": args.rooms,
+        "turns": turns,
+        "busy_replies": busy,
+        "concurrency": concurrency,
+        "fake_latency_s": args.latency,
+        "fake_tokens_per_second": args.tokens_per_second,
+        "elapsed_s": round(elapsed, 4),
+        "turns_per_s": round(turns / elapsed, 3) if elapsed else 0.0,
+        "latency_s": {
+            "mean": round(statistics.mean(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+        },
+        "memory_growth_bytes_per_turn": int((mem_after - mem_before) / turns) if turns else 0,
+        "llm_calls": counters["llm_calls"],
+        "llm_calls_per_turn": round(counters["llm_calls"] / turns, 3) if turns else 0.0,
+        "tool_calls": counters["tool_calls"],
+        "prompt_chars_per_turn": int(counters["prompt_chars"] / turns) if turns else 0,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+app_live wired to the scripted fake model, as a WSGI target for load tests:
+
+    HISTORY_BACKEND=none GOOGLE_API_KEY=offline \
+        gunicorn -c gunicorn.conf.py --pythonpath benchmarks fake_app:app
+
+FAKE_LLM_LATENCY / FAKE_LLM_TOKENS_PER_SECOND tune the fake model.
+"""
+import os
+
+from fake_gemini import FakeGeminiChatModel
+
+import app_live
+from agent.session_pool import AgentPool
+
+app_live.agent_pool = AgentPool(
+    llm=FakeGeminiChatModel(
+        latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+        tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "100000")),
+    ),
+    history_store=None,
+)
+app = app_live.app
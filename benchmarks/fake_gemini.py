@@ -0,0 +1,159 @@
+"""
+Deterministic, offline stand-in for ChatGoogleGenerativeAI.
+
+Replies are scripted from the last user input, with a configurable delay
+before the first token and a token rate after it:
+
+- "get user <id>" / "user detail for <id>"  -> get_user_details(<id>)
+- "multiply 3 and 4" / "3 * 4"              -> calculator("3 * 4")
+- anything else                             -> a final answer
+
+Works with both ChatAgent modes: in "react" mode it answers with the
+chat-conversational JSON blob, one tool per round-trip; once tools are bound
+("tool_calling" mode) it requests every planned tool call at once.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+_USER = re.compile(r"user\D{0,20}?(\d+)", re.IGNORECASE)
+_PRODUCT = re.compile(r"(\d+)\s*(?:\*|x|times|and)\s*(\d+)", re.IGNORECASE)
+
+
+def plan_tool_calls(text: str):
+    """Tool calls the scripted model wants for a user input, in order."""
+    calls = [("get_user_details", {"id": user_id}) for user_id in _USER.findall(text)]
+    if "multiply" in text.lower() or "*" in text:
+        for a, b in _PRODUCT.findall(text):
+            calls.append(("calculator", {"expression": f"{a} * {b}"}))
+    return calls
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+class FakeGeminiChatModel(BaseChatModel):
+    latency: float = 0.2  # seconds before the first token
+    tokens_per_second: float = 200.0
+    answer_tokens: int = 40  # words in a final answer
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _counters: dict = PrivateAttr(default_factory=lambda: {"llm_calls": 0, "tool_calls": 0, "prompt_chars": 0})
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    @property
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset_counters(self):
+        with self._lock:
+            for key in self._counters:
+                self._counters[key] = 0
+
+    # ------------------------- Script -------------------------
+    def _answer(self, prefix: str) -> str:
+        filler = " ".join(f"word{i}" for i in range(max(self.answer_tokens - len(prefix.split()), 0)))
+        return f"{prefix} {filler}".strip()
+
+    def _respond(self, messages: List[BaseMessage], tools) -> AIMessage:
+        last = _text(messages[-1])
+        if tools:
+            if isinstance(messages[-1], ToolMessage):
+                return AIMessage(content=self._answer("Here is what I found."))
+            user_input = last
+            calls = plan_tool_calls(user_input)
+            if calls:
+                return AIMessage(content="", tool_calls=[
+                    {"name": name, "args": args, "id": f"call_{i}"} for i, (name, args) in enumerate(calls)
+                ])
+            return AIMessage(content=self._answer("Sure."))
+
+        # react: find the user's input and how many tool responses followed it
+        done = 0
+        user_input = last
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                if _text(message).startswith("TOOL RESPONSE"):
+                    done += 1
+                else:
+                    user_input = _text(message)
+                    break
+        calls = plan_tool_calls(user_input.split("USER'S INPUT")[-1])
+        if done < len(calls):
+            name, args = calls[done]
+            action_input = args.get("id", args.get("expression"))
+            blob = {"action": name, "action_input": action_input}
+        else:
+            blob = {"action": "Final Answer", "action_input": self._answer("Here is what I found." if done else "Sure.")}
+        return AIMessage(content="```json\n" + json.dumps(blob) + "\n```")
+
+    def _record(self, messages, message: AIMessage):
+        with self._lock:
+            self._counters["llm_calls"] += 1
+            self._counters["tool_calls"] += len(message.tool_calls)
+            self._counters["prompt_chars"] += sum(len(_text(m)) for m in messages)
+            if '"action": "' in _text(message) and '"Final Answer"' not in _text(message):
+                self._counters["tool_calls"] += 1
+
+    def _tokens(self, message: AIMessage):
+        return re.findall(r"\S+\s*", _text(message)) or [""]
+
+    # ------------------------- Chat model API -------------------------
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        message = self._respond(messages, tools)
+        self._record(messages, message)
+        time.sleep(self.latency + len(self._tokens(message)) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        message = self._respond(messages, tools)
+        self._record(messages, message)
+        await asyncio.sleep(self.latency + len(self._tokens(message)) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage):
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        for token in self._tokens(message):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None, **kwargs):
+        message = self._respond(messages, tools)
+        self._record(messages, message)
+        time.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            time.sleep(1 / self.tokens_per_second)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, **kwargs):
+        message = self._respond(messages, tools)
+        self._record(messages, message)
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(1 / self.tokens_per_second)
@@ -0,0 +1,154 @@
+"""
+Bursty-load benchmark of the LLM gateway (agent/llm_gateway.py) against a
+local fake endpoint that enforces a requests-per-second quota and answers
+429 above it, like Gemini does per minute.
+
+    python benchmarks/gateway_bench.py
+    python benchmarks/gateway_bench.py --calls 400 --threads 80 --quota-rps 20 --output gateway.json
+
+Runs the same burst twice, with a mix of interactive and background calls:
+
+- direct: every caller hits the endpoint itself and retries a 429 once after
+  a fixed backoff (what each ChatGoogleGenerativeAI client does on its own)
+- gateway: calls go through a GatewayChatModel whose token bucket matches
+  the quota, interactive ahead of background, with jittered 429 retries
+
+Reports completed / failed calls, 429s seen by the endpoint, throughput and
+per-lane latency.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_gemini import FakeGeminiChatModel  # noqa: E402
+from pydantic import PrivateAttr  # noqa: E402
+
+from agent.llm_gateway import GatewayChatModel, LLMGateway  # noqa: E402
+
+
+class QuotaExceeded(Exception):
+    code = 429
+
+
+class QuotaFakeChatModel(FakeGeminiChatModel):
+    """FakeGeminiChatModel behind a sliding one-second request quota."""
+
+    quota_rps: int = 10
+    _window: deque = PrivateAttr(default_factory=deque)
+    _rejected: int = PrivateAttr(default=0)
+
+    def _admit(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0] >= 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.quota_rps:
+                self._rejected += 1
+                raise QuotaExceeded("429 Resource has been exhausted (e.g. check quota).")
+            self._window.append(now)
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs):
+        self._admit()
+        return super()._generate(messages, stop, run_manager, tools=tools, **kwargs)
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+
+def direct_call(llm, question, retry_delay):
+    try:
+        return llm.invoke(question)
+    except QuotaExceeded:
+        time.sleep(retry_delay)
+        return llm.invoke(question)
+
+
+def run(mode: str, args) -> dict:
+    endpoint = QuotaFakeChatModel(latency=args.latency, tokens_per_second=100000, quota_rps=args.quota_rps)
+    gateway = LLMGateway(rpm=args.quota_rps * 60, burst_seconds=1, retry_base_delay=0.05, retry_max_delay=1)
+    llm = GatewayChatModel(inner=endpoint, gateway=gateway)
+    lanes = {"interactive": llm, "background": llm.with_lane("background")}
+
+    rng = random.Random(0)
+    jobs = ["background" if rng.random() < args.background_share else "interactive" for _ in range(args.calls)]
+    latencies = {"interactive": [], "background": []}
+    failures = 0
+    lock = threading.Lock()
+
+    def one(lane):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            if mode == "gateway":
+                lanes[lane].invoke("hi there")
+            else:
+                direct_call(endpoint, "hi there", args.direct_retry_delay)
+        except QuotaExceeded:
+            with lock:
+                failures += 1
+            return
+        with lock:
+            latencies[lane].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(one, jobs))
+    elapsed = time.perf_counter() - start
+
+    def summary(values):
+        if not values:
+            return {}
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "p50_s": round(statistics.median(values), 3),
+            "p95_s": round(values[int(0.95 * (len(values) - 1))], 3),
+        }
+
+    completed = sum(len(v) for v in latencies.values())
+    result = {
+        "mode": mode,
+        "completed": completed,
+        "failed": failures,
+        "endpoint_429s": endpoint.rejected,
+        "elapsed_s": round(elapsed, 3),
+        "completed_per_s": round(completed / elapsed, 2),
+        "latency": {lane: summary(values) for lane, values in latencies.items()},
+    }
+    if mode == "gateway":
+        result["gateway"] = gateway.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--quota-rps", type=int, default=20, help="requests per second the fake endpoint allows")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    parser.add_argument("--background-share", type=float, default=0.2)
+    parser.add_argument("--direct-retry-delay", type=float, default=0.1)
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    report = {"quota_rps": args.quota_rps, "results": [run("direct", args), run("gateway", args)]}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
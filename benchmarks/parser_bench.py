@@ -0,0 +1,142 @@
+"""
+Benchmark of the incremental ReAct parser (agent/react_parser.py) against
+GeminiFlashOutputParser (archive/gemini_langchain_agent.py) on long outputs.
+
+    python benchmarks/parser_bench.py
+    python benchmarks/parser_bench.py --sizes 1000 100000 --chunk-chars 4 --output parser.json
+
+For each output size it reports:
+
+- full-text parse time of both parsers (action and final-answer outputs)
+- streaming: CPU time to feed every chunk to StreamingReActParser, against
+  re-running GeminiFlashOutputParser on the accumulated text after each chunk
+  (the only way to act on a tool call before generation ends with it)
+- how much of the output had been generated when the action became available
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "archive"))  # after ROOT: archive/agent.py would shadow the package
+
+# The archived module reads these at import and builds (but never calls) a Gemini client
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("TM_HOST", "http://localhost")
+
+from langchain_core.exceptions import OutputParserException  # noqa: E402
+
+from agent.react_parser import IncrementalReActOutputParser, StreamingReActParser  # noqa: E402
+from gemini_langchain_agent import GeminiFlashOutputParser  # noqa: E402
+
+
+def action_output(size: int, trailing: bool = False) -> str:
+    """
+    A long Thought and the action. With `trailing`, also the hallucinated
+    observation a model keeps generating when nothing stops it.
+    """
+    thought = "Thought: " + ("let me think about which tool fits this question. " * (size // 50 + 1))[:size]
+    text = thought + "\nAction: MultiplyNumbers\nAction Input: 5 7\n"
+    if trailing:
+        text += "Observation: 35\nThought: I now know the final answer\nFinal Answer: 35"
+    return text
+
+
+def final_output(size: int) -> str:
+    answer = ("The answer spans many lines of text.\n" * (size // 37 + 1))[:size]
+    return "Thought: I now know the final answer\nFinal Answer: " + answer
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stream_new(chunks):
+    parser = StreamingReActParser()
+    consumed = 0
+    action_at = None
+    for chunk in chunks:
+        consumed += len(chunk)
+        if parser.feed(chunk) is not None and action_at is None:
+            action_at = consumed
+        if parser.stopped:
+            break
+    parser.finish()
+    return action_at
+
+
+def stream_old(chunks, parser):
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        try:
+            parser.parse(text)
+        except OutputParserException:
+            pass
+
+
+def measure(size: int, chunk_chars: int, repeat: int) -> dict:
+    old, new = GeminiFlashOutputParser(), IncrementalReActOutputParser()
+    action_text, final_text = action_output(size), final_output(size)
+    assert old.parse(action_text).tool == new.parse(action_text).tool == "MultiplyNumbers"
+    assert old.parse(final_text).return_values == new.parse(final_text).return_values
+
+    streamed = action_output(size, trailing=True)
+    chunks = [streamed[i:i + chunk_chars] for i in range(0, len(streamed), chunk_chars)]
+    action_at = stream_new(chunks)
+    result = {
+        "size_chars": len(streamed),
+        "parse_action_us": {
+            "gemini_flash": round(best_of(lambda: old.parse(action_text), repeat) * 1e6, 1),
+            "incremental": round(best_of(lambda: new.parse(action_text), repeat) * 1e6, 1),
+        },
+        "parse_final_us": {
+            "gemini_flash": round(best_of(lambda: old.parse(final_text), repeat) * 1e6, 1),
+            "incremental": round(best_of(lambda: new.parse(final_text), repeat) * 1e6, 1),
+        },
+        "stream_chunks": len(chunks),
+        "stream_ms": {
+            "incremental": round(best_of(lambda: stream_new(chunks), repeat) * 1e3, 3),
+        },
+        # Share of the output generated before the tool could start
+        "action_available_at": {
+            "gemini_flash": 1.0,
+            "incremental": round(action_at / len(streamed), 4),
+        },
+    }
+    # Re-parsing after every chunk is quadratic; skip it where it would take minutes
+    if len(chunks) <= 20000:
+        result["stream_ms"]["gemini_flash_reparse"] = round(
+            best_of(lambda: stream_old(chunks, old), 1) * 1e3, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--chunk-chars", type=int, default=4, help="characters per streamed chunk (~1 token)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    report = {
+        "chunk_chars": args.chunk_chars,
+        "results": [measure(size, args.chunk_chars, args.repeat) for size in args.sizes],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
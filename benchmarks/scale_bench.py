@@ -0,0 +1,155 @@
+"""
+Multi-worker load test for the production launch mode (gunicorn.conf.py).
+
+For each worker count, starts gunicorn serving benchmarks/fake_app.py (the
+real app_live on the scripted fake model), connects `--clients` WebSocket
+clients spread over several client processes, and has each run `--turns`
+turns in its own room. With the fake model answering instantly, a turn is
+CPU-bound agent work, so turns/sec should scale close to linearly with
+workers up to the number of cores.
+
+    python benchmarks/scale_bench.py --workers 1 2 4 --clients 32 --turns 10
+    python benchmarks/scale_bench.py --output scale.json
+
+Needs gunicorn and the Socket.IO client (python-socketio[client]).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTIONS = ["hi there", "multiply 3 and 4", "get user detail for 123", "what is the capital of France"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, threads: int):
+    env = dict(os.environ, SERVER_BIND=f"127.0.0.1:{port}", SERVER_WORKERS=str(workers),
+               SERVER_THREADS=str(threads), HISTORY_BACKEND="none",
+               SERVER_ALLOW_NO_MESSAGE_QUEUE="true",  # every client has a room of its own
+               GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline-benchmark"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--pythonpath", "benchmarks", "fake_app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                break
+        except OSError:
+            time.sleep(0.2)
+    else:
+        server.kill()
+        raise RuntimeError("gunicorn did not start")
+    time.sleep(workers * 0.5)  # let every worker finish importing the app
+    return server
+
+
+def run_client(args):
+    """
+    One client process: `count` rooms in threads.
+    :return: (latencies of answered turns, number of turns rejected as busy)
+    """
+    url, first_room, count, turns, warmup = args
+    import socketio
+
+    latencies, busy, lock = [], [0], threading.Lock()
+
+    def room_session(room):
+        client = socketio.Client()
+        replies = queue.Queue()
+        client.on('ai_message', lambda data: replies.put('ai_message'))
+        client.on('busy', lambda data: replies.put('busy'))
+        client.connect(url, transports=['websocket'])
+        client.emit('join', {'room': room})
+        for turn in range(warmup + turns):
+            start = time.perf_counter()
+            client.emit('message', {'room': room, 'message': QUESTIONS[turn % len(QUESTIONS)]})
+            reply = replies.get(timeout=120)
+            if turn >= warmup:
+                with lock:
+                    # A busy reply is a rejected turn, not a fast one
+                    if reply == 'ai_message':
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        busy[0] += 1
+        client.disconnect()
+
+    threads = [threading.Thread(target=room_session, args=(f"room_{first_room + i}",)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, busy[0]
+
+
+def measure(workers, clients, turns, client_procs, threads):
+    port = free_port()
+    server = start_server(workers, port, threads)
+    try:
+        per_proc = [clients // client_procs + (1 if i < clients % client_procs else 0) for i in range(client_procs)]
+        jobs, first = [], 0
+        for count in per_proc:
+            if count:
+                jobs.append((f"http://127.0.0.1:{port}", first, count, turns, 1))
+                first += count
+        start = time.perf_counter()
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.map(run_client, jobs)
+        latencies = [lat for result, _ in results for lat in result]
+        busy = sum(count for _, count in results)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    latencies.sort()
+    return {
+        "workers": workers,
+        "turns": len(latencies),
+        "busy_replies": busy,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(latencies) / elapsed, 2),
+        "latency_p50_s": round(statistics.median(latencies), 4) if latencies else 0.0,
+        "latency_p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 4) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--client-procs", type=int, default=max(multiprocessing.cpu_count() // 2, 1))
+    parser.add_argument("--threads", type=int, default=100, help="gunicorn threads per worker")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    results = [measure(n, args.clients, args.turns, args.client_procs, args.threads) for n in args.workers]
+    base = results[0]["turns_per_s"] / results[0]["workers"]
+    for result in results:
+        result["speedup"] = round(result["turns_per_s"] / results[0]["turns_per_s"], 2)
+        result["scaling_efficiency"] = round(result["turns_per_s"] / (base * result["workers"]), 2)
+
+    report = {"cpu_count": multiprocessing.cpu_count(), "clients": args.clients, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Startup import-time guard for the Socket.IO server.
+
+Imports a module in a fresh interpreter under `python -X importtime` and fails
+(exit code 1) when the cumulative import time goes over budget, or when a
+module that should only load on first use is imported at startup.
+
+    python benchmarks/startup_importtime.py
+    python benchmarks/startup_importtime.py --module app_live --budget-ms 600 --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must stay lazy (loaded on the first agent turn).
+FORBIDDEN_AT_STARTUP = ("archive", "langchain", "langchain_core", "langchain_google_genai",
+                        "langgraph", "tools.user_tools")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure(module: str):
+    """
+    Import `module` once in a subprocess.
+    :return: (cumulative microseconds for `module`, set of every imported module name)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    total, imported = None, set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module and len(match.group(3)) == 1:
+            total = int(match.group(2))
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app_live")
+    parser.add_argument("--budget-ms", type=float, default=600.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings, imported = [], set()
+    for _ in range(args.runs):
+        total, modules = measure(args.module)
+        timings.append(total / 1000)
+        imported |= modules
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms, min {min(timings):.1f} ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    leaked = sorted(m for m in imported
+                    if any(m == f or m.startswith(f + ".") for f in FORBIDDEN_AT_STARTUP))
+    failed = False
+    if leaked:
+        print("FAIL: imported at startup but should be lazy: " + ", ".join(leaked[:10]))
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
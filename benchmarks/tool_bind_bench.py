@@ -0,0 +1,95 @@
+"""
+Cost of binding a tool catalog to the chat model, as every tool-calling
+ChatAgent does when it is built (once per room), with and without the
+registry's per-process schema cache (tools/registry.py).
+
+    python benchmarks/tool_bind_bench.py
+    python benchmarks/tool_bind_bench.py --sizes 10 100 500 --rooms 20 --output bind.json
+
+Uses ChatGoogleGenerativeAI (no request is made) when langchain_google_genai
+is installed, FakeGeminiChatModel otherwise.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.tools import StructuredTool  # noqa: E402
+
+from tools.registry import ToolRegistry, ToolSpec  # noqa: E402
+
+
+def make_tool(i: int) -> StructuredTool:
+    def lookup(user_id: str, limit: int = 10, tags: Optional[List[str]] = None) -> str:
+        return f"{i}:{user_id}"
+
+    return StructuredTool.from_function(
+        lookup, name=f"catalog_tool_{i}",
+        description=f"Looks up record type {i} for a user, optionally filtered by tags.",
+    )
+
+
+def build_llm():
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+        return ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+    except ImportError:
+        from fake_gemini import FakeGeminiChatModel
+
+        return FakeGeminiChatModel()
+
+
+def measure(llm, size: int, rooms: int) -> dict:
+    names = [f"catalog_tool_{i}" for i in range(size)]
+    for i, name in enumerate(names):
+        globals().setdefault(name, make_tool(i))  # resolved by the registry as "__main__:<name>"
+    registry = ToolRegistry([ToolSpec(name, f"__main__:{name}") for name in names], entry_point_group=None)
+    tools = registry.load(names)
+
+    def per_room(bind):
+        timings = []
+        for _ in range(rooms):
+            start = time.perf_counter()
+            bind()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    direct = per_room(lambda: llm.bind_tools(tools))
+    cached = per_room(lambda: llm.bind_tools(registry.schemas(tools)))
+    return {
+        "tools": size,
+        "rooms": rooms,
+        "bind_ms_per_room": {
+            "tool_objects": round(sum(direct) / rooms * 1e3, 3),
+            "registry_schemas": round(sum(cached[1:]) / max(rooms - 1, 1) * 1e3, 3),
+        },
+        # The first room pays for deriving the schemas
+        "registry_first_room_ms": round(cached[0] * 1e3, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--rooms", type=int, default=10, help="agents built per catalog size")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    llm = build_llm()
+    report = {"model": type(llm).__name__, "results": [measure(llm, size, args.rooms) for size in args.sizes]}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Recall and prompt savings of per-turn tool retrieval (agent/tool_selector.py)
+on a labeled test set, over the built-in tools plus a catalog of realistic
+business tools with docstring-style descriptions.
+
+    python benchmarks/tool_selection_bench.py
+    python benchmarks/tool_selection_bench.py --top-k 2 4 8 --output selection.json
+
+For each top_k it reports:
+
+- recall: share of the tools a case needs that were selected
+- full_recall: share of cases where every needed tool was selected
+- tool tokens: estimated prompt tokens of the tool descriptions, all tools
+  against the selection (what ToolSelector.stats() and /metrics report)
+- react_prompt_tokens: size of the whole rendered ReAct system prompt
+- select_us: selection time per turn
+
+The default HashingEmbedder only matches shared words; pass
+--embedding-model models/text-embedding-004 (needs GOOGLE_API_KEY) to
+measure Gemini embeddings, as TOOL_SELECTION_EMBEDDING_MODEL configures.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.tools import StructuredTool  # noqa: E402
+
+from agent.prompts import render_react_prefix  # noqa: E402
+from agent.tool_selector import ToolSelector  # noqa: E402
+from tools.registry import registry  # noqa: E402
+
+# name -> (description, argument names)
+CATALOG = {
+    "get_weather": ("""Gets the current weather and a 3-day forecast for a city.
+        Args:
+            city (str): City name, e.g. "Lisbon".
+        Returns:
+            dict: temperature, conditions, wind and precipitation chance per day.""", ["city"]),
+    "convert_currency": ("""Converts an amount of money between two currencies at today's exchange rate.
+        Args:
+            amount (float): Amount to convert.
+            source (str): ISO currency code, e.g. "USD".
+            target (str): ISO currency code, e.g. "EUR".""", ["amount", "source", "target"]),
+    "search_documents": ("""Full-text search over the internal knowledge base, wiki pages and policy documents.
+        Returns the ten best matching documents with title, url and a snippet.
+        Args:
+            query (str): Search terms.""", ["query"]),
+    "create_ticket": ("""Opens a support ticket in the helpdesk for a user problem or request.
+        Args:
+            title (str): Short summary of the issue.
+            description (str): Details, steps to reproduce.
+            priority (str): low, normal, high or urgent.""", ["title", "description", "priority"]),
+    "get_ticket_status": ("""Looks up a helpdesk support ticket by its id and returns status, assignee and latest comment.
+        Args:
+            ticket_id (str): e.g. "HD-4211".""", ["ticket_id"]),
+    "list_calendar_events": ("""Lists calendar events and meetings for a user between two dates.
+        Args:
+            user_id (str): The user whose calendar to read.
+            start (str): ISO date.
+            end (str): ISO date.""", ["user_id", "start", "end"]),
+    "schedule_meeting": ("""Schedules a meeting: finds a free slot for all attendees and sends calendar invites.
+        Args:
+            attendees (list): User ids or emails.
+            duration_minutes (int): Meeting length.
+            topic (str): Meeting title.""", ["attendees", "duration_minutes", "topic"]),
+    "send_email": ("""Sends an email on behalf of the assistant.
+        Args:
+            to (str): Recipient email address.
+            subject (str): Subject line.
+            body (str): Plain-text body.""", ["to", "subject", "body"]),
+    "get_order_status": ("""Returns the status of a customer order: payment, shipping carrier, tracking number and delivery estimate.
+        Args:
+            order_id (str): e.g. "ORD-99812".""", ["order_id"]),
+    "refund_order": ("""Issues a full or partial refund for a customer order back to the original payment method.
+        Args:
+            order_id (str): The order to refund.
+            amount (float): Amount to refund; omit for a full refund.""", ["order_id", "amount"]),
+    "get_invoice": ("""Fetches an invoice PDF link and line items for a billing account and month.
+        Args:
+            account_id (str): Billing account.
+            month (str): e.g. "2024-05".""", ["account_id", "month"]),
+    "get_stock_price": ("""Returns the latest stock quote for a ticker symbol: price, daily change and volume.
+        Args:
+            symbol (str): e.g. "GOOG".""", ["symbol"]),
+    "translate_text": ("""Translates text into another language.
+        Args:
+            text (str): Text to translate.
+            target_language (str): e.g. "German".""", ["text", "target_language"]),
+    "summarize_url": ("""Downloads a web page and returns a short summary of its content.
+        Args:
+            url (str): Page address.""", ["url"]),
+    "get_team_members": ("""Lists the members of a team with their roles and manager.
+        Args:
+            team (str): Team name, e.g. "Platform".""", ["team"]),
+    "request_time_off": ("""Files a vacation or sick leave request for a user for approval by their manager.
+        Args:
+            user_id (str): The employee.
+            start (str): First day off, ISO date.
+            end (str): Last day off, ISO date.""", ["user_id", "start", "end"]),
+    "get_leave_balance": ("""Returns how many vacation and sick leave days a user has left this year.
+        Args:
+            user_id (str): The employee.""", ["user_id"]),
+    "book_meeting_room": ("""Books an office meeting room for a time slot.
+        Args:
+            building (str): Office building.
+            start (str): ISO datetime.
+            duration_minutes (int): Booking length.""", ["building", "start", "duration_minutes"]),
+    "get_server_metrics": ("""Returns CPU, memory and error rate metrics of a production service over the last hour.
+        Args:
+            service (str): Service name.""", ["service"]),
+    "restart_service": ("""Restarts a deployed service in the given environment. Use only when the user explicitly asks.
+        Args:
+            service (str): Service name.
+            environment (str): staging or production.""", ["service", "environment"]),
+    "get_deployment_history": ("""Lists recent deployments of a service with version, author and time.
+        Args:
+            service (str): Service name.""", ["service"]),
+    "run_sql_query": ("""Runs a read-only SQL query against the analytics warehouse and returns up to 100 rows.
+        Args:
+            sql (str): SELECT statement.""", ["sql"]),
+    "get_sales_report": ("""Returns revenue, orders and average order value for a region and quarter.
+        Args:
+            region (str): e.g. "EMEA".
+            quarter (str): e.g. "2024-Q2".""", ["region", "quarter"]),
+    "lookup_product": ("""Finds a product in the catalog by name or SKU and returns price, stock level and description.
+        Args:
+            query (str): Product name or SKU.""", ["query"]),
+    "get_shipping_quote": ("""Quotes shipping cost and delivery time for a parcel between two postal codes.
+        Args:
+            origin (str): Postal code.
+            destination (str): Postal code.
+            weight_kg (float): Parcel weight.""", ["origin", "destination", "weight_kg"]),
+    "reset_password": ("""Sends a password reset link to a user's registered email address.
+        Args:
+            user_id (str): The account.""", ["user_id"]),
+}
+
+# (message, recent user messages, tools the turn needs)
+TEST_SET = [
+    ("what's the weather like in Lisbon this weekend?", [], ["get_weather"]),
+    ("will it rain in Berlin tomorrow", [], ["get_weather"]),
+    ("and in Madrid?", ["what's the weather like in Lisbon this weekend?"], ["get_weather"]),
+    ("convert 250 dollars to euros", [], ["convert_currency"]),
+    ("how much is 1000 yen in pounds", [], ["convert_currency"]),
+    ("find our policy on remote work", [], ["search_documents"]),
+    ("search the wiki for the onboarding checklist", [], ["search_documents"]),
+    ("my laptop won't boot, please open a ticket", [], ["create_ticket"]),
+    ("what's the status of ticket HD-4211?", [], ["get_ticket_status"]),
+    ("what meetings do I have on Friday", [], ["list_calendar_events"]),
+    ("schedule a 30 minute meeting with Ana and Raj about the roadmap", [], ["schedule_meeting"]),
+    ("email the summary to jordan@example.com", [], ["send_email"]),
+    ("where is my order ORD-99812?", [], ["get_order_status"]),
+    ("when will order ORD-1234 be delivered", [], ["get_order_status"]),
+    ("refund order ORD-5512, the item arrived broken", [], ["refund_order"]),
+    ("send me the invoice for account 4471 for May", [], ["get_invoice"]),
+    ("what's GOOG trading at?", [], ["get_stock_price"]),
+    ("translate 'thank you for your patience' into German", [], ["translate_text"]),
+    ("summarize https://example.com/blog/post", [], ["summarize_url"]),
+    ("who is on the Platform team?", [], ["get_team_members"]),
+    ("I want to take vacation from June 3 to June 7", [], ["request_time_off"]),
+    ("how many vacation days do I have left", [], ["get_leave_balance"]),
+    ("book a meeting room in building B at 2pm for an hour", [], ["book_meeting_room"]),
+    ("is the checkout service healthy? show cpu and error rate", [], ["get_server_metrics"]),
+    ("restart the payments service in staging", [], ["restart_service"]),
+    ("when was the search service last deployed", [], ["get_deployment_history"]),
+    ("run select count(*) from orders where status = 'open'", [], ["run_sql_query"]),
+    ("what was revenue in EMEA for 2024-Q2", [], ["get_sales_report"]),
+    ("do we have the blue ergonomic chair in stock?", [], ["lookup_product"]),
+    ("how much to ship a 3 kg parcel from 10115 to 80331", [], ["get_shipping_quote"]),
+    ("I forgot my password", [], ["reset_password"]),
+    ("get user details for 4812", [], ["get_user_details"]),
+    ("who is user a22a5fe7?", [], ["get_user_details"]),
+    ("what is 17.5% of 2380", [], ["calculator"]),
+    ("compute sqrt(2) * 144", [], ["calculator"]),
+    ("multiply 3.5, 8 and 12", [], ["multiply_numbers"]),
+    ("add up 120, 45.5, 300 and 12", [], ["sum_numbers"]),
+    ("get user details for 77 and email them the onboarding doc", [], ["get_user_details", "send_email"]),
+    ("check order ORD-881 and refund it if it was not shipped", [], ["get_order_status", "refund_order"]),
+    ("what's the weather in Paris and convert 50 euros to dollars", [], ["get_weather", "convert_currency"]),
+    ("now refund it", ["where is my order ORD-99812?"], ["refund_order"]),
+    ("and what about the staging environment metrics?", ["is the checkout service healthy? show cpu"],
+     ["get_server_metrics"]),
+]
+
+
+def make_tool(name: str, description: str, args) -> StructuredTool:
+    def run(**kwargs) -> str:
+        return json.dumps(kwargs)
+
+    schema = {"type": "object", "properties": {arg: {"type": "string"} for arg in args}, "required": list(args)}
+    return StructuredTool(name=name, description=description, func=run, args_schema=schema)
+
+
+def measure(tools, top_k: int, embeddings=None) -> dict:
+    selector = ToolSelector(top_k=top_k, embeddings=embeddings)
+    recalls, complete, prompt_tokens, timings = [], 0, [], []
+    for message, history, needed in TEST_SET:
+        start = time.perf_counter()
+        selected = selector.select(tools, message, history)
+        timings.append(time.perf_counter() - start)
+        names = {tool.name for tool in selected}
+        hits = len(names.intersection(needed))
+        recalls.append(hits / len(needed))
+        complete += hits == len(needed)
+        prompt_tokens.append(len(render_react_prefix(selected)) // 4)
+    stats = selector.stats()
+    return {
+        "top_k": top_k,
+        "recall": round(statistics.mean(recalls), 3),
+        "full_recall": round(complete / len(TEST_SET), 3),
+        "tool_tokens_per_turn": {
+            "all": round(stats["tool_tokens_offered"] / stats["turns"]),
+            "selected": round(stats["tool_tokens_sent"] / stats["turns"]),
+        },
+        "tool_token_reduction": round(stats["tool_token_reduction"], 3),
+        "react_prompt_tokens": {
+            "all": len(render_react_prefix(tools)) // 4,
+            "selected": round(statistics.mean(prompt_tokens)),
+        },
+        # Median: the first turn also embeds the tool descriptions, later ones only the message
+        "select_us": round(statistics.median(timings) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[2, 3, 4, 6])
+    parser.add_argument("--embedding-model", help="Gemini embedding model instead of the hashing embedder")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    embeddings = None
+    if args.embedding_model:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(model=args.embedding_model)
+
+    tools = registry.load() + [make_tool(name, description, arg_names)
+                               for name, (description, arg_names) in CATALOG.items()]
+    report = {
+        "embeddings": args.embedding_model or "hashing",
+        "tools": len(tools),
+        "cases": len(TEST_SET),
+        "results": [measure(tools, top_k, embeddings) for top_k in args.top_k],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Bytes on the wire per chat turn and per history replay, for each Socket.IO
+packet format and payload compression setting (see wire.py).
+
+    python benchmarks/wire_bench.py
+    python benchmarks/wire_bench.py --chunk-words 2 --page-size 100 --output wire.json
+
+Events are encoded exactly as the server sends them: python-socketio
+packets (JSON text or msgpack, with binary attachments as separate frames),
+the Engine.IO message prefix and the WebSocket frame header. Each setting
+is measured twice:
+
+- raw: no WebSocket compression, e.g. behind a proxy that strips extensions
+- deflate: permessage-deflate as simple-websocket negotiates it with
+  browsers (one zlib stream per connection, context kept across messages)
+
+A turn is a tool step, the streamed answer in `--chunk-words` word chunks
+and the final ai_message; a replay is one history page on join.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from socketio import msgpack_packet, packet  # noqa: E402
+
+from wire import WireEncoder, decode  # noqa: E402
+
+ANSWER = """Here are the details for **Jordan Rivera** (ID `TM-20481`):
+
+| Field | Value |
+|---|---|
+| Email | jordan.rivera@example.com |
+| Team | Platform Infrastructure |
+| Location | Lisbon, Portugal |
+| Manager | Priya Natarajan |
+| Status | Active since March 2021 |
+
+Jordan currently owns the deployment pipeline migration and the on-call rotation
+for the edge proxies. Their last three reviews flagged strong ownership of
+incident follow-ups, and the open action items are:
+
+1. Finish moving the staging clusters to the new autoscaling policy.
+2. Document the rollback procedure for the certificate rotation job.
+3. Pair with the data team on the retention settings for request logs.
+
+Let me know if you want their recent tickets, the team roster, or a summary of
+the escalation history for the last quarter."""
+
+TOOL_OUTPUT = json.dumps({
+    "tmId": "TM-20481", "name": "Jordan Rivera", "email": "jordan.rivera@example.com",
+    "team": "Platform Infrastructure", "location": "Lisbon, Portugal", "manager": "Priya Natarajan",
+    "status": "active", "since": "2021-03-01", "roles": ["deployer", "on-call", "reviewer"],
+})
+QUESTION = "Can you get me the user details for TM-20481 and what they are working on?"
+
+
+def turn_events(chunk_words: int, seqs=(101, 102)) -> list:
+    """(event, payload) pairs of one streamed turn, as stream_turn emits them."""
+    events = [
+        ("ai_chunk", {"type": "tool_start", "tool": "get_user_details", "input": "{'id': 'TM-20481'}"}),
+        ("ai_chunk", {"type": "tool_end", "tool": "get_user_details", "output": TOOL_OUTPUT}),
+    ]
+    words = ANSWER.split(" ")
+    for i in range(0, len(words), chunk_words):
+        text = " ".join(words[i:i + chunk_words]) + (" " if i + chunk_words < len(words) else "")
+        events.append(("ai_chunk", {"type": "token", "text": text}))
+    events.append(("ai_message", {"message": ANSWER, "user_seq": seqs[0], "seq": seqs[1]}))
+    return events
+
+
+def replay_events(page_size: int) -> list:
+    # Answers drawn from the sample's lines with varying ids, so the page is not one message repeated
+    rng = random.Random(0)
+    lines = [line for line in ANSWER.splitlines() if line.strip()]
+    messages = []
+    for i in range(page_size // 2):
+        user_id = f"TM-{rng.randint(10000, 99999)}"
+        answer = "\n".join(rng.sample(lines, rng.randint(3, len(lines)))).replace("TM-20481", user_id)
+        messages += [{"seq": 2 * i + 1, "user": QUESTION.replace("TM-20481", user_id)},
+                     {"seq": 2 * i + 2, "ai": answer}]
+    return [("history", {"messages": messages, "has_more": True, "reset": True})]
+
+
+def ws_frames(serializer: str, event: str, payload) -> list:
+    """The WebSocket message bodies the server sends for one emit."""
+    cls = msgpack_packet.MsgPackPacket if serializer == "msgpack" else packet.Packet
+    encoded = cls(packet.EVENT, data=[event, payload], namespace="/").encode()
+    encoded = encoded if isinstance(encoded, list) else [encoded]
+    # Engine.IO v4 over WebSocket: text packets get the "4" (message) prefix, binary goes as is
+    return [("4" + part).encode("utf-8") if isinstance(part, str) else part for part in encoded]
+
+
+def frame_header(length: int) -> int:
+    return 2 if length < 126 else 4 if length < 65536 else 10
+
+
+class Connection:
+    """Counts the bytes a sequence of messages takes on one WebSocket."""
+
+    def __init__(self, deflate: bool):
+        self.bytes = 0
+        self._zlib = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS) \
+            if deflate else None
+
+    def send(self, message: bytes):
+        if self._zlib is not None:
+            # RFC 7692: sync flush, minus the trailing empty block marker
+            message = (self._zlib.compress(message) + self._zlib.flush(zlib.Z_SYNC_FLUSH))[:-4]
+        self.bytes += frame_header(len(message)) + len(message)
+
+
+def measure(serializer: str, compression: str, deflate: bool, events: list, min_bytes: int) -> dict:
+    encoder = WireEncoder(compression=compression, min_bytes=min_bytes)
+    codec = encoder.codec(("gzip", "zstd"))
+    connection = Connection(deflate)
+    start = time.perf_counter()
+    for event, payload in events:
+        frame = encoder.encode(payload, codec)
+        assert decode(frame) == payload
+        for message in ws_frames(serializer, event, frame):
+            connection.send(message)
+    return {"bytes": connection.bytes, "encode_ms": round((time.perf_counter() - start) * 1e3, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-words", type=int, default=4, help="words per streamed token chunk")
+    parser.add_argument("--page-size", type=int, default=50, help="messages in a history page")
+    parser.add_argument("--min-bytes", type=int, default=1024, help="compression threshold")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    workloads = {"turn": turn_events(args.chunk_words), "replay": replay_events(args.page_size)}
+    baseline = {name: measure("default", "none", False, events, args.min_bytes)["bytes"]
+                for name, events in workloads.items()}
+    results = []
+    for serializer in ("default", "msgpack"):
+        for compression in ("none", "gzip", "zstd"):
+            for deflate in (False, True):
+                row = {"serializer": serializer, "compression": compression, "permessage_deflate": deflate}
+                for name, events in workloads.items():
+                    result = measure(serializer, compression, deflate, events, args.min_bytes)
+                    row[f"{name}_bytes"] = result["bytes"]
+                    row[f"{name}_vs_json"] = round(result["bytes"] / baseline[name], 3)
+                    row[f"{name}_encode_ms"] = result["encode_ms"]
+                results.append(row)
+
+    report = {
+        "turn_events": len(workloads["turn"]),
+        "answer_chars": len(ANSWER),
+        "page_size": args.page_size,
+        "min_bytes": args.min_bytes,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
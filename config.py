@@ -5,5 +5,94 @@ load_dotenv()  # Load environment variables from a .env file if present
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GOOGLE_API_KEY:
-    raise EnvironmentError("Missing GOOGLE_API_KEY in environment variables.")
+
+def require_google_api_key():
+    """Checked when a Gemini client is built, not at import, so tools and tests import freely."""
+    if not GOOGLE_API_KEY:
+        raise EnvironmentError("Missing GOOGLE_API_KEY in environment variables.")
+    return GOOGLE_API_KEY
+
+# Agent loop (see agent/agent_base.py): "react" or "tool_calling"
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+# Print the agent's intermediate reasoning to stdout (use the /metrics endpoint and DEBUG logs instead)
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() in ("1", "true", "yes")
+
+# Gemini model, and explicit context caching of the agent's static prompt prefix
+# (see agent/prompts.py). The API only caches prefixes above a minimum token count;
+# below it, or on any other error, the prefix is sent inline as before.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))  # seconds
+
+# Process-wide Gemini gateway shared by every agent (see agent/llm_gateway.py).
+# Set the quotas of your API tier; 0 disables a limit.
+LLM_RPM = int(os.getenv("LLM_RPM", "2000"))  # requests per minute
+LLM_TPM = int(os.getenv("LLM_TPM", "4000000"))  # tokens per minute
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "5"))  # quota that may be spent at once
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))  # retries after a 429
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))  # seconds, doubled per retry, jittered
+
+# Socket.IO message queue shared by all worker processes, e.g. redis://localhost:6379/0
+# (needs the redis package). Unset for a single process.
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+# Socket.IO packet format: "default" (JSON text) or "msgpack" (binary, needs the msgpack package)
+SOCKETIO_SERIALIZER = os.getenv("SOCKETIO_SERIALIZER", "default")
+# Payload compression above a size threshold (see wire.py): "gzip", "zstd" (needs zstandard) or "none"
+WIRE_COMPRESSION = os.getenv("WIRE_COMPRESSION", "gzip")
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+
+# Per-room agent pool limits (see agent/session_pool.py)
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "1000"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))  # seconds
+
+# Agent turn worker pool (see worker_pool.py)
+AGENT_MAX_WORKERS = int(os.getenv("AGENT_MAX_WORKERS", "8"))
+AGENT_MAX_PENDING = int(os.getenv("AGENT_MAX_PENDING", "64"))
+AGENT_MAX_PENDING_PER_ROOM = int(os.getenv("AGENT_MAX_PENDING_PER_ROOM", "4"))
+
+# Conversation memory (see agent/memory.py): "buffer" or "summary"
+MEMORY_MODE = os.getenv("MEMORY_MODE", "buffer")
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "6"))
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "2000"))
+
+# Read-only tool result cache (see tools/cache.py)
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "300"))  # seconds
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH")  # SQLite file; unset keeps the cache in memory
+
+# Micro-batching of get_user_details lookups (see tools/coalesce.py). USER_DETAILS_BULK_PATH is the
+# backend's bulk endpoint on TM_HOST, e.g. /users/bulk; unset sends one GET per user.
+USER_DETAILS_BULK_PATH = os.getenv("USER_DETAILS_BULK_PATH")
+TOOL_BATCH_WINDOW = float(os.getenv("TOOL_BATCH_WINDOW", "0.01"))  # seconds
+TOOL_BATCH_MAX_SIZE = int(os.getenv("TOOL_BATCH_MAX_SIZE", "50"))
+
+# Semantic answer cache in front of ChatAgent (see agent/semantic_cache.py)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # seconds
+SEMANTIC_CACHE_CONTEXT_MESSAGES = int(os.getenv("SEMANTIC_CACHE_CONTEXT_MESSAGES", "2"))  # history in the key
+# Serve answers that came from tools (e.g. user details) to other rooms too; off keeps them per room
+SEMANTIC_CACHE_SHARE_TOOL_ANSWERS = os.getenv("SEMANTIC_CACHE_SHARE_TOOL_ANSWERS",
+                                              "false").lower() in ("1", "true", "yes")
+
+# Fast-path router in front of the agent loop (see agent/router.py)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Small talk gets canned replies on exact phrases only; set a similarity (e.g. 0.8) to also match
+# reworded variants made of small-talk words, such as "hey hello there"
+ROUTER_THRESHOLD = float(os.getenv("ROUTER_THRESHOLD")) if os.getenv("ROUTER_THRESHOLD") else None
+
+# Per-turn tool retrieval (see agent/tool_selector.py): only the TOOL_SELECTION_TOP_K tools most
+# relevant to the message and the user's last TOOL_SELECTION_HISTORY_MESSAGES messages are described
+TOOL_SELECTION_ENABLED = os.getenv("TOOL_SELECTION_ENABLED", "false").lower() in ("1", "true", "yes")
+TOOL_SELECTION_TOP_K = int(os.getenv("TOOL_SELECTION_TOP_K", "4"))
+TOOL_SELECTION_HISTORY_MESSAGES = int(os.getenv("TOOL_SELECTION_HISTORY_MESSAGES", "2"))
+# Gemini embedding model for matching, e.g. models/text-embedding-004 (one API call per turn);
+# unset uses the local hashing embedder, which only matches shared words
+TOOL_SELECTION_EMBEDDING_MODEL = os.getenv("TOOL_SELECTION_EMBEDDING_MODEL")
+
+# Persistent chat history (see agent/history_store.py): "sqlite", "postgres" or "none"
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite")
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "chat_history.db")
+HISTORY_POSTGRES_URL = os.getenv("HISTORY_POSTGRES_URL")
+HISTORY_LOAD_LIMIT = int(os.getenv("HISTORY_LOAD_LIMIT", "20"))  # messages loaded into agent memory
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))  # messages per replay page (join, scroll-back)
@@ -0,0 +1,33 @@
+# Production launch for the Socket.IO server:
+#
+#     gunicorn -c gunicorn.conf.py app_live:app
+#
+# Each worker process runs Flask-SocketIO in threading mode (WebSocket via
+# simple-websocket) with its own agent pool. Clients connect over WebSocket
+# only, so a connection stays on one worker for its whole life and no sticky
+# load balancing is needed. Room memory lives in the history store (use the
+# Postgres backend, or a shared SQLite file on one host), so a reconnect that
+# lands on another worker resumes the conversation, and an agent reloads its
+# memory before a turn if another worker (e.g. a second tab in the same room)
+# stored turns since.
+#
+# Several workers need SOCKETIO_MESSAGE_QUEUE (a Redis URL), so emits reach a
+# room's sockets on every worker; without it the server runs one worker and
+# refuses more. SERVER_ALLOW_NO_MESSAGE_QUEUE=true overrides that for load
+# tests where every client keeps to a room of its own.
+import multiprocessing
+import os
+
+from config import SOCKETIO_MESSAGE_QUEUE
+
+bind = os.getenv("SERVER_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("SERVER_WORKERS", multiprocessing.cpu_count() if SOCKETIO_MESSAGE_QUEUE else 1))
+if workers > 1 and not SOCKETIO_MESSAGE_QUEUE \
+        and os.getenv("SERVER_ALLOW_NO_MESSAGE_QUEUE", "false").lower() not in ("1", "true", "yes"):
+    raise RuntimeError(f"SERVER_WORKERS={workers} needs SOCKETIO_MESSAGE_QUEUE: without it a room's "
+                       "tabs on different workers miss each other's messages")
+worker_class = "gthread"
+# Threads per worker: each open WebSocket holds one
+threads = int(os.getenv("SERVER_THREADS", "100"))
+timeout = 120
+graceful_timeout = 30
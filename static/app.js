@@ -1,8 +1,18 @@
 // static/app.js (Optimized)
 
+// Newest messages kept in localStorage, so a reload renders instantly and
+// only asks the server for what it hasn't seen
+const HISTORY_CACHE_LIMIT = 200;
+const GREETING = "Hello I am LLM agent, how may I help you?";
+
+// Compressed payloads (see wire.py): one codec byte, then compressed JSON
+const WIRE_CODECS = { 1: "gzip", 2: "zstd" };
+
 class ChatApp {
   constructor() {
-    this.socket = io();
+    // WebSocket only: no long-polling fallback, so any worker can own the
+    // connection without sticky sessions in front of a multi-process server.
+    this.socket = io({ transports: ["websocket"] });
     this.md = window.markdownit({
       html: true,
       breaks: true,
@@ -15,11 +25,24 @@ class ChatApp {
     this.messagesEl = document.getElementById("messages");
     this.sendBtn = document.getElementById("send");
     this.inputEl = document.getElementById("input");
+    this.stream = null; // agent message currently being streamed via ai_chunk
+    this.pendingUser = null; // text of the user message whose reply is awaited
+    this.inbox = Promise.resolve(); // decodes events one at a time, in arrival order
+    // Codecs this browser can decode, offered to the server on join
+    this.accept = ["gzip", ...(window.fzstd ? ["zstd"] : [])];
+
+    // Stored messages ({seq, user} or {seq, ai}) of the newest part of the
+    // conversation, and how far back the rendered transcript reaches
+    this.historyKey = `chat_history_${this.sessionId}`;
+    this.history = JSON.parse(localStorage.getItem(this.historyKey) || "[]");
+    this.oldestSeq = this.history.length ? this.history[0].seq : null;
+    this.hasMore = true;
+    this.loadingOlder = false;
 
     this.setupSocketEvents();
     this.setupEventListeners();
 
-    this.appendMessage("Hello I am LLM agent, how may I help you?", "agent");
+    this.renderHistory(this.history);
   }
 
   initializeSessionId() {
@@ -28,15 +51,104 @@ class ChatApp {
       id = 'room_' + Math.random().toString(36).slice(2, 11);
       localStorage.setItem("chat_session_id", id);
     }
-    this.socket.emit('join', { room: id });
     return id;
   }
 
+  join() {
+    // Sent on every (re)connect; the server replies with the messages after last_seq
+    const last = this.history[this.history.length - 1];
+    this.socket.emit('join', { room: this.sessionId, last_seq: last ? last.seq : null, accept: this.accept });
+  }
+
+  saveHistory(messages) {
+    this.history = this.history.concat(messages).slice(-HISTORY_CACHE_LIMIT);
+    try {
+      localStorage.setItem(this.historyKey, JSON.stringify(this.history));
+    } catch (e) {
+      // Quota exceeded: the server still has everything
+    }
+  }
+
+  renderHistory(messages) {
+    this.messagesEl.innerHTML = "";
+    if (!messages.length) this.appendMessage(GREETING, "agent");
+    messages.forEach(msg => this.messagesEl.appendChild(this.createMessage(msg)));
+    this.scrollToBottom();
+  }
+
+  loadOlder() {
+    if (!this.hasMore || this.loadingOlder || this.oldestSeq === null) return;
+    this.loadingOlder = true;
+    this.socket.emit('history_page', { room: this.sessionId, before_seq: this.oldestSeq, accept: this.accept });
+  }
+
+  prependHistory(data) {
+    // Keep the messages in view where they are while older ones go in above
+    const fromBottom = this.messagesEl.scrollHeight - this.messagesEl.scrollTop;
+    const fragment = document.createDocumentFragment();
+    data.messages.forEach(msg => fragment.appendChild(this.createMessage(msg)));
+    this.messagesEl.prepend(fragment);
+    this.messagesEl.scrollTop = this.messagesEl.scrollHeight - fromBottom;
+
+    if (data.messages.length) this.oldestSeq = data.messages[0].seq;
+    this.hasMore = data.has_more;
+    this.loadingOlder = false;
+    this.fillViewport();
+  }
+
+  fillViewport() {
+    // Nothing to scroll yet means no scroll event to trigger the next page
+    if (this.messagesEl.scrollHeight <= this.messagesEl.clientHeight) this.loadOlder();
+  }
+
+  async decode(payload) {
+    // Plain payloads arrive as objects; compressed ones as binary
+    if (!(payload instanceof ArrayBuffer || ArrayBuffer.isView(payload))) return payload;
+    const bytes = payload instanceof ArrayBuffer
+      ? new Uint8Array(payload)
+      : new Uint8Array(payload.buffer, payload.byteOffset, payload.byteLength);
+    const codec = WIRE_CODECS[bytes[0]];
+    const body = bytes.subarray(1);
+    let json;
+    if (codec === "gzip") {
+      const stream = new Blob([body]).stream().pipeThrough(new DecompressionStream("gzip"));
+      json = await new Response(stream).text();
+    } else if (codec === "zstd") {
+      json = new TextDecoder().decode(window.fzstd.decompress(body));
+    } else {
+      throw new Error(`Unknown payload codec ${bytes[0]}`);
+    }
+    return JSON.parse(json);
+  }
+
+  on(event, handler) {
+    // Decoding is async; chaining keeps a compressed event from being overtaken by the next plain one
+    this.socket.on(event, payload => {
+      this.inbox = this.inbox
+        .then(() => this.decode(payload))
+        .then(handler)
+        .catch(err => console.error(`Failed to handle ${event}`, err));
+    });
+  }
+
   scrollToBottom() {
     this.messagesEl.scrollTop = this.messagesEl.scrollHeight;
   }
 
+  createMessage(msg) {
+    return msg.user !== undefined
+      ? this.buildMessage(msg.user, "user")
+      : this.buildMessage(msg.ai, "agent");
+  }
+
   appendMessage(text, sender) {
+    const wrapper = this.buildMessage(text, sender);
+    this.messagesEl.appendChild(wrapper);
+    this.scrollToBottom();
+    return wrapper;
+  }
+
+  buildMessage(text, sender) {
     const wrapper = document.createElement("div");
     wrapper.className = sender === "user" ? "user-message" : "agent-message";
     wrapper.innerHTML = sender === "user"
@@ -48,9 +160,53 @@ class ChatApp {
           </div>
         </div>
         <div class="agent-content">${this.md.render(text)}</div>`;
+    return wrapper;
+  }
 
-    this.messagesEl.appendChild(wrapper);
-    this.scrollToBottom();
+  escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text;
+    return div.innerHTML;
+  }
+
+  startStream() {
+    this.removeTypingIndicator();
+    const wrapper = this.appendMessage("", "agent");
+    const content = wrapper.querySelector(".agent-content");
+    const steps = document.createElement("div");
+    steps.className = "tool-steps";
+    const answer = document.createElement("div");
+    content.append(steps, answer);
+    this.stream = { steps, answer, text: "", renderQueued: false };
+  }
+
+  renderStream() {
+    // Re-render markdown at most once per frame, not once per token
+    if (this.stream.renderQueued) return;
+    this.stream.renderQueued = true;
+    requestAnimationFrame(() => {
+      if (!this.stream) return;
+      this.stream.renderQueued = false;
+      this.stream.answer.innerHTML = this.md.render(this.stream.text);
+      this.scrollToBottom();
+    });
+  }
+
+  handleChunk(data) {
+    if (!this.stream) this.startStream();
+    if (data.type === "token") {
+      this.stream.text += data.text;
+      this.renderStream();
+    } else if (data.type === "tool_start") {
+      const step = document.createElement("div");
+      step.className = "tool-step";
+      step.innerHTML = `Running <code>${this.escapeHtml(data.tool)}</code> with <code>${this.escapeHtml(data.input)}</code>…`;
+      this.stream.steps.appendChild(step);
+      this.scrollToBottom();
+    } else if (data.type === "tool_end") {
+      const step = this.stream.steps.lastElementChild;
+      if (step) step.classList.add("done");
+    }
   }
 
   showTypingIndicator() {
@@ -91,21 +247,60 @@ class ChatApp {
   }
 
   setupSocketEvents() {
-    this.socket.on("history", history => {
-      this.messagesEl.innerHTML = "";
-      history.forEach(msg => {
-        if (msg.user) this.appendMessage(msg.user, "user");
-        if (msg.ai) this.appendMessage(msg.ai, "agent");
-      });
-      this.scrollToBottom();
+    this.socket.on("connect", () => this.join());
+
+    this.on("history", data => {
+      if (data.reset) {
+        // Too far behind (or nothing cached): start over from the latest page
+        this.history = [];
+        this.saveHistory(data.messages);
+        this.oldestSeq = data.messages.length ? data.messages[0].seq : null;
+        this.hasMore = data.has_more;
+        this.renderHistory(data.messages);
+        this.fillViewport();
+      } else if (data.messages.length) {
+        // Only the messages missed since last_seq
+        if (!this.history.length) this.messagesEl.innerHTML = "";
+        data.messages.forEach(msg => this.messagesEl.appendChild(this.createMessage(msg)));
+        if (this.oldestSeq === null) this.oldestSeq = data.messages[0].seq;
+        this.saveHistory(data.messages);
+        this.scrollToBottom();
+      }
+      if (!data.reset) this.fillViewport();
     });
 
-    this.socket.on("ai_message", data => {
+    this.on("history_page", data => this.prependHistory(data));
+
+    this.on("ai_chunk", data => this.handleChunk(data));
+
+    this.on("ai_message", data => {
       this.removeTypingIndicator();
-      if (data.message) this.appendMessage(data.message, "agent");
+      if (data.seq !== undefined && this.pendingUser !== null) {
+        const turn = [{ seq: data.user_seq, user: this.pendingUser }, { seq: data.seq, ai: data.message }];
+        if (this.oldestSeq === null) this.oldestSeq = data.user_seq;
+        this.saveHistory(turn);
+      }
+      this.pendingUser = null;
+      if (this.stream) {
+        // Replace the streamed text with the authoritative final answer
+        this.stream.answer.innerHTML = this.md.render(data.message || this.stream.text);
+        this.stream = null;
+        this.scrollToBottom();
+      } else if (data.message) {
+        this.appendMessage(data.message, "agent");
+      }
       this.sendBtn.disabled = false;
       this.inputEl.focus();
     });
+
+    this.on("join_error", data => this.appendMessage(data.message, "agent"));
+
+    this.on("busy", data => {
+      this.removeTypingIndicator();
+      this.pendingUser = null;
+      if (data.message) this.appendMessage(data.message, "agent");
+      this.sendBtn.disabled = false;
+    });
   }
 
   setupEventListeners() {
@@ -114,12 +309,17 @@ class ChatApp {
       if (!text) return;
 
       this.appendMessage(text, "user");
+      this.pendingUser = text;
       this.inputEl.value = "";
       this.sendBtn.disabled = true;
       this.showTypingIndicator();
       this.socket.emit("message", { room: this.sessionId, message: text });
     });
 
+    this.messagesEl.addEventListener("scroll", () => {
+      if (this.messagesEl.scrollTop < 80) this.loadOlder();
+    });
+
     this.inputEl.addEventListener("keydown", e => {
       if (e.key === "Enter" && !e.shiftKey) {
         e.preventDefault();
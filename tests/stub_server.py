@@ -0,0 +1,63 @@
+"""
+A local aiohttp backend for HTTP client and tool tests, served from a
+background thread. Each test scripts it with routes and reads what it saw.
+"""
+import asyncio
+import threading
+
+from aiohttp import web
+
+
+class StubServer:
+    """
+    :param routes: (method, path, handler) triples; handlers are aiohttp
+        coroutines taking the request.
+    """
+
+    def __init__(self, routes):
+        self.app = web.Application()
+        for method, path, handler in routes:
+            self.app.router.add_route(method, path, self._counted(handler))
+        self.requests = []  # (method, path) in arrival order
+        self.peers = set()  # client (host, port) pairs, one per TCP connection
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _counted(self, handler):
+        async def wrapper(request):
+            self.requests.append((request.method, request.path))
+            self.peers.add(request.transport.get_extra_info("peername"))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                return await handler(request)
+            finally:
+                self.in_flight -= 1
+        return wrapper
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait(10)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
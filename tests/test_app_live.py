@@ -0,0 +1,78 @@
+import re
+import time
+
+import pytest
+from fake_gemini import FakeGeminiChatModel
+
+import app_live
+from agent.history_store import SQLiteHistoryStore
+from agent.session_pool import AgentPool
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    agents = AgentPool(llm=FakeGeminiChatModel(latency=0), history_store=SQLiteHistoryStore(str(tmp_path / "h.db")))
+    monkeypatch.setattr(app_live, "agent_pool", agents)
+    yield agents
+    agents.history_store.close()
+
+
+def received(client, name):
+    return [event["args"][0] for event in client.get_received() if event["name"] == name]
+
+
+def test_rejoining_keeps_the_live_agent(pool):
+    agent = pool.get("r")
+    client = app_live.socketio.test_client(app_live.app)
+    client.emit('join', {'room': 'r'})
+    client.disconnect()
+    client = app_live.socketio.test_client(app_live.app)
+    client.emit('join', {'room': 'r', 'last_seq': None})
+
+    assert received(client, 'history')
+    assert pool.get("r") is agent
+    client.disconnect()
+
+
+def test_unknown_tools_are_reported_to_the_client(pool):
+    client = app_live.socketio.test_client(app_live.app)
+    client.emit('join', {'room': 'r', 'tools': ['calculator', 'rm_rf']})
+
+    [error] = received(client, 'join_error')
+    assert "rm_rf" in error['message']
+    assert "r" not in pool._room_tools
+    client.disconnect()
+
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$')
+
+
+def test_metrics_endpoint_exports_turn_histograms(pool):
+    client = app_live.socketio.test_client(app_live.app)
+    client.emit('join', {'room': 'm'})
+    client.emit('message', {'room': 'm', 'message': 'multiply 3 and 4'})
+    deadline = time.monotonic() + 10
+    while not received(client, 'ai_message'):
+        assert time.monotonic() < deadline, "no reply"
+        time.sleep(0.01)
+    client.disconnect()
+
+    response = app_live.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    lines = text.splitlines()
+
+    # Valid exposition format: comments or `name{labels} value` samples
+    assert all(line.startswith("# ") or SAMPLE.match(line) for line in lines), \
+        [line for line in lines if not (line.startswith("# ") or SAMPLE.match(line))]
+    assert "# TYPE agent_span_duration_seconds histogram" in lines
+    # The router answers this turn with the calculator, without the LLM
+    [routed] = [line for line in lines if line.startswith('agent_turn_routes_total{route="tool"}')]
+    assert float(routed.rsplit(" ", 1)[1]) >= 1
+    for stage in ("turn", "router", "tool", "socketio.emit"):
+        buckets = [float(line.rsplit(" ", 1)[1]) for line in lines
+                   if line.startswith(f'agent_span_duration_seconds_bucket{{span="{stage}",')]
+        assert buckets and buckets == sorted(buckets)  # cumulative
+        [count] = [line for line in lines if line.startswith(f'agent_span_duration_seconds_count{{span="{stage}"}}')]
+        assert float(count.rsplit(" ", 1)[1]) == buckets[-1] >= 1
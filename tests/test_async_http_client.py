@@ -0,0 +1,142 @@
+import asyncio
+import gc
+import threading
+
+from aiohttp import web
+
+from AsyncHttpClient import AsyncHttpClient
+from stub_server import StubServer
+from worker_pool import run_on_thread_loop
+
+
+async def user(request):
+    await asyncio.sleep(0.01)
+    return web.json_response({"tmId": request.match_info["id"]})
+
+
+def test_turns_on_a_worker_thread_reuse_one_session():
+    client = AsyncHttpClient()
+    results = []
+
+    def worker():
+        # Five agent turns on the same worker thread, as app_live.run_turn runs them
+        for i in range(5):
+            results.append(run_on_thread_loop(client.get(f"{server.url}/users/{i}")))
+
+    with StubServer([("GET", "/users/{id}", user)]) as server:
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(30)
+
+    assert [r["tmId"] for r in results] == ["0", "1", "2", "3", "4"]
+    assert len(client._per_loop) == 1
+    assert len(server.peers) == 1  # one kept-alive connection
+
+
+def test_concurrent_gets_are_capped_by_max_concurrency():
+    client = AsyncHttpClient(max_concurrency=5)
+
+    async def fan_out():
+        try:
+            return await asyncio.gather(*(client.get(f"{server.url}/users/{i}") for i in range(50)))
+        finally:
+            await client.close()
+
+    with StubServer([("GET", "/users/{id}", user)]) as server:
+        results = asyncio.run(fan_out())
+
+    assert sorted(int(r["tmId"]) for r in results) == list(range(50))
+    assert server.max_in_flight <= 5
+
+
+def test_get_retries_503():
+    attempts = []
+
+    async def flaky(request):
+        attempts.append(1)
+        if len(attempts) == 1:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    client = AsyncHttpClient(backoff_factor=0.01)
+
+    async def get():
+        try:
+            return await client.get(f"{server.url}/flaky")
+        finally:
+            await client.close()
+
+    with StubServer([("GET", "/flaky", flaky)]) as server:
+        assert asyncio.run(get()) == {"ok": True}
+    assert len(attempts) == 2
+
+
+def test_max_concurrency_holds_across_worker_threads():
+    client = AsyncHttpClient(max_concurrency=3)
+    results = []
+
+    def worker(base):
+        async def fan_out():
+            return await asyncio.gather(*(client.get(f"{server.url}/users/{base + i}") for i in range(10)))
+        results.extend(run_on_thread_loop(fan_out()))
+
+    with StubServer([("GET", "/users/{id}", user)]) as server:
+        threads = [threading.Thread(target=worker, args=(n * 10,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+    assert sorted(int(r["tmId"]) for r in results) == list(range(40))
+    assert len(client._per_loop) == 4  # one pool per worker thread
+    assert server.max_in_flight <= 3
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    client = AsyncHttpClient(max_concurrency=1)
+
+    async def scenario():
+        try:
+            slow = asyncio.ensure_future(client.get(f"{server.url}/users/1"))
+            await asyncio.sleep(0)
+            queued = asyncio.ensure_future(client.get(f"{server.url}/users/2"))
+            await asyncio.sleep(0)
+            queued.cancel()
+            await slow
+            # The slot came back: this would hang if the cancelled waiter kept it
+            return await asyncio.wait_for(client.get(f"{server.url}/users/3"), 5)
+        finally:
+            await client.close()
+
+    with StubServer([("GET", "/users/{id}", user)]) as server:
+        assert asyncio.run(scenario()) == {"tmId": "3"}
+
+
+def test_thread_loop_teardown_closes_sessions_and_pending_tasks():
+    client = AsyncHttpClient()
+    sessions = []
+    finalized = []
+
+    async def stream():
+        try:
+            yield 1
+            yield 2
+        finally:
+            finalized.append(True)
+
+    async def turn():
+        await client.get(f"{server.url}/users/1")
+        sessions.append(client._per_loop[asyncio.get_running_loop()])
+        agen = stream()
+        await agen.__anext__()  # abandoned mid-stream, as a dropped event stream is
+
+    with StubServer([("GET", "/users/{id}", user)]) as server:
+        thread = threading.Thread(target=lambda: run_on_thread_loop(turn()))
+        thread.start()
+        thread.join(30)
+        del thread
+        gc.collect()
+
+    assert sessions[0].closed
+    assert finalized == [True]
+    assert not client._per_loop
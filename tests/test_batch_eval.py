@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from batch_eval import BatchRunner, build_pool, load_checkpoint, read_conversations
+
+MESSAGES = ["get user 42", "and multiply 6 and 7", "what is the capital of France"]
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def run(tmp_path, conversations, concurrency=4):
+    write_jsonl(tmp_path / "in.jsonl", conversations)
+    pool = build_pool(concurrency, fake=True, fake_latency=0)
+    runner = BatchRunner(pool, concurrency=concurrency, progress_every=0)
+    report = asyncio.run(runner.run(read_conversations(str(tmp_path / "in.jsonl")), str(tmp_path / "out.jsonl")))
+    return report, pool
+
+
+def test_turns_run_in_order_within_each_conversation(tmp_path):
+    conversations = [{"id": f"c-{i}", "messages": MESSAGES[i % 3:] + MESSAGES[:i % 3], "expected": i}
+                     for i in range(12)]
+    report, pool = run(tmp_path, conversations)
+
+    records = {record["id"]: record for record in read_jsonl(tmp_path / "out.jsonl")}
+    assert report["conversations"] == 12 and report["turns"] == 36 and report["turn_errors"] == 0
+    for conversation in conversations:
+        record = records[conversation["id"]]
+        assert [turn["input"] for turn in record["turns"]] == conversation["messages"]
+        assert all(turn["output"] and "error" not in turn for turn in record["turns"])
+        assert record["expected"] == conversation["expected"]
+    assert len(pool) == 0  # every conversation's agent was evicted
+    assert pool.llm_stats()["llm_calls"] > 0
+
+
+def test_rerun_resumes_after_the_checkpoint(tmp_path):
+    conversations = [{"id": f"c-{i}", "input": "what is the capital of France"} for i in range(5)]
+    done = [{"id": "c-0", "turns": []}, {"id": "c-1", "turns": []}]
+    (tmp_path / "out.jsonl").write_text("".join(json.dumps(r) + "\n" for r in done) + '{"id": "c-2", "tu')
+
+    report, _ = run(tmp_path, conversations)
+
+    records = read_jsonl(tmp_path / "out.jsonl")  # every line parses: the partial one was dropped
+    assert report["skipped"] == 2 and report["conversations"] == 3
+    assert records[:2] == done
+    assert sorted(record["id"] for record in records) == [f"c-{i}" for i in range(5)]
+
+
+def test_checkpoint_truncates_a_partial_last_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    good = '{"id": "a", "turns": []}\n{"id": 7, "turns": []}\n'
+    path.write_text(good + '{"id": "b", "turns": [{"inp')
+
+    assert load_checkpoint(str(path)) == {"a", "7"}
+    assert path.read_text() == good
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from aiohttp import web
+
+from stub_server import StubServer
+from tools import user_tools
+from tools.cache import TOOL_CACHES
+from agent.instrumentation import METRICS
+from tools.coalesce import BATCHERS, MicroBatcher, SingleFlight
+
+
+async def slow_user(request):
+    await asyncio.sleep(0.2)  # keeps the first call in flight while the others arrive
+    return web.json_response({"tmId": request.match_info["id"]})
+
+
+async def bulk_users(request):
+    ids = (await request.json())["ids"]
+    return web.json_response([{"tmId": id} for id in ids])
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    TOOL_CACHES["get_user_details"].clear()
+    yield
+    TOOL_CACHES["get_user_details"].clear()
+
+
+def test_concurrent_identical_calls_share_one_get(monkeypatch):
+    monkeypatch.setattr(user_tools, "user_batcher", None)
+    results = []
+    with StubServer([("GET", "/users/{id}", slow_user)]) as server:
+        monkeypatch.setenv("TM_HOST", server.url)
+        threads = [threading.Thread(target=lambda: results.append(user_tools.get_user_details.invoke({"id": "42"})))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+    assert server.requests == [("GET", "/users/42")]
+    assert [json.loads(r) for r in results] == [{"tmId": "42"}] * 10
+
+
+def test_concurrent_identical_async_calls_share_one_get(monkeypatch):
+    monkeypatch.setattr(user_tools, "user_batcher", None)
+
+    async def fan_out():
+        try:
+            return await asyncio.gather(*(user_tools.get_user_details.ainvoke({"id": "42"}) for _ in range(10)))
+        finally:
+            await user_tools.async_http_client.close()
+
+    with StubServer([("GET", "/users/{id}", slow_user)]) as server:
+        monkeypatch.setenv("TM_HOST", server.url)
+        results = asyncio.run(fan_out())
+
+    assert server.requests == [("GET", "/users/42")]
+    assert {r for r in results} == {json.dumps({"tmId": "42"})}
+
+
+def test_lookups_within_the_window_go_out_as_one_bulk_post(monkeypatch):
+    monkeypatch.setattr(user_tools, "USER_DETAILS_BULK_PATH", "/users/bulk")
+    monkeypatch.setitem(BATCHERS, "get_user_details", BATCHERS.get("get_user_details"))
+    batcher = MicroBatcher("get_user_details", user_tools._fetch_users_bulk, window=0.2, max_batch=50)
+    monkeypatch.setattr(user_tools, "user_batcher", batcher)
+    ids = [str(i) for i in range(8)] + ["3", "5"]
+    results = {}
+
+    def lookup(id):
+        results[id] = json.loads(user_tools.get_user_details.invoke({"id": id}))
+
+    with StubServer([("POST", "/users/bulk", bulk_users)]) as server:
+        monkeypatch.setenv("TM_HOST", server.url)
+        threads = [threading.Thread(target=lookup, args=(id,)) for id in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+    assert server.requests == [("POST", "/users/bulk")]
+    assert results == {id: {"tmId": id} for id in ids}
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["keys_fetched"] == 8
+
+
+def test_full_batches_are_sent_by_one_flusher_thread(monkeypatch):
+    monkeypatch.setitem(BATCHERS, "numbers", None)
+    threads = set()
+    sizes = []
+
+    def fetch_many(keys):
+        threads.add(threading.current_thread())
+        sizes.append(len(keys))
+        return {key: key * 2 for key in keys}
+
+    batcher = MicroBatcher("numbers", fetch_many, window=0.05, max_batch=3)
+    futures = [batcher.submit(n) for n in range(10)] + [batcher.submit(3)]
+
+    assert [future.result(5) for future in futures] == [n * 2 for n in range(10)] + [6]
+    assert len(threads) == 1 and threading.current_thread() not in threads
+    assert batcher.stats()["keys_fetched"] == 10
+    assert max(sizes) <= 3
+    assert 'agent_micro_batch{batcher="numbers",stat="submitted"} 11' in METRICS.render()
+
+
+def test_followers_retry_when_the_leader_is_cancelled():
+    flight = SingleFlight("t")
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) > 1 else 10)
+        return "value"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("k", call))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.ado("k", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(scenario()) == ["value"] * 3
+    assert len(calls) == 2  # the cancelled leader's, then one retry shared by the followers
+    assert flight.stats()["calls"] == 4
+
+
+def test_a_cancelled_follower_does_not_cancel_the_shared_call():
+    flight = SingleFlight("t")
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("k", call))
+        await asyncio.sleep(0)
+        quitter = asyncio.ensure_future(flight.ado("k", call))
+        follower = asyncio.ensure_future(flight.ado("k", call))
+        await asyncio.sleep(0)
+        quitter.cancel()
+        return await leader, await follower
+
+    assert asyncio.run(scenario()) == ("value", "value")
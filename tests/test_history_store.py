@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.history_store import HistoryStore, SQLiteHistoryStore
+
+
+def contents(page):
+    return [row["message"].content for row in page]
+
+
+def test_history_store_is_abstract():
+    with pytest.raises(TypeError):
+        HistoryStore()
+
+
+def test_append_numbers_messages_per_room(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "chat.db"))
+    assert store.append("a", [HumanMessage("hi"), AIMessage("hello")]) == [1, 2]
+    assert store.append("b", [HumanMessage("other room")]) == [1]
+    assert store.append("a", [HumanMessage("again")]) == [3]
+    assert store.append("a", []) == []
+
+    page = store.load_page("a", limit=10)
+    assert [row["seq"] for row in page] == [1, 2, 3]
+    assert contents(page) == ["hi", "hello", "again"]
+    assert isinstance(page[1]["message"], AIMessage)
+
+
+def test_load_page_returns_the_newest_messages_oldest_first(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "chat.db"))
+    store.append("room", [HumanMessage(str(i)) for i in range(1, 11)])
+
+    assert contents(store.load_page("room", limit=3)) == ["8", "9", "10"]
+    assert contents(store.load_page("room", limit=3, before_seq=8)) == ["5", "6", "7"]
+    assert contents(store.load_page("room", limit=3, after_seq=8)) == ["9", "10"]
+    assert contents(store.load_page("room", limit=10, after_seq=2, before_seq=6)) == ["3", "4", "5"]
+    assert store.load_page("room", limit=3, after_seq=10) == []
+
+
+def test_concurrent_appends_get_distinct_seqs(tmp_path):
+    path = str(tmp_path / "chat.db")
+    SQLiteHistoryStore(path).close()  # create the schema before the writers race
+    seqs = []
+
+    def writer(n):
+        # A connection of its own, as another worker process would have
+        store = SQLiteHistoryStore(path)
+        for i in range(20):
+            seqs.extend(store.append("room", [HumanMessage(f"{n}-{i}"), AIMessage("ok")]))
+        store.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert sorted(seqs) == list(range(1, 161))
+    page = SQLiteHistoryStore(path).load_page("room", limit=200)
+    assert [row["seq"] for row in page] == list(range(1, 161))
+    # Each append's pair stays adjacent
+    assert all(page[i + 1]["message"].content == "ok" for i in range(0, 160, 2))
@@ -0,0 +1,36 @@
+from fake_gemini import FakeGeminiChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.history_store import SQLiteHistoryStore
+from agent.session_pool import AgentPool
+
+
+def worker_pool(path):
+    """One worker process' pool: its own agents and store connection, sharing the database."""
+    return AgentPool(llm=FakeGeminiChatModel(latency=0), history_store=SQLiteHistoryStore(str(path)))
+
+
+def contents(agent):
+    return [message.content for message in agent.memory.chat_memory.messages]
+
+
+def test_agent_catches_up_with_turns_stored_by_another_worker(tmp_path):
+    first, second = worker_pool(tmp_path / "chat.db"), worker_pool(tmp_path / "chat.db")
+
+    first.get("room").handle_input("get user 1")
+    second.get("room").handle_input("get user 2")  # a second tab, served by the other worker
+    agent = first.get("room")
+    agent.handle_input("get user 3")
+
+    user_turns = [text for text in contents(agent) if text.startswith("get user")]
+    assert user_turns == ["get user 1", "get user 2", "get user 3"]
+    assert "memory.sync" in agent.last_trace.breakdown()
+
+
+def test_own_turns_do_not_trigger_a_reload(tmp_path):
+    history = worker_pool(tmp_path / "chat.db").get("room").memory.chat_memory
+    window = history.messages
+    history.add_messages([HumanMessage("hi"), AIMessage("hello")])
+    assert history.sync() is False
+    assert history.messages is window
+    assert history.seq == 2
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from aiohttp import web
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from agent import llm_gateway
+from agent.llm_gateway import GatewayChatModel, LLMGateway
+from stub_server import StubServer
+
+QUOTA = {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+CANDIDATE = {"candidates": [{"content": {"parts": [{"text": "hi"}], "role": "model"}, "finishReason": "STOP"}],
+             "usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 1, "totalTokenCount": 4}}
+
+
+def fake_gemini(failures):
+    """Handler for generateContent / streamGenerateContent: 429 for the first `failures` calls."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.match_info["method"])
+        if len(calls) <= failures:
+            return web.json_response(QUOTA, status=429)
+        body = [CANDIDATE] if request.match_info["method"] == "streamGenerateContent" else CANDIDATE
+        return web.json_response(body)
+    return handler
+
+
+def gateway_model(server, max_retries=3):
+    llm_gateway._disable_client_retries()
+    inner = ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key="test", transport="rest",
+                                   client_options={"api_endpoint": server.url})
+    gateway = LLMGateway(max_retries=max_retries, retry_base_delay=0.01, retry_max_delay=0.01)
+    return GatewayChatModel(inner=inner, gateway=gateway), gateway
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_a_429_reaches_the_gateway_without_a_client_retry(stream):
+    routes = [("POST", "/v1beta/models/gemini-2.0-flash:{method}", fake_gemini(failures=1))]
+    with StubServer(routes) as server:
+        model, gateway = gateway_model(server)
+        start = time.monotonic()
+        text = "".join(c.content for c in model.stream("hello")) if stream else model.invoke("hello").content
+        elapsed = time.monotonic() - start
+
+    assert text == "hi"
+    assert len(server.requests) == 2
+    assert gateway.stats()["rate_limited"] == 1
+    assert elapsed < 1  # the client's own retry sleeps at least a second
+
+
+def test_a_spent_quota_costs_one_request_per_gateway_attempt():
+    routes = [("POST", "/v1beta/models/gemini-2.0-flash:{method}", fake_gemini(failures=100))]
+    with StubServer(routes) as server:
+        model, gateway = gateway_model(server, max_retries=2)
+        with pytest.raises(Exception) as raised:
+            model.invoke("hello")
+
+    assert llm_gateway.is_rate_limited(raised.value)
+    assert len(server.requests) == 3
+    assert gateway.stats()["rate_limited"] == 3
+
+
+def test_calls_outside_the_gateway_keep_the_client_retry():
+    llm_gateway._disable_client_retries()
+    from langchain_google_genai.chat_models import _create_retry_decorator
+
+    def attempts():
+        return _create_retry_decorator()(lambda: None).retry.stop.max_attempt_number
+
+    assert attempts() == 2
+    with llm_gateway._gateway_retries():
+        assert attempts() == 1
+
+
+def test_async_waiters_do_not_hold_threads():
+    gateway = LLMGateway(rpm=6000, burst_seconds=0.01)  # one call per 10 ms
+
+    async def burst():
+        threads = threading.active_count()
+        waiters = [asyncio.ensure_future(gateway.aacquire()) for _ in range(30)]
+        await asyncio.sleep(0.05)
+        busy = threading.active_count()
+        await asyncio.gather(*waiters)
+        return threads, busy
+
+    threads, busy = asyncio.run(burst())
+    assert busy == threads
+    assert gateway.stats()["admitted"]["interactive"] == 30
+
+
+def test_sync_and_async_callers_share_one_queue():
+    gateway = LLMGateway(rpm=600, burst_seconds=0.1)  # one call per 100 ms
+    gateway.acquire()  # empties the bucket
+    order = []
+
+    async def waiter(lane, name):
+        await gateway.aacquire(lane)
+        order.append(name)
+
+    async def run():
+        background = asyncio.ensure_future(waiter("background", "async-background"))
+        await asyncio.sleep(0.01)
+        thread = threading.Thread(target=lambda: (gateway.acquire(), order.append("sync")))
+        thread.start()
+        await asyncio.sleep(0.01)
+        interactive = asyncio.ensure_future(waiter("interactive", "async-interactive"))
+        await asyncio.gather(background, interactive)
+        thread.join(5)
+
+    asyncio.run(run())
+    assert order == ["sync", "async-interactive", "async-background"]
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    gateway = LLMGateway(rpm=600, burst_seconds=0.1)
+    gateway.acquire()
+
+    async def run():
+        waiter = asyncio.ensure_future(gateway.aacquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gateway.stats()["waiting"] == 0
+        return await asyncio.wait_for(gateway.aacquire(), 1)
+
+    assert asyncio.run(run()) > 0
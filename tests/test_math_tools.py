@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from tools.math_tools import calculator, evaluate_expression, multiply_numbers, sum_numbers
+
+
+@pytest.mark.parametrize("expression", [
+    "(9**9999)**9999",
+    "(10**10000)**10000",
+    "9**9**9",
+    "2**14001",
+    "(2**10000) * (2**10000)",
+    "(7**4000) * (7**4000) * (7**4000)",
+])
+def test_huge_integer_results_are_rejected_fast(expression):
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="too large"):
+        evaluate_expression(expression)
+    assert time.perf_counter() - start < 1
+
+
+def test_calculator_reports_the_limit_as_an_error():
+    assert calculator.invoke({"expression": "(9**9999)**9999"}) == "Error: Result is too large."
+
+
+def test_ordinary_expressions():
+    assert calculator.invoke({"expression": "3 * 4"}) == "12"
+    assert calculator.invoke({"expression": "2^10; 1.5 ** 4; (-1) ** 10**100"}) == \
+        "2^10 = 1024\n1.5 ** 4 = 5.0625\n(-1) ** 10**100 = 1"
+    assert evaluate_expression("2 ** 1000") == 2 ** 1000
+    assert evaluate_expression("10 ** -3") == 0.001
+
+
+def test_negative_exponents_are_not_bounded():
+    assert evaluate_expression("2**-100000") == 0.0
+    assert evaluate_expression("2**-3") == 0.125
+
+
+def test_integer_lists_stay_exact():
+    big = 2**53 + 1
+    assert multiply_numbers.invoke({"numbers": [big, 3]}) == big * 3
+    assert sum_numbers.invoke({"numbers": [big, 1]}) == big + 1
+    assert isinstance(sum_numbers.invoke({"numbers": [1, 2]}), int)
+
+
+def test_float_lists():
+    assert multiply_numbers.invoke({"numbers": [1.5, 2, 4]}) == 12.0
+    assert sum_numbers.invoke({"numbers": [0.5, 0.25]}) == 0.75
+
+
+def test_huge_integer_products_are_rejected():
+    with pytest.raises(ValueError, match="too large"):
+        multiply_numbers.invoke({"numbers": [10**3000] * 5})
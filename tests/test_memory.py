@@ -0,0 +1,103 @@
+from typing import List
+
+from fake_gemini import FakeGeminiChatModel
+from langchain_core.language_models import FakeListChatModel
+
+from agent.history_store import SQLiteHistoryStore
+from agent.memory import PersistentChatMessageHistory, build_memory
+from agent.session_pool import AgentPool
+
+
+class Summarizer(FakeListChatModel):
+    """Answers summary prompts with "summary 1", "summary 2", ... and keeps the prompts."""
+    responses: List[str] = [f"summary {n}" for n in range(1, 100)]
+    prompts: List[str] = []
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+def summary_memory(llm, chat_memory=None, max_turns=2):
+    return build_memory(llm, mode="summary", max_turns=max_turns, max_tokens=10_000, chat_memory=chat_memory)
+
+
+def say(memory, n):
+    memory.save_context({"input": f"question {n}"}, {"output": f"answer {n}"})
+
+
+def contents(memory):
+    return [message.content for message in memory.chat_memory.messages]
+
+
+def test_window_keeps_the_last_turns_and_rolls_the_rest_into_the_summary():
+    llm = Summarizer()
+    memory = summary_memory(llm)
+    for n in range(1, 4):
+        say(memory, n)
+
+    assert contents(memory) == ["question 2", "answer 2", "question 3", "answer 3"]
+    assert memory.moving_summary_buffer == "summary 1"
+    assert "question 1" in llm.prompts[-1]
+
+    say(memory, 4)
+    # Only the dropped turn goes to the LLM, along with the previous summary
+    assert "summary 1" in llm.prompts[-1] and "question 2" in llm.prompts[-1]
+    assert "question 1" not in llm.prompts[-1]
+    assert memory.moving_summary_buffer == "summary 2"
+
+    variables = memory.load_memory_variables({})
+    assert variables["chat_history"][0].content == "summary 2"
+    assert memory.metrics()["turns"] == 1
+    assert memory.metrics()["full_history_tokens"] > memory.metrics()["last_prompt_tokens"]
+
+
+def test_summary_is_persisted_and_restored(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "chat.db"))
+    memory = summary_memory(Summarizer(), PersistentChatMessageHistory(store, "room"))
+    for n in range(1, 4):
+        say(memory, n)
+    assert store.load_summary("room") == ("summary 1", 2)
+
+    # A restarted worker: the window starts after the summarized turn
+    llm = Summarizer()
+    restored = summary_memory(llm, PersistentChatMessageHistory(store, "room"))
+    assert restored.moving_summary_buffer == "summary 1"
+    assert contents(restored) == ["question 2", "answer 2", "question 3", "answer 3"]
+
+    say(restored, 4)
+    assert len(llm.prompts) == 1
+    assert "question 1" not in llm.prompts[0] and "question 2" in llm.prompts[0]
+    assert store.load_summary("room") == ("summary 1", 4)  # this Summarizer counts from 1 again
+
+
+def test_sync_adopts_the_summary_stored_by_another_worker(tmp_path):
+    path = str(tmp_path / "chat.db")
+    first = summary_memory(Summarizer(), PersistentChatMessageHistory(SQLiteHistoryStore(path), "room"))
+    second = summary_memory(Summarizer(responses=["other summary"]),
+                            PersistentChatMessageHistory(SQLiteHistoryStore(path), "room"))
+    say(first, 1)
+    assert second.chat_memory.sync() is True  # as ChatAgent does before each turn
+    second.adopt_history()
+    say(second, 2)
+    say(second, 3)  # the second worker rolls turn 1 into its summary
+
+    assert first.chat_memory.sync() is True
+    first.adopt_history()
+    assert first.moving_summary_buffer == "other summary"
+    assert contents(first) == ["question 2", "answer 2", "question 3", "answer 3"]
+
+
+def test_memory_stats_sum_live_rooms():
+    pool = AgentPool(llm=FakeGeminiChatModel(latency=0), history_store=None)
+    assert pool.memory_stats() == {"rooms": 0}
+    for room in ("a", "b"):
+        agent = pool.get(room)
+        agent.memory = summary_memory(Summarizer())
+        say(agent.memory, 1)
+        agent.memory.load_memory_variables({})
+
+    stats = pool.memory_stats()
+    assert stats["rooms"] == 2
+    assert stats["turns"] == 2
+    assert "last_prompt_tokens" not in stats
@@ -0,0 +1,154 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import pytest
+from fake_gemini import FakeGeminiChatModel
+
+from agent import prompts
+from agent.agent_base import ChatAgent
+
+ERROR = "An error occurred"
+
+
+class FakeContextCache:
+    """Stands in for GeminiContextCache; `expired` makes refresh fail as the API does."""
+    names = itertools.count()
+    fail_create = False
+    expired = False
+    refresh_due = True
+    refresh_threads = []
+
+    def __init__(self, model, system_text, tools=None):
+        if FakeContextCache.fail_create:
+            raise RuntimeError("create failed")
+        self.name = f"cachedContents/{next(self.names)}"
+
+    def refresh(self):
+        FakeContextCache.refresh_threads.append(threading.current_thread())
+        if FakeContextCache.expired:
+            raise RuntimeError("404 cached content not found")
+
+
+@pytest.fixture(autouse=True)
+def context_cache(monkeypatch):
+    monkeypatch.setattr(prompts, "_compiled", OrderedDict())
+    monkeypatch.setattr(prompts, "_supports_context_cache", lambda llm: True)
+    monkeypatch.setattr(prompts, "GeminiContextCache", FakeContextCache)
+    FakeContextCache.fail_create = FakeContextCache.expired = False
+    FakeContextCache.refresh_due = True
+    FakeContextCache.refresh_threads = []
+
+
+def react_agent():
+    return ChatAgent(llm=FakeGeminiChatModel(latency=0), agent_mode="react")
+
+
+def cached_content(agent):
+    return agent._agent[1].agent.llm_chain.llm_kwargs.get("cached_content")
+
+
+def test_expired_cache_is_recreated():
+    agent = react_agent()
+    assert not agent.handle_input("get user 1").startswith(ERROR)
+    first = cached_content(agent)
+
+    FakeContextCache.expired = True
+    prompt = agent._agent[0]
+    original = prompt.context_cache
+    assert not agent.handle_input("get user 2").startswith(ERROR)
+    assert prompt.context_cache is not original
+    assert cached_content(agent) == prompt.context_cache.name != first
+
+
+def test_falls_back_to_inline_prefix_when_recreating_fails():
+    agent = react_agent()
+    FakeContextCache.expired = FakeContextCache.fail_create = True
+    assert not agent.handle_input("get user 1").startswith(ERROR)
+    prompt = agent._agent[0]
+    assert prompt.context_cache is None
+    assert cached_content(agent) is None
+    assert prompt.template.messages[0].content == prompt.system_text
+    assert not agent.handle_input("get user 2").startswith(ERROR)
+
+
+def test_cache_creation_does_not_block_other_prompts(monkeypatch):
+    release = threading.Event()
+
+    class SlowCache(FakeContextCache):
+        def __init__(self, model, system_text, tools=None):
+            if tools is None:  # the react prompt: blocks until released
+                release.wait(10)
+            super().__init__(model, system_text, tools)
+
+    monkeypatch.setattr(prompts, "GeminiContextCache", SlowCache)
+    from tools.registry import registry
+
+    tools = registry.load()
+    slow = threading.Thread(target=prompts.compile_prompt, args=("react", tools))
+    slow.start()
+    try:
+        compiled = prompts.compile_prompt("tool_calling", tools)  # must not wait for the react upload
+        assert compiled.context_cache is not None
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join(10)
+
+
+def test_compiled_prompts_are_bounded(monkeypatch):
+    monkeypatch.setattr(prompts, "MAX_COMPILED_PROMPTS", 3)
+    from tools.registry import registry
+
+    subsets = [[tool] for tool in registry.load()][:4]
+    first = prompts.compile_prompt("react", subsets[0])
+    second = prompts.compile_prompt("react", subsets[1])
+    prompts.compile_prompt("react", subsets[2])
+    assert prompts.compile_prompt("react", subsets[0]) is first  # now the most recently used
+    prompts.compile_prompt("react", subsets[3])
+
+    assert len(prompts._compiled) == 3
+    assert first in prompts._compiled.values()
+    assert second not in prompts._compiled.values()
+
+
+def test_tool_subsets_are_not_context_cached():
+    class FirstTool:
+        def select(self, tools, user_input, recent):
+            return tools[:1]
+
+    agent = ChatAgent(llm=FakeGeminiChatModel(latency=0), agent_mode="tool_calling", tool_selector=FirstTool())
+    assert agent._agent[0].context_cache is not None  # the full tool set is cached
+    created = next(FakeContextCache.names)
+
+    assert not agent.handle_input("get user 1").startswith(ERROR)
+    [(prompt, _, _)] = agent._subset_agents.values()
+    assert prompt.context_cache is None
+    assert next(FakeContextCache.names) == created + 1  # nothing uploaded during the turn
+
+
+def test_refresh_runs_off_the_event_loop_thread():
+    agent = react_agent()
+    assert not agent.handle_input("get user 1").startswith(ERROR)
+    # handle_input runs the turn's loop on this thread; the blocking API call must not
+    assert FakeContextCache.refresh_threads
+    assert threading.current_thread() not in FakeContextCache.refresh_threads
+
+
+def test_refresh_is_skipped_until_due():
+    agent = react_agent()
+    FakeContextCache.refresh_due = False
+    assert not agent.handle_input("get user 1").startswith(ERROR)
+    assert FakeContextCache.refresh_threads == []
+
+
+def test_failed_compile_does_not_leave_its_build_lock(monkeypatch):
+    from tools.registry import registry
+
+    def broken(tools):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(prompts, "render_react_prefix", broken)
+    with pytest.raises(RuntimeError):
+        prompts.compile_prompt("react", registry.load())
+    assert prompts._building == {}
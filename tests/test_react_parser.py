@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from agent.react_parser import IncrementalReActOutputParser, StreamingReActParser
+
+
+def parse(text):
+    return IncrementalReActOutputParser().parse(text)
+
+
+def stream(text, size=3):
+    parser = StreamingReActParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+        if parser.stopped:
+            break
+    return parser.finish()
+
+
+@pytest.mark.parametrize("run", [parse, stream])
+def test_final_answer_after_a_thought_on_the_same_line(run):
+    result = run("Thought: x. Final Answer: Paris")
+    assert isinstance(result, AgentFinish)
+    assert result.return_values["output"] == "Paris"
+
+
+@pytest.mark.parametrize("run", [parse, stream])
+def test_action_markers_on_one_line(run):
+    result = run("Thought: I should look them up. Action: get_user_details Action Input: 42\nObservation: ...")
+    assert isinstance(result, AgentAction)
+    assert (result.tool, result.tool_input) == ("get_user_details", "42")
+
+
+@pytest.mark.parametrize("run", [parse, stream])
+def test_multi_line_json_input_waits_for_balanced_brackets(run):
+    result = run('Thought: t\nAction: calculator\nAction Input: {"expression":\n  "3 * 4"}\nObservation: 12\n'
+                 "Final Answer: 12")
+    assert isinstance(result, AgentAction)
+    assert result.tool_input == '{"expression":\n  "3 * 4"}'
+
+
+def test_final_answer_keeps_markers_it_mentions():
+    result = parse("Thought: done\nFinal Answer: use the Action: field, then read the Observation: line")
+    assert result.return_values["output"] == "use the Action: field, then read the Observation: line"
+
+
+def test_stops_at_observation_after_the_action():
+    parser = StreamingReActParser()
+    action = parser.feed("Action: calculator\nAction Input: 3 * 4\n")
+    assert action.tool_input == "3 * 4"
+    parser.feed("Observation: 12\nFinal Answer: 12")
+    assert parser.stopped
+    assert parser.finish() is action
+
+
+def test_unparseable_output():
+    with pytest.raises(OutputParserException):
+        parse("I am not sure what to do")
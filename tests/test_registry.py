@@ -0,0 +1,108 @@
+import sys
+from importlib import metadata
+
+import pytest
+from langchain_core.tools import tool
+
+from tools.registry import ToolRegistry, ToolSpec
+
+PLUGIN = '''
+from langchain_core.tools import tool
+
+
+@tool
+def weather(city: str) -> str:
+    """Reports the weather in a city."""
+    return f"Sunny in {city}"
+'''
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    """An installed-looking tool package that nothing has imported yet."""
+    (tmp_path / "weather_plugin.py").write_text(PLUGIN)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "weather_plugin"
+    sys.modules.pop("weather_plugin", None)
+
+
+@pytest.fixture
+def entry_points(monkeypatch):
+    """Stands in for the installed distributions' entry points; counts scans."""
+    declared, scans = [], []
+
+    def fake_entry_points(group):
+        scans.append(group)
+        return [ep for ep in declared if ep.group == group]
+
+    monkeypatch.setattr(metadata, "entry_points", fake_entry_points)
+    return declared, scans
+
+
+def test_tool_module_is_imported_on_first_use(plugin):
+    registry = ToolRegistry(specs=[ToolSpec("weather", f"{plugin}:weather")], entry_point_group=None)
+    assert registry.names() == ["weather"]
+    assert plugin not in sys.modules
+
+    weather = registry.get("weather")
+    assert plugin in sys.modules
+    assert weather.invoke({"city": "Oslo"}) == "Sunny in Oslo"
+    assert registry.get("weather") is weather
+    assert registry.stats()["loaded"] == ["weather"]
+
+
+def test_entry_points_are_discovered_once_and_loaded_lazily(plugin, entry_points):
+    declared, scans = entry_points
+    declared += [
+        metadata.EntryPoint("weather", f"{plugin}:weather", "llm_agent.tools"),
+        metadata.EntryPoint("calculator", f"{plugin}:weather", "llm_agent.tools"),  # clashes with a builtin
+        metadata.EntryPoint("other", f"{plugin}:weather", "other.group"),
+    ]
+    registry = ToolRegistry()
+    assert scans == []  # nothing is scanned at construction
+
+    assert "weather" in registry.names()
+    assert "other" not in registry.names()
+    assert "weather" in registry.default_names()
+    assert scans == ["llm_agent.tools"]
+    assert plugin not in sys.modules
+
+    assert registry.get("weather").name == "weather"
+    assert registry.get("calculator").func.__module__ == "tools.math_tools"  # the builtin wins
+    assert scans == ["llm_agent.tools"]
+
+
+def test_unknown_and_misregistered_tools_fail(plugin):
+    registry = ToolRegistry(specs=[ToolSpec("forecast", f"{plugin}:weather")], entry_point_group=None)
+    with pytest.raises(KeyError, match="Unknown tool: nope"):
+        registry.get("nope")
+    with pytest.raises(ValueError, match="registered as 'forecast'"):
+        registry.get("forecast")
+
+
+def test_register_refuses_to_replace_a_loaded_tool(plugin):
+    registry = ToolRegistry(specs=[], entry_point_group=None)
+    registry.register("weather", f"{plugin}:weather", default=False)
+    assert registry.default_names() == []
+    registry.get("weather")
+    with pytest.raises(ValueError, match="already loaded"):
+        registry.register("weather", f"{plugin}:weather")
+
+
+def test_schemas_are_derived_once_per_registered_tool():
+    registry = ToolRegistry(entry_point_group=None)
+    calculator = registry.get("calculator")
+
+    schema = registry.schema(calculator)
+    assert schema["function"]["name"] == "calculator"
+    assert registry.schema(calculator) is schema
+    assert registry.schemas([calculator]) == [schema]
+    assert registry.stats()["schemas_cached"] == 1
+
+    @tool
+    def calculator_lookalike(expression: str) -> str:
+        """Not the registered calculator."""
+        return expression
+
+    assert registry.schema(calculator_lookalike)["function"]["name"] == "calculator_lookalike"
+    assert registry.stats()["schemas_cached"] == 1  # tools the registry did not load are not cached
@@ -0,0 +1,58 @@
+import pytest
+
+from agent.router import CANNED_REPLIES, FastPathRouter
+
+NOT_SMALL_TALK = ["take care of it", "no thanks", "see you in court", "goodbye world",
+                  "hi, what's my balance", "thanks, now get user 42 and their orders"]
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Hi!", "greeting"), ("good morning", "greeting"), ("Thank you.", "thanks"),
+    ("thanks, bye", None), ("Take care", "farewell"), ("goodbye", "farewell"),
+])
+def test_exact_small_talk(text, intent):
+    route = FastPathRouter().classify(text)
+    if intent is None:
+        assert route.kind == "agent"
+    else:
+        assert (route.kind, route.intent, route.reply) == ("canned", intent, CANNED_REPLIES[intent])
+
+
+@pytest.mark.parametrize("threshold", [None, 0.5])
+@pytest.mark.parametrize("text", NOT_SMALL_TALK)
+def test_requests_are_not_small_talk(text, threshold):
+    assert FastPathRouter(threshold=threshold).classify(text).kind in ("agent", "tool")
+
+
+def test_similarity_matches_rewordings_of_small_talk_words():
+    router = FastPathRouter(threshold=0.5)
+    assert router.classify("hello hi there").intent == "greeting"
+    assert FastPathRouter().classify("hello hi there").kind == "agent"
+
+
+@pytest.mark.parametrize("text, tool, tool_input", [
+    ("get user detail for 123", "get_user_details", {"id": "123"}),
+    ("user 42?", "get_user_details", {"id": "42"}),
+    ("what is 3 * 4", "calculator", {"expression": "3 * 4"}),
+    ("multiply 6 and 7", "calculator", {"expression": "6 * 7"}),
+    ("subtract 2 from 10", "calculator", {"expression": "10 - 2"}),
+])
+def test_tool_shaped_requests(text, tool, tool_input):
+    route = FastPathRouter().classify(text)
+    assert (route.kind, route.tool, route.tool_input) == ("tool", tool, tool_input)
+
+
+@pytest.mark.parametrize("text", [
+    "what is the capital of France", "get user 456 and multiply 6 and 7", "what is 3", "user details", "",
+])
+def test_everything_else_goes_to_the_agent(text):
+    assert FastPathRouter().classify(text).kind == "agent"
+
+
+def test_stats_count_the_route_taken():
+    router = FastPathRouter()
+    router.record("canned", "greeting")
+    router.record("agent")
+    stats = router.stats()
+    assert (stats["canned"], stats["agent"], stats["routed_ratio"]) == (1, 1, 0.5)
+    assert stats["intents"] == {"greeting": 1}
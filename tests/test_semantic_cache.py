@@ -0,0 +1,81 @@
+from agent.semantic_cache import SemanticCache, key_terms
+
+CONTEXT = SemanticCache.context_digest([])  # a new conversation
+
+
+def test_different_ids_do_not_hit():
+    cache = SemanticCache()
+    cache.store("get details of user with id 98766", CONTEXT, "user 98766", ["get_user_details"], room="a")
+    assert cache.lookup("get details of user with id 98765", CONTEXT, room="a") is None
+    assert cache.lookup("get details of user with id 98766", CONTEXT, room="a") == "user 98766"
+
+
+def test_years_and_amounts_must_match():
+    cache = SemanticCache()
+    cache.store("what was revenue in EMEA for 2023", CONTEXT, "2023 revenue")
+    cache.store("convert 250 dollars to euros", CONTEXT, "230 euros")
+    assert cache.lookup("what was revenue in EMEA for 2024", CONTEXT) is None
+    assert cache.lookup("convert 260 dollars to euros", CONTEXT) is None
+    assert cache.lookup("What was revenue in EMEA for 2023?", CONTEXT) == "2023 revenue"
+
+
+def test_tool_answers_stay_in_their_room():
+    cache = SemanticCache()
+    cache.store("get user 42", CONTEXT, "private details", ["get_user_details"], room="alice")
+    assert cache.lookup("get user 42", CONTEXT, room="bob") is None
+    assert cache.lookup("get user 42", CONTEXT, room="alice") == "private details"
+    # Without a room a tool answer cannot be scoped, so it is not cached at all
+    cache.store("get user 7", CONTEXT, "details", ["get_user_details"])
+    assert cache.stats()["entries"] == 1
+
+
+def test_answers_without_tools_and_shared_tool_answers_cross_rooms():
+    cache = SemanticCache()
+    cache.store("what is the capital of France", CONTEXT, "Paris", room="alice")
+    assert cache.lookup("what is the capital of france", CONTEXT, room="bob") == "Paris"
+
+    shared = SemanticCache(share_tool_answers=True)
+    shared.store("get user 42", CONTEXT, "details", ["get_user_details"], room="alice")
+    assert shared.lookup("get user 42", CONTEXT, room="bob") == "details"
+
+
+def test_key_terms():
+    assert key_terms("email jordan@example.com about TM-20481") == ("jordan@example.com", "tm-20481")
+    assert key_terms("what is the capital of France") == ()
+
+
+def test_full_cache_reuses_the_oldest_row():
+    cache = SemanticCache(max_entries=3)
+    for i in range(4):
+        cache.store(f"question {i}", CONTEXT, f"answer {i}")
+    assert cache.lookup("question 0", CONTEXT) is None
+    assert [cache.lookup(f"question {i}", CONTEXT) for i in (1, 2, 3)] == ["answer 1", "answer 2", "answer 3"]
+    assert cache.stats()["entries"] == 3
+    assert cache._vectors.shape[0] == 3  # allocated once
+
+
+def test_expired_and_invalidated_rows_are_freed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("agent.semantic_cache.time.time", lambda: now[0])
+    cache = SemanticCache(ttl=10, tool_ttl={"get_user_details": 1}, max_entries=4)
+    cache.store("get user 42", CONTEXT, "details", ["get_user_details"], room="a")
+    cache.store("capital of france", CONTEXT, "Paris")
+    cache.store("sum 1 and 2", CONTEXT, "3", ["calculator"], room="a")
+
+    now[0] += 2
+    assert cache.lookup("get user 42", CONTEXT, room="a") is None
+    cache.store("capital of spain", CONTEXT, "Madrid")  # prunes the expired entry, reusing its row
+    assert cache._rows == 3
+    assert cache.invalidate_tool("calculator") == 1
+    assert cache.lookup("sum 1 and 2", CONTEXT, room="a") is None
+    assert cache.lookup("capital of france", CONTEXT) == "Paris"
+    assert cache.stats()["entries"] == 2
+
+
+def test_stats_are_exported_to_metrics():
+    from agent.instrumentation import METRICS
+    from agent.session_pool import AgentPool
+
+    cache = AgentPool._build_semantic_cache()
+    cache.lookup("anything", CONTEXT)
+    assert 'agent_semantic_cache{stat="misses"} 1' in METRICS.render()
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+from fake_gemini import FakeGeminiChatModel
+
+from agent.session_pool import AgentPool
+
+
+def pool(**kwargs):
+    return AgentPool(llm=FakeGeminiChatModel(latency=0), history_store=None, **kwargs)
+
+
+def test_least_recently_used_room_is_evicted():
+    agents = pool(max_sessions=2)
+    a = agents.get("a")
+    agents.get("b")
+    assert agents.get("a") is a  # now the most recently used
+    agents.get("c")
+
+    assert "a" in agents and "c" in agents and "b" not in agents
+    assert len(agents) == 2
+
+
+def test_idle_rooms_are_evicted():
+    agents = pool(idle_timeout=0.05)
+    a = agents.get("a")
+    time.sleep(0.1)
+    agents.get("b")
+
+    assert "a" not in agents
+    assert agents.get("a") is not a  # a fresh agent with fresh memory
+
+
+def test_rooms_have_their_own_memory():
+    agents = pool()
+    agents.get("a").handle_input("what is the capital of France")
+    assert agents.get("a").memory.chat_memory.messages
+    assert not agents.get("b").memory.chat_memory.messages
+
+
+def test_a_slow_build_only_blocks_its_own_room(monkeypatch):
+    agents = pool()
+    release = threading.Event()
+    builds = []
+    new_agent = agents._new_agent
+
+    def slow_new_agent(room):
+        builds.append(room)
+        if room == "slow":
+            release.wait(10)
+        return new_agent(room)
+
+    monkeypatch.setattr(agents, "_new_agent", slow_new_agent)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(agents.get("slow"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(0.05)
+        start = time.monotonic()
+        agents.get("fast")
+        agents.evict("other")
+        assert len(agents) == 1
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join(10)
+
+    assert builds.count("slow") == 1
+    assert len(results) == 5 and all(agent is results[0] for agent in results)
+    assert agents.get("slow") is results[0]
+
+
+def test_failed_build_is_retried(monkeypatch):
+    agents = pool()
+    new_agent = agents._new_agent
+    calls = []
+
+    def flaky(room):
+        calls.append(room)
+        if len(calls) == 1:
+            raise RuntimeError("history store down")
+        return new_agent(room)
+
+    monkeypatch.setattr(agents, "_new_agent", flaky)
+    with pytest.raises(RuntimeError):
+        agents.get("a")
+    assert agents.get("a") is not None
+    assert len(calls) == 2
+
+
+def test_unknown_tools_are_rejected():
+    with pytest.raises(ValueError, match="nope"):
+        pool().set_tools("a", ["nope"])
+
+
+def test_tool_selection_goes_with_the_room():
+    agents = pool(max_sessions=2, idle_timeout=0.05)
+    agents.set_tools("a", ["calculator"])
+    assert [tool.name for tool in agents.get("a").tools] == ["calculator"]
+    agents.evict("a")
+    assert "a" not in agents._room_tools
+
+    agents.set_tools("b", ["calculator"])
+    agents.get("b")
+    time.sleep(0.1)
+    agents.get("c")  # evicts the idle room b
+    assert "b" not in agents._room_tools
+
+
+def test_selections_for_rooms_without_an_agent_are_bounded():
+    agents = pool(max_sessions=2)
+    for i in range(10):
+        agents.set_tools(f"room-{i}", ["calculator"])
+    assert list(agents._room_tools) == ["room-8", "room-9"]
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fake_gemini import FakeGeminiChatModel
+
+from agent.agent_base import ChatAgent
+
+
+class BrokenModel(FakeGeminiChatModel):
+    """Fails every call, as an exhausted quota or a dropped connection would."""
+
+    def _respond(self, messages, tools):
+        raise RuntimeError("quota exhausted")
+
+
+def stream(agent, user_input):
+    async def collect():
+        return [event async for event in agent.astream_input(user_input)]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("agent_mode", ["react", "tool_calling"])
+def test_tool_turn_streams_tool_steps_then_tokens_then_final(agent_mode):
+    agent = ChatAgent(llm=FakeGeminiChatModel(latency=0), agent_mode=agent_mode)
+    events = stream(agent, "multiply 3 and 4")
+
+    kinds = [event["type"] for event in events]
+    assert kinds[:2] == ["tool_start", "tool_end"]
+    assert events[0]["tool"] == events[1]["tool"] == "calculator"
+    assert events[1]["output"] == "12"
+    assert set(kinds[2:-1]) == {"token"}
+    assert kinds[-1] == "final"
+    final = events[-1]["message"]
+    assert final.startswith("Here is what I found.")
+    assert "".join(event["text"] for event in events if event["type"] == "token").strip() == final
+    assert agent.last_trace.attributes["streaming"] and agent.last_trace.error is None
+    assert "calculator" in agent.last_trace.tools_used
+
+
+@pytest.mark.parametrize("agent_mode", ["react", "tool_calling"])
+def test_answer_without_tools_streams_tokens_then_final(agent_mode):
+    agent = ChatAgent(llm=FakeGeminiChatModel(latency=0), agent_mode=agent_mode)
+    events = stream(agent, "hi there")
+
+    assert [event["type"] for event in events[:-1]] == ["token"] * (len(events) - 1)
+    assert events[-1] == {"type": "final", "message": "".join(e["text"] for e in events[:-1]).strip()}
+    # The turn is remembered like a blocking one
+    assert [m.content for m in agent.memory.chat_memory.messages][0] == "hi there"
+
+
+def test_failed_turn_ends_with_an_error_final():
+    agent = ChatAgent(llm=BrokenModel(latency=0), agent_mode="tool_calling")
+    events = stream(agent, "hi there")
+
+    assert events == [{"type": "final",
+                       "message": "An error occurred while processing your input: quota exhausted"}]
+    assert agent.last_trace.error == "quota exhausted"
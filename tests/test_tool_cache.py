@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.tools import tool
+
+from agent.instrumentation import METRICS
+from tools import cache as tool_cache
+from tools.cache import ToolCache, cached
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ToolCache("t", ttl=10)
+    cache.set("k", "v")
+    clock[0] += 9
+    assert cache.get("k") == (True, "v")
+    clock[0] += 2
+    assert cache.get("k") == (False, None)
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolCache("t", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # now "b" is the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_disk_tier_is_shared_and_survives_restarts(tmp_path, clock):
+    path = str(tmp_path / "tools.db")
+    ToolCache("t", ttl=10, path=path).set("k", {"id": 1})
+
+    restarted = ToolCache("t", ttl=10, path=path)
+    assert restarted.get("k") == (True, {"id": 1})
+    assert restarted.stats()["size"] == 1  # promoted to the memory tier
+    assert ToolCache("other", path=path).get("k") == (False, None)  # keyed per tool
+
+    clock[0] += 11
+    assert ToolCache("t", ttl=10, path=path).get("k") == (False, None)
+
+
+def test_clear_drops_both_tiers(tmp_path):
+    path = str(tmp_path / "tools.db")
+    cache = ToolCache("t", path=path)
+    cache.set("k", "v")
+    cache.clear()
+    assert cache.get("k") == (False, None)
+    assert ToolCache("t", path=path).get("k") == (False, None)
+
+
+def test_coroutine_side_uses_the_disk_tier_off_the_loop(tmp_path):
+    path = str(tmp_path / "tools.db")
+    ToolCache("t", path=path).set("k", "v")
+    cache = ToolCache("t", path=path)
+    threads = []
+    disk_get = cache._disk_get
+
+    def recording_disk_get(key, now):
+        threads.append(threading.current_thread())
+        return disk_get(key, now)
+
+    cache._disk_get = recording_disk_get
+
+    async def lookup():
+        return await cache.aget("k"), threading.current_thread()
+
+    (hit, loop_thread) = asyncio.run(lookup())
+    assert hit == (True, "v")
+    assert threads and loop_thread not in threads
+
+
+def test_cached_tool_and_metrics(monkeypatch):
+    monkeypatch.setattr(tool_cache, "TOOL_CACHES", {})
+    calls = []
+
+    @cached(ttl=60)
+    @tool
+    def lookup_thing(id: str) -> str:
+        """Looks a thing up."""
+        calls.append(id)
+        return f"thing {id}"
+
+    assert lookup_thing.invoke({"id": "1"}) == "thing 1"
+    assert lookup_thing.invoke({"id": " 1 "}) == "thing 1"  # normalized to the same key
+    assert calls == ["1"]
+
+    rendered = METRICS.render()
+    assert 'agent_tool_cache{tool="lookup_thing",stat="hits"} 1' in rendered
+    assert 'agent_tool_cache{tool="lookup_thing",stat="misses"} 1' in rendered
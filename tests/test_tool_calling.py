@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+from fake_gemini import FakeGeminiChatModel
+from langchain_core.tools import StructuredTool
+
+from agent.agent_base import ChatAgent
+
+TOOL_SECONDS = 0.4
+
+
+def slow_tools(log):
+    """Stand-ins for the tools the fake model plans, each taking TOOL_SECONDS."""
+    async def get_user_details(id: str) -> str:
+        log.append(("get_user_details", id))
+        await asyncio.sleep(TOOL_SECONDS)
+        return f'{{"tmId": "{id}"}}'
+
+    def calculator(expression: str) -> str:
+        log.append(("calculator", threading.current_thread().name))
+        time.sleep(TOOL_SECONDS)
+        return "12"
+
+    return [
+        StructuredTool.from_function(coroutine=get_user_details, name="get_user_details",
+                                     description="Looks a user up by id."),
+        StructuredTool.from_function(func=calculator, name="calculator",
+                                     description="Evaluates an arithmetic expression."),
+    ]
+
+
+def test_tool_calls_of_one_response_run_concurrently():
+    log = []
+    llm = FakeGeminiChatModel(latency=0)
+    agent = ChatAgent(llm=llm, tools=slow_tools(log), agent_mode="tool_calling")
+
+    start = time.perf_counter()
+    reply = agent.handle_input("get user 1 and user 2, then multiply 3 * 4")
+    elapsed = time.perf_counter() - start
+
+    assert reply.startswith("Here is what I found.")
+    assert sorted(call for call in log if call[0] == "get_user_details") == \
+        [("get_user_details", "1"), ("get_user_details", "2")]
+    # The sync tool ran on the thread pool, not on the turn's own thread
+    [(_, calculator_thread)] = [call for call in log if call[0] == "calculator"]
+    assert calculator_thread != threading.current_thread().name
+    # Three tools in about the time of one, and one model round-trip for all of them
+    assert elapsed < 2 * TOOL_SECONDS
+    assert llm.counters["llm_calls"] == 2
+    assert llm.counters["tool_calls"] == 3
+
+
+def test_react_mode_runs_one_tool_per_round_trip():
+    log = []
+    llm = FakeGeminiChatModel(latency=0)
+    agent = ChatAgent(llm=llm, tools=slow_tools(log), agent_mode="react")
+
+    start = time.perf_counter()
+    agent.handle_input("get user 1 and user 2")
+    elapsed = time.perf_counter() - start
+
+    assert [call[1] for call in log] == ["1", "2"]
+    assert elapsed >= 2 * TOOL_SECONDS
+    assert llm.counters["llm_calls"] == 3
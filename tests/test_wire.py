@@ -0,0 +1,56 @@
+from wire import WireEncoder, decode
+
+
+def test_room_codec_follows_the_clients_in_the_room():
+    wire = WireEncoder(compression="gzip", min_bytes=10)
+    assert wire.negotiate("r", "a", ["gzip"], deflate=True) == "none"
+    assert wire.room_codec("r") == "none"
+
+    assert wire.negotiate("r", "b", ["gzip"]) == "gzip"
+    assert wire.room_codec("r") == "gzip"
+
+    wire.negotiate("r", "c", [])  # an old client that decodes nothing
+    assert wire.room_codec("r") == "none"
+
+    wire.leave("c", "r")
+    assert wire.room_codec("r") == "gzip"
+    wire.leave("b")
+    assert wire.room_codec("r") == "none"
+
+
+def test_rooms_spanning_processes_get_plain_payloads():
+    wire = WireEncoder(compression="gzip", min_bytes=10, shared_rooms=True)
+    # Other members may sit on another worker, having negotiated nothing here
+    assert wire.negotiate("r", "b", ["gzip"]) == "gzip"  # events to this client alone
+    assert wire.room_codec("r") == "none"
+    assert wire.encode({"message": "x" * 100}, wire.room_codec("r")) == {"message": "x" * 100}
+
+
+def test_disconnect_forgets_every_room_of_the_session():
+    wire = WireEncoder(compression="gzip")
+    for room in ("r1", "r2", "r3"):
+        wire.negotiate(room, "a", ["gzip"])
+    wire.negotiate("r1", "b", ["gzip"], deflate=True)
+
+    wire.leave("a")
+
+    assert wire.room_codec("r1") == "none"
+    assert wire._rooms == {"r1": {"b": (frozenset({"gzip"}), True)}}
+    wire.leave("b")
+    assert wire._rooms == {} and wire._session_rooms == {}
+
+
+def test_rejoining_replaces_the_client_entry():
+    wire = WireEncoder(compression="gzip")
+    wire.negotiate("r", "a", [])
+    wire.negotiate("r", "a", ["gzip"])
+    assert wire.room_codec("r") == "gzip"
+
+
+def test_large_payloads_round_trip():
+    wire = WireEncoder(compression="gzip", min_bytes=100)
+    payload = {"message": "hello " * 100}
+    frame = wire.encode(payload, "gzip")
+    assert isinstance(frame, bytes) and frame[0] == 1
+    assert decode(frame) == payload
+    assert wire.encode({"message": "hi"}, "gzip") == {"message": "hi"}
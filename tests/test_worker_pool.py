@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from worker_pool import RoomWorkerPool, run_on_thread_loop
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.001)
+
+
+def test_jobs_of_a_room_run_in_arrival_order():
+    pool = RoomWorkerPool(max_workers=4, max_pending=100, max_pending_per_room=100)
+    done = {"a": [], "b": []}
+
+    def job(room, n):
+        time.sleep(0.001 * (n % 3))  # uneven durations must not reorder a room
+        done[room].append(n)
+
+    for n in range(20):
+        assert pool.submit("a", job, "a", n)
+        assert pool.submit("b", job, "b", n)
+    wait_until(lambda: pool.pending == 0)
+    pool.shutdown()
+
+    assert done == {"a": list(range(20)), "b": list(range(20))}
+
+
+def test_rooms_run_concurrently():
+    pool = RoomWorkerPool(max_workers=2)
+    release = threading.Event()
+    started = []
+
+    def job(room):
+        started.append(room)
+        release.wait(5)
+
+    pool.submit("a", job, "a")
+    pool.submit("b", job, "b")
+    wait_until(lambda: len(started) == 2)  # b did not queue behind a
+    release.set()
+    pool.shutdown()
+
+
+def test_a_room_is_refused_past_its_queue_bound():
+    pool = RoomWorkerPool(max_workers=2, max_pending=100, max_pending_per_room=3)
+    release = threading.Event()
+
+    accepted = [pool.submit("a", release.wait, 5) for _ in range(4)]
+    assert accepted == [True, True, True, False]  # one running, two waiting
+    assert pool.submit("b", release.wait, 5)  # other rooms are unaffected
+    release.set()
+    wait_until(lambda: pool.pending == 0)
+    assert pool.submit("a", release.wait, 5)
+    pool.shutdown()
+
+
+def test_pool_reports_busy_once_max_pending_jobs_wait():
+    pool = RoomWorkerPool(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    assert pool.submit("a", release.wait, 5)
+    assert pool.submit("b", release.wait, 5)
+    assert not pool.submit("c", release.wait, 5)
+    assert pool.pending == 2
+    release.set()
+    wait_until(lambda: pool.pending == 0)
+    pool.shutdown()
+
+
+def test_a_failing_job_does_not_stall_its_room():
+    pool = RoomWorkerPool(max_workers=1)
+    done = []
+
+    def broken():
+        raise ValueError("boom")
+
+    pool.submit("a", broken)
+    pool.submit("a", done.append, "next")
+    wait_until(lambda: pool.pending == 0)
+    pool.shutdown()
+    assert done == ["next"]
+
+
+def test_run_on_thread_loop_refuses_a_running_loop():
+    async def nested():
+        return run_on_thread_loop(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError, match="running event loop"):
+        asyncio.run(nested())
+    assert run_on_thread_loop(asyncio.sleep(0, result=1)) == 1
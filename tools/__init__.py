@@ -1,4 +1,16 @@
-from tools.math_tools import custom_add, custom_divide
-from tools.user_tools import get_user_details
+from tools.registry import registry
 
-ALL_TOOLS = [get_user_details]
\ No newline at end of file
+# Tool modules pull in langchain and the HTTP clients, so tools are imported
+# through the registry on first use instead of when the package is imported.
+
+
+def __getattr__(name):
+    if name == "ALL_TOOLS":
+        # The default selection; custom_add / custom_divide are covered by the calculator
+        value = registry.load()
+    elif name in registry.names():
+        value = registry.get(name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
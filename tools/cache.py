@@ -0,0 +1,211 @@
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.tools import BaseTool
+
+from agent.instrumentation import METRICS
+
+# name -> ToolCache for every tool that opted in, for stats and invalidation
+TOOL_CACHES = {}
+
+
+def normalize_args(args, kwargs) -> str:
+    """Cache key for a call: positional and keyword args, strings stripped, keys sorted."""
+    def norm(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {k: norm(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [norm(v) for v in value]
+        return value
+    return json.dumps([norm(list(args)), norm(kwargs)], sort_keys=True, default=str)
+
+
+class ToolCache:
+    """
+    Thread-safe TTL + LRU cache for one tool's results.
+    With `path`, entries are also written to a SQLite file shared by every
+    process using the same path, so hits survive restarts. The SQLite tier has
+    a lock of its own, so disk I/O never holds up memory hits, and the
+    coroutine side (`aget`/`aset`) does it on a worker thread, off the loop.
+    """
+
+    def __init__(self, name: str, ttl: float = 300, maxsize: int = 256, path: str = None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                "tool TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (tool, key))"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        now = time.time()
+        hit, value = self._memory_get(key, now)
+        if not hit and self._db is not None:
+            hit, value = self._disk_get(key, now)
+        return self._counted(hit, value)
+
+    async def aget(self, key):
+        """`get` for coroutines: a memory miss reads the SQLite tier on a worker thread."""
+        now = time.time()
+        hit, value = self._memory_get(key, now)
+        if not hit and self._db is not None:
+            hit, value = await asyncio.to_thread(self._disk_get, key, now)
+        return self._counted(hit, value)
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._db is not None:
+            self._disk_set(key, value, expires_at)
+
+    async def aset(self, key, value):
+        """`set` for coroutines: the SQLite write runs on a worker thread."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return True, entry[1]
+            if entry:
+                del self._entries[key]
+            return False, None
+
+    def _disk_get(self, key, now):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE tool = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+        if not row or row[1] <= now:
+            return False, None
+        value = json.loads(row[0])
+        with self._lock:
+            self._store(key, value, row[1])
+        return True, value
+
+    def _disk_set(self, key, value, expires_at):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_cache (tool, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, json.dumps(value, default=str), expires_at),
+            )
+            self._db.commit()
+
+    def _counted(self, hit, value):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit, value
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM tool_cache WHERE tool = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+
+def cached(ttl: float = 300, maxsize: int = 256, path: str = None):
+    """
+    Opt a read-only @tool into result caching. Apply above @tool:
+
+        @cached(ttl=60)
+        @tool
+        def get_user_details(id: str) -> str: ...
+
+    Calls are keyed on normalized arguments. Exceptions (including
+    ToolException) are never cached.
+    :param ttl: Seconds an entry stays fresh.
+    :param maxsize: Max entries kept in memory, least-recently-used evicted first.
+    :param path: Optional SQLite file for a shared on-disk cache.
+    """
+    def decorator(tool: BaseTool) -> BaseTool:
+        cache = ToolCache(tool.name, ttl=ttl, maxsize=maxsize, path=path)
+        TOOL_CACHES[tool.name] = cache
+
+        func = getattr(tool, "func", None)
+        if func is not None:
+            @functools.wraps(func)
+            def cached_func(*args, **kwargs):
+                key = normalize_args(args, kwargs)
+                hit, value = cache.get(key)
+                if hit:
+                    return value
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+                return value
+            tool.func = cached_func
+
+        coroutine = getattr(tool, "coroutine", None)
+        if coroutine is not None:
+            @functools.wraps(coroutine)
+            async def cached_coroutine(*args, **kwargs):
+                key = normalize_args(args, kwargs)
+                hit, value = await cache.aget(key)
+                if hit:
+                    return value
+                value = await coroutine(*args, **kwargs)
+                await cache.aset(key, value)
+                return value
+            tool.coroutine = cached_coroutine
+
+        if func is None and coroutine is None:
+            raise TypeError(f"Tool {tool.name} has no func/coroutine to cache")
+        return tool
+    return decorator
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for every cached tool, keyed by tool name."""
+    return {name: cache.stats() for name, cache in list(TOOL_CACHES.items())}
+
+
+METRICS.register_stats("tool_cache", "Tool result cache hits, misses, hit rate and entries, per tool.",
+                       cache_stats, label="tool")
+
+
+__all__ = ['cached', 'cache_stats', 'ToolCache', 'TOOL_CACHES']
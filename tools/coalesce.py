@@ -0,0 +1,280 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from langchain_core.tools import BaseTool
+
+from agent.instrumentation import METRICS
+from tools.cache import normalize_args
+
+logger = logging.getLogger(__name__)
+
+# name -> SingleFlight / MicroBatcher, for stats
+SINGLE_FLIGHTS = {}
+BATCHERS = {}
+
+
+class _Abandoned(Exception):
+    """Set on a shared call whose leader was cancelled; followers retry it."""
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical calls: while a call for a key is in
+    flight, later callers with the same key wait for its result instead of
+    starting their own. Results are shared only while the call is running;
+    caching completed results is ToolCache's job.
+
+    The shared result is a concurrent.futures.Future, so callers on different
+    threads and different event loops (one per agent turn) coalesce too. A
+    leader whose turn is cancelled does not cancel its followers: the next
+    one retries the call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def _join(self, key, retry=False):
+        """Return (future, True if this caller leads the call)."""
+        with self._lock:
+            if not retry:
+                self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                if not retry:
+                    self.shared += 1
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _settle(self, key, future, value=None, error=None):
+        with self._lock:
+            del self._in_flight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _failed(self, key, future, error):
+        # Followers must not wait forever, nor inherit the leader's cancellation
+        self._settle(key, future, error=_Abandoned() if isinstance(error, asyncio.CancelledError) else error)
+
+    def do(self, key, fn):
+        """Run `fn()` for `key`, or wait for the identical call already in flight."""
+        retry = False
+        while True:
+            future, leader = self._join(key, retry)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _Abandoned:
+                retry = True
+        try:
+            value = fn()
+        except BaseException as e:
+            self._failed(key, future, e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    async def ado(self, key, fn):
+        """Async `do`: `fn()` returns an awaitable; followers wait without blocking the loop."""
+        retry = False
+        while True:
+            future, leader = self._join(key, retry)
+            if leader:
+                break
+            try:
+                # Shielded: a follower's own cancellation must not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                retry = True
+        try:
+            value = await fn()
+        except BaseException as e:
+            self._failed(key, future, e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "share_rate": self.shared / self.calls if self.calls else 0.0,
+                "in_flight": len(self._in_flight),
+            }
+
+
+class MicroBatcher:
+    """
+    Merges lookups that arrive within `window` seconds of each other into one
+    bulk call. The first key of a batch starts the window; the batch is sent
+    when the window closes or `max_batch` distinct keys are waiting, whichever
+    comes first. Identical keys within a batch share one slot. Batches are
+    sent one at a time by a single long-lived flusher thread; keys arriving
+    during a bulk call go out in the next one.
+
+    :param name: Name for stats.
+    :param fetch_many: Callable taking a list of keys and returning {key: value};
+        runs on a background thread, never the caller's. Keys missing from the
+        result fail with LookupError; an exception fails the whole batch.
+    :param window: Seconds to wait for more keys after the first one.
+    :param max_batch: Max distinct keys per bulk call.
+    """
+
+    def __init__(self, name: str, fetch_many, window: float = 0.01, max_batch: int = 50):
+        self.name = name
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self.submitted = 0
+        self.batches = 0
+        self.keys_fetched = 0
+        self._pending = {}  # key -> Future, in arrival order
+        self._opened_at = 0.0  # monotonic time the oldest pending key arrived
+        self._flusher = None
+        self._lock = threading.Condition()
+        BATCHERS[name] = self
+
+    def submit(self, key) -> Future:
+        """Queue `key` for the next bulk call; the returned Future resolves to its value."""
+        with self._lock:
+            self.submitted += 1
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            if not self._pending:
+                self._opened_at = time.monotonic()
+            future = self._pending[key] = Future()
+            if self._flusher is None:
+                # Off the caller's thread, which may be running an event loop
+                self._flusher = threading.Thread(target=self._flush_forever, name=f"batcher-{self.name}",
+                                                 daemon=True)
+                self._flusher.start()
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._lock.notify()
+        return future
+
+    def get(self, key, timeout: float = None):
+        """Blocking `submit(key).result()`."""
+        return self.submit(key).result(timeout)
+
+    async def aget(self, key):
+        """Async `get`: waits for the batch without blocking the event loop."""
+        # Shielded: one caller's cancellation must not fail the key for the others sharing it
+        return await asyncio.shield(asyncio.wrap_future(self.submit(key)))
+
+    def _flush_forever(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._lock.wait()
+                while len(self._pending) < self.max_batch:
+                    remaining = self._opened_at + self.window - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                batch = self._take()
+            try:
+                self._run(batch)
+            except Exception:
+                logger.exception("Bulk call of batcher %s failed", self.name)
+
+    def _take(self) -> dict:
+        """Under the lock: up to max_batch pending keys, oldest first."""
+        keys = list(self._pending)[:self.max_batch]
+        return {key: self._pending.pop(key) for key in keys}
+
+    def _run(self, batch: dict):
+        with self._lock:
+            self.batches += 1
+            self.keys_fetched += len(batch)
+        try:
+            results = self.fetch_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                _resolve(future, error=e)
+            return
+        for key, future in batch.items():
+            if key in results:
+                _resolve(future, results[key])
+            else:
+                _resolve(future, error=LookupError(f"No result for {key!r} in the bulk response"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "batches": self.batches,
+                "keys_fetched": self.keys_fetched,
+                "keys_per_batch": self.keys_fetched / self.batches if self.batches else 0.0,
+                "pending": len(self._pending),
+            }
+
+
+def _resolve(future: Future, value=None, error=None):
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+    except InvalidStateError:
+        pass  # cancelled by a blocking caller that gave up
+
+
+def coalesced(tool: BaseTool) -> BaseTool:
+    """
+    Opt a read-only tool into single-flight deduplication: concurrent calls
+    with the same normalized arguments (across rooms, threads and event loops)
+    run once and share the result or exception. Apply below @cached, so cache
+    hits never wait and only misses are coalesced:
+
+        get_user_details = cached(ttl=60)(coalesced(StructuredTool.from_function(...)))
+    """
+    flight = SingleFlight(tool.name)
+    SINGLE_FLIGHTS[tool.name] = flight
+
+    func = getattr(tool, "func", None)
+    if func is not None:
+        @functools.wraps(func)
+        def coalesced_func(*args, **kwargs):
+            return flight.do(normalize_args(args, kwargs), lambda: func(*args, **kwargs))
+        tool.func = coalesced_func
+
+    coroutine = getattr(tool, "coroutine", None)
+    if coroutine is not None:
+        @functools.wraps(coroutine)
+        async def coalesced_coroutine(*args, **kwargs):
+            return await flight.ado(normalize_args(args, kwargs), lambda: coroutine(*args, **kwargs))
+        tool.coroutine = coalesced_coroutine
+
+    if func is None and coroutine is None:
+        raise TypeError(f"Tool {tool.name} has no func/coroutine to coalesce")
+    return tool
+
+
+def coalesce_stats() -> dict:
+    """Single-flight and batching counters, keyed by tool / batcher name."""
+    return {
+        "single_flight": {name: flight.stats() for name, flight in list(SINGLE_FLIGHTS.items())},
+        "batches": {name: batcher.stats() for name, batcher in list(BATCHERS.items())},
+    }
+
+
+METRICS.register_stats("single_flight", "Single-flight calls, calls sharing an in-flight one and share rate, per tool.",
+                       lambda: coalesce_stats()["single_flight"], label="tool")
+METRICS.register_stats("micro_batch", "Micro-batched keys submitted, bulk calls and keys per call, per batcher.",
+                       lambda: coalesce_stats()["batches"], label="batcher")
+
+
+__all__ = ['coalesced', 'coalesce_stats', 'MicroBatcher', 'SingleFlight', 'BATCHERS', 'SINGLE_FLIGHTS']
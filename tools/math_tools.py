@@ -1,3 +1,9 @@
+import ast
+import math
+import operator
+import re
+from typing import List, Union
+
 from langchain_core.tools import tool
 
 @tool
@@ -12,3 +18,124 @@ def custom_divide(a: int, b: int) -> float:
         raise ValueError("Cannot divide by zero.")
     return a / b
 
+
+# ------------------------- Local expression evaluation -------------------------
+MAX_EXPRESSION_LENGTH = 1000
+# Integer results are bounded in size, so inputs like 9**9**9 or (9**9999)**9999 fail
+# fast instead of tying up the worker; ~4200 digits also stays printable by str()
+MAX_RESULT_BITS = 14000
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {
+    "abs": abs, "round": round, "min": min, "max": max,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log10": math.log10, "log2": math.log2,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "floor": math.floor, "ceil": math.ceil,
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+_SEPARATORS = re.compile(r"[;\n]+")
+
+
+def _check_size(op, left, right):
+    """Reject a ** or * whose integer result would exceed MAX_RESULT_BITS, before computing it."""
+    # Float results overflow (OverflowError) or lose precision instead of growing
+    if not (isinstance(left, int) and isinstance(right, int)):
+        return
+    if isinstance(op, ast.Pow):
+        # A negative exponent gives a float, which cannot grow like this
+        bits = right * math.log2(abs(left)) if right > 0 and abs(left) > 1 else 0
+    elif isinstance(op, ast.Mult):
+        bits = abs(left).bit_length() + abs(right).bit_length()
+    else:
+        return
+    if bits > MAX_RESULT_BITS:
+        raise ValueError("Result is too large.")
+
+
+def _eval_node(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _eval_node(node.left), _eval_node(node.right)
+        _check_size(node.op, left, right)
+        return _BINARY_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS \
+            and not node.keywords:
+        return _FUNCTIONS[node.func.id](*[_eval_node(arg) for arg in node.args])
+    raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+
+def evaluate_expression(expression: str):
+    """
+    Safely evaluate one arithmetic expression without an LLM or eval().
+    Only numbers, + - * / // % ** (or ^), parentheses, pi/e/tau and a small
+    set of math functions are allowed.
+    """
+    expression = expression.strip()
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError("Expression is too long.")
+    tree = ast.parse(expression.replace("^", "**"), mode="eval")
+    return _eval_node(tree.body)
+
+
+def _format(value) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return str(value)
+
+
+@tool
+def calculator(expression: str) -> str:
+    """Evaluates arithmetic expressions locally, e.g. "3 * 4" or "sqrt(2) + 2^10".
+    Several expressions separated by ';' or newlines are evaluated in one call.
+    Supports + - * / // % ^, parentheses, pi, e and sqrt/log/exp/sin/cos/tan/abs/round/min/max/floor/ceil."""
+    expressions = [e for e in _SEPARATORS.split(expression) if e.strip()]
+    results = []
+    for expr in expressions:
+        try:
+            value = _format(evaluate_expression(expr))
+        except (ValueError, SyntaxError, TypeError, ArithmeticError) as e:
+            value = f"Error: {e}"
+        results.append(value if len(expressions) == 1 else f"{expr.strip()} = {value}")
+    return "\n".join(results)
+
+
+def _all_ints(numbers) -> bool:
+    return all(isinstance(n, int) for n in numbers)
+
+
+@tool
+def multiply_numbers(numbers: List[Union[int, float]]) -> Union[int, float]:
+    """Multiplies a list of numbers and returns the product."""
+    if _all_ints(numbers):
+        # Exact, like the calculator, with the same bound on the result size
+        if sum(abs(n).bit_length() for n in numbers) > MAX_RESULT_BITS:
+            raise ValueError("Result is too large.")
+        return math.prod(numbers)
+    import numpy as np
+
+    return float(np.prod(np.asarray(numbers, dtype=np.float64)))
+
+
+@tool
+def sum_numbers(numbers: List[Union[int, float]]) -> Union[int, float]:
+    """Adds up a list of numbers and returns the sum."""
+    if _all_ints(numbers):
+        return sum(numbers)  # exact: float64 loses integers above 2**53
+    import numpy as np
+
+    return float(np.sum(np.asarray(numbers, dtype=np.float64)))
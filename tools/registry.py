@@ -0,0 +1,149 @@
+"""
+Process-wide tool registry.
+
+Tools are registered by name with the "module:attribute" that defines them:
+the built-in ones below, plus any installed package that declares
+`llm_agent.tools` entry points:
+
+    [project.entry-points."llm_agent.tools"]
+    weather = "weather_tool.tools:weather"
+
+A tool's module is imported the first time an agent selects the tool, so
+tools no room uses are never imported. The function-calling schema of each
+tool is derived once per process and reused whenever an agent binds its
+tools; deriving it from the pydantic args schema is what made binding a
+large catalog slow.
+"""
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "llm_agent.tools"
+
+
+class ToolSpec(NamedTuple):
+    name: str
+    target: str  # "module:attribute"
+    default: bool = True  # selected for agents that don't ask for specific tools
+
+
+BUILTIN_TOOLS = (
+    ToolSpec("get_user_details", "tools.user_tools:get_user_details"),
+    ToolSpec("calculator", "tools.math_tools:calculator"),
+    ToolSpec("multiply_numbers", "tools.math_tools:multiply_numbers"),
+    ToolSpec("sum_numbers", "tools.math_tools:sum_numbers"),
+    # Covered by the calculator; only for rooms that ask for them
+    ToolSpec("custom_add", "tools.math_tools:custom_add", default=False),
+    ToolSpec("custom_divide", "tools.math_tools:custom_divide", default=False),
+)
+
+
+class ToolRegistry:
+    """
+    Tool specs by name, with the loaded tools and their schemas cached.
+
+    :param specs: Tools registered up front.
+    :param entry_point_group: Entry point group scanned (once, on first use)
+        for more tools; None to skip discovery.
+    """
+
+    def __init__(self, specs: Sequence[ToolSpec] = BUILTIN_TOOLS,
+                 entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        self._specs: Dict[str, ToolSpec] = {spec.name: spec for spec in specs}
+        self._entry_point_group = entry_point_group
+        self._discovered = entry_point_group is None
+        self._tools = {}  # name -> BaseTool
+        self._schemas = {}  # name -> OpenAI-format function schema
+        self._load_seconds = {}  # name -> time spent importing / resolving
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: str, default: bool = True):
+        """Add a tool (or replace one that has not been loaded yet)."""
+        with self._lock:
+            if name in self._tools:
+                raise ValueError(f"Tool {name} is already loaded")
+            self._specs[name] = ToolSpec(name, target, default)
+
+    def _discover(self):
+        if self._discovered:
+            return
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=self._entry_point_group):
+            if entry_point.name in self._specs:
+                logger.warning("Ignoring entry point %s: a tool with that name is already registered",
+                               entry_point.value)
+                continue
+            self._specs[entry_point.name] = ToolSpec(entry_point.name, entry_point.value)
+        self._discovered = True
+
+    def names(self) -> List[str]:
+        """Every registered tool, loaded or not."""
+        with self._lock:
+            self._discover()
+            return list(self._specs)
+
+    def default_names(self) -> List[str]:
+        with self._lock:
+            self._discover()
+            return [spec.name for spec in self._specs.values() if spec.default]
+
+    def get(self, name: str):
+        """The tool called `name`, importing its module on first use."""
+        with self._lock:
+            tool = self._tools.get(name)
+            if tool is not None:
+                return tool
+            self._discover()
+            spec = self._specs.get(name)
+            if spec is None:
+                raise KeyError(f"Unknown tool: {name}. Registered tools: {', '.join(self._specs)}")
+            start = time.perf_counter()
+            module, _, attribute = spec.target.partition(":")
+            tool = getattr(importlib.import_module(module), attribute or name)
+            if tool.name != name:
+                raise ValueError(f"{spec.target} is tool {tool.name!r}, registered as {name!r}")
+            self._load_seconds[name] = time.perf_counter() - start
+            self._tools[name] = tool
+            return tool
+
+    def load(self, names: Optional[Sequence[str]] = None) -> list:
+        """The tools called `names`, in order; the default tools when None."""
+        return [self.get(name) for name in (self.default_names() if names is None else names)]
+
+    def schema(self, tool) -> dict:
+        """
+        OpenAI-format function schema of a tool, which bind_tools accepts as
+        is. Derived once per process for registered tools.
+        """
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        with self._lock:
+            if self._tools.get(tool.name) is not tool:
+                return convert_to_openai_tool(tool)  # not ours (e.g. passed to ChatAgent directly)
+            schema = self._schemas.get(tool.name)
+            if schema is None:
+                schema = self._schemas[tool.name] = convert_to_openai_tool(tool)
+            return schema
+
+    def schemas(self, tools) -> List[dict]:
+        return [self.schema(tool) for tool in tools]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "registered": len(self._specs),
+                "loaded": sorted(self._tools),
+                "schemas_cached": len(self._schemas),
+                "load_ms": {name: round(seconds * 1e3, 3) for name, seconds in self._load_seconds.items()},
+            }
+
+
+registry = ToolRegistry()
+
+
+__all__ = ['BUILTIN_TOOLS', 'ENTRY_POINT_GROUP', 'ToolRegistry', 'ToolSpec', 'registry']
@@ -1,6 +1,79 @@
-from langchain_core.tools import tool
+import json
+import os
 
-@tool
-def get_user_details(id: str) -> str:
+from langchain_core.tools import StructuredTool, ToolException
+
+from AsyncHttpClient import AsyncHttpClient
+from HttpClient import HttpClient
+from config import TOOL_CACHE_TTL, TOOL_CACHE_SIZE, TOOL_CACHE_PATH
+from config import TOOL_BATCH_MAX_SIZE, TOOL_BATCH_WINDOW, USER_DETAILS_BULK_PATH
+from tools.cache import cached
+from tools.coalesce import MicroBatcher, coalesced
+
+http_client = HttpClient()
+async_http_client = AsyncHttpClient()
+
+
+def _user_url(id: str):
+    host = os.getenv("TM_HOST")
+    return f"{host}/users/{id}" if host else None
+
+
+def _fetch_users_bulk(ids):
+    """
+    One bulk backend request for every user id in a batch.
+    :return: {id: details}; the backend may answer with that mapping or with a
+        list of user objects carrying their "tmId" (or "id").
+    """
+    body = http_client.post(f"{os.getenv('TM_HOST')}{USER_DETAILS_BULK_PATH}", data={"ids": ids})
+    if isinstance(body, dict):
+        return body
+    return {str(user.get("tmId", user.get("id"))): user for user in body}
+
+
+# Lookups from every room within TOOL_BATCH_WINDOW go out as one bulk request,
+# so backend QPS follows the number of distinct users rather than messages.
+user_batcher = MicroBatcher(
+    "get_user_details", _fetch_users_bulk, window=TOOL_BATCH_WINDOW, max_batch=TOOL_BATCH_MAX_SIZE,
+) if USER_DETAILS_BULK_PATH else None
+
+
+def _fetch_user_details(id: str) -> str:
     """Fetches details of a user given their ID."""
-    return f"User details for ID: {id} (mocked)"
+    url = _user_url(id)
+    if url is None:
+        return f"User details for ID: {id} (mocked)"
+    try:
+        if user_batcher is not None:
+            return json.dumps(user_batcher.get(id.strip()))
+        return json.dumps(http_client.get(url))
+    except Exception as e:
+        # Raised rather than returned so the failure is never cached
+        raise ToolException(f"Error fetching user details: {e}")
+
+
+async def _afetch_user_details(id: str) -> str:
+    """Fetches details of a user given their ID."""
+    url = _user_url(id)
+    if url is None:
+        return f"User details for ID: {id} (mocked)"
+    try:
+        if user_batcher is not None:
+            return json.dumps(await user_batcher.aget(id.strip()))
+        return json.dumps(await async_http_client.get(url))
+    except Exception as e:
+        raise ToolException(f"Error fetching user details: {e}")
+
+
+# Sync and async (ainvoke) implementations, so agents running on an event loop
+# fan out backend lookups without tying up a thread per call. User details are
+# read-only, so repeated lookups within the TTL are served from the cache, and
+# concurrent cache misses for the same user share a single backend call.
+get_user_details = cached(ttl=TOOL_CACHE_TTL, maxsize=TOOL_CACHE_SIZE, path=TOOL_CACHE_PATH)(
+    coalesced(StructuredTool.from_function(
+        func=_fetch_user_details,
+        coroutine=_afetch_user_details,
+        name="get_user_details",
+        handle_tool_error=True,
+    ))
+)
@@ -0,0 +1,168 @@
+"""
+Payload compression for Socket.IO events.
+
+Browsers negotiate permessage-deflate with simple-websocket on their own,
+but a proxy can strip the extension and other WebSocket servers may not
+offer it. For clients without it, WireEncoder compresses large payloads
+itself: a payload whose JSON is at least `min_bytes` long is sent as
+binary, one codec byte followed by the compressed UTF-8 JSON. Smaller
+payloads go out unchanged.
+
+    byte 0     1 = gzip, 2 = zstd
+    bytes 1..  compressed JSON
+
+Clients list the codecs they can decode when they join ("accept"). Clients
+whose socket already has permessage-deflate get plain payloads: compressing
+twice saves nothing and breaks the deflate context shared across messages
+(see benchmarks/wire_bench.py). Events for a whole room are compressed only
+if some client in it lacks deflate, with a codec every client accepted. A
+client's entry lasts until it leaves the room or disconnects, so the room's
+codec follows the clients currently in it. With a Socket.IO message queue,
+a room's clients may be connected to other worker processes, which this
+process never sees join; room events then go out uncompressed, the one
+format every client decodes.
+static/app.js decodes these frames. With SOCKETIO_SERIALIZER=msgpack the
+Socket.IO packets themselves are msgpack, and compressed payloads travel in
+them as raw bytes.
+"""
+import gzip
+import json
+import logging
+import threading
+
+from config import SOCKETIO_MESSAGE_QUEUE, WIRE_COMPRESSION, WIRE_COMPRESS_MIN_BYTES
+
+# Optional: zstd falls back to gzip when zstandard is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODECS = {"gzip": 1, "zstd": 2}  # frame header byte
+
+
+class WireEncoder:
+    """
+    Compresses Socket.IO payloads above a size threshold.
+
+    :param compression: Preferred codec: "gzip", "zstd" or "none".
+    :param min_bytes: Smallest JSON size (in bytes) worth compressing.
+    :param shared_rooms: Whether rooms span worker processes (a message queue
+        is configured); room events are then never compressed.
+    """
+
+    def __init__(self, compression: str = WIRE_COMPRESSION, min_bytes: int = WIRE_COMPRESS_MIN_BYTES,
+                 shared_rooms: bool = bool(SOCKETIO_MESSAGE_QUEUE)):
+        if compression not in ("none", *CODECS):
+            raise ValueError(f"Unsupported wire compression: {compression}. Expected none, gzip or zstd")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; compressing Socket.IO payloads with gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.min_bytes = min_bytes
+        self.shared_rooms = shared_rooms
+        self._rooms = {}  # room -> {sid: (accepted codecs, deflate)} of the clients in it
+        self._session_rooms = {}  # sid -> rooms it joined, to clear on disconnect
+        self._lock = threading.Lock()
+        self._payloads = 0
+        self._compressed = 0
+        self._json_bytes = 0
+        self._sent_bytes = 0
+
+    def codec(self, accepted) -> str:
+        """The codec to use for a client (or room) that decodes `accepted`; "none" if no match."""
+        if self.compression == "none":
+            return "none"
+        for codec in (self.compression, "gzip"):
+            if codec in accepted:
+                return codec
+        return "none"
+
+    def negotiate(self, room: str, sid: str, accepted, deflate: bool = False) -> str:
+        """
+        Record a client joining `room`; joining again replaces its entry.
+        :param sid: The client's Socket.IO session id.
+        :param accepted: Codecs the client can decode.
+        :param deflate: Whether its WebSocket negotiated permessage-deflate.
+        :return: the codec for events sent to this client alone
+        """
+        accepted = frozenset(accepted or ()).intersection(CODECS)
+        with self._lock:
+            self._rooms.setdefault(room, {})[sid] = (accepted, deflate)
+            self._session_rooms.setdefault(sid, set()).add(room)
+        return "none" if deflate else self.codec(accepted)
+
+    def leave(self, sid: str, room: str = None):
+        """Forget a client in `room`, or in every room it joined (on disconnect)."""
+        with self._lock:
+            rooms = self._session_rooms.get(sid, set())
+            for left in ([room] if room is not None else list(rooms)):
+                rooms.discard(left)
+                clients = self._rooms.get(left)
+                if clients is not None:
+                    clients.pop(sid, None)
+                    if not clients:
+                        del self._rooms[left]
+            if not rooms:
+                self._session_rooms.pop(sid, None)
+
+    def room_codec(self, room: str) -> str:
+        """
+        The codec for events sent to every client in `room`; "none" if all have
+        deflate, or if some may be connected to another process.
+        """
+        if self.shared_rooms:
+            return "none"
+        with self._lock:
+            clients = list(self._rooms.get(room, {}).values())
+        if all(deflate for _, deflate in clients):
+            return "none"
+        return self.codec(frozenset.intersection(*(accepted for accepted, _ in clients)))
+
+    def encode(self, payload, codec: str):
+        """`payload` as is, or as a compressed binary frame when that is worth it."""
+        if codec == "none":
+            return payload
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        frame = None
+        if len(data) >= self.min_bytes:
+            body = zstandard.compress(data, 3) if codec == "zstd" else gzip.compress(data, compresslevel=6)
+            if len(body) + 1 < len(data):
+                frame = bytes([CODECS[codec]]) + body
+        with self._lock:
+            self._payloads += 1
+            self._json_bytes += len(data)
+            if frame is not None:
+                self._compressed += 1
+            self._sent_bytes += len(frame) if frame is not None else len(data)
+        return frame if frame is not None else payload
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "compression": self.compression,
+                "payloads": self._payloads,
+                "compressed": self._compressed,
+                "json_bytes": self._json_bytes,
+                "sent_bytes": self._sent_bytes,
+                "ratio": self._sent_bytes / self._json_bytes if self._json_bytes else 1.0,
+            }
+
+
+def decode(frame):
+    """Inverse of WireEncoder.encode, for tests and benchmarks (the browser has its own)."""
+    if not isinstance(frame, (bytes, bytearray)):
+        return frame
+    codec, body = frame[0], bytes(frame[1:])
+    if codec == CODECS["gzip"]:
+        data = gzip.decompress(body)
+    elif codec == CODECS["zstd"]:
+        data = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raise ValueError(f"Unknown wire codec byte: {codec}")
+    return json.loads(data)
+
+
+__all__ = ['CODECS', 'WireEncoder', 'decode']
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_thread_state = threading.local()
+
+
+_loop_cleanups = []  # async callables run on every thread loop before it is closed
+
+
+def on_thread_loop_close(cleanup):
+    """
+    Register `await cleanup()` to run on each thread loop of run_on_thread_loop
+    before it is closed, e.g. to close connection pools bound to that loop.
+    """
+    _loop_cleanups.append(cleanup)
+
+
+async def _shutdown_loop():
+    # Leftovers of earlier turns: finalizers of abandoned async generators,
+    # callbacks still in flight. Cancel them the way asyncio.run does.
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for cleanup in _loop_cleanups:
+        try:
+            await cleanup()
+        except Exception:
+            logger.warning("Thread loop cleanup %r failed", cleanup, exc_info=True)
+    await asyncio.get_running_loop().shutdown_asyncgens()
+
+
+def _close_loop(loop):
+    if loop.is_running() or loop.is_closed():
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop.run_until_complete(_shutdown_loop())
+    else:
+        # Collected while another loop runs on this thread; it can only be closed
+        logger.debug("Closing a thread loop without its cleanups: another loop is running")
+    loop.close()
+
+
+def run_on_thread_loop(coro):
+    """
+    Run a coroutine to completion on the calling thread's event loop, created
+    on first use and kept for the life of the thread. asyncio.run would build
+    and close a loop per call, and loop-bound resources (AsyncHttpClient's
+    connection pools) could then never be reused across turns. When the
+    thread goes away (or at exit) leftover tasks are cancelled, the
+    on_thread_loop_close cleanups and async generator finalizers run, and the
+    loop is closed.
+
+    Not for code already running on an event loop: raises RuntimeError there
+    (await the coroutine instead) rather than failing inside run_until_complete.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_on_thread_loop() cannot be called from a running event loop; "
+                           "await the coroutine instead")
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_state.loop = asyncio.new_event_loop()
+        # Shut down when the thread object goes away or at exit, not left to
+        # the loop's __del__ during interpreter teardown
+        weakref.finalize(threading.current_thread(), _close_loop, loop)
+    return loop.run_until_complete(coro)
+
+
+class RoomWorkerPool:
+    """
+    Bounded thread pool that runs jobs in per-room FIFO order.
+
+    At most one job per room runs at a time, so two messages from the same
+    room are always handled in the order they arrived, while different rooms
+    run concurrently on up to `max_workers` threads. `submit` refuses new work
+    (returns False) once `max_pending` jobs are waiting overall, or
+    `max_pending_per_room` for a single room, instead of queueing forever.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 64,
+                 max_pending_per_room: int = 4):
+        self.max_pending = max_pending
+        self.max_pending_per_room = max_pending_per_room
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="agent-turn")
+        self._queues = {}  # room -> deque of jobs waiting behind the running one
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, room, fn, *args, **kwargs) -> bool:
+        """
+        Queue `fn(*args, **kwargs)` to run after any earlier jobs for `room`.
+        :param room: The key jobs are ordered by.
+        :param fn: The callable to run on a worker thread.
+        :return: True if the job was accepted, False if the pool is full.
+        """
+        job = (fn, args, kwargs)
+        with self._lock:
+            queue = self._queues.get(room)
+            if self._pending >= self.max_pending:
+                return False
+            if queue is not None and len(queue) + 1 >= self.max_pending_per_room:
+                return False
+            self._pending += 1
+            if queue is not None:
+                # A worker is already draining this room; it will pick the job up.
+                queue.append(job)
+                return True
+            self._queues[room] = deque()
+        self._executor.submit(self._drain, room, job)
+        return True
+
+    def _drain(self, room, job):
+        while job is not None:
+            fn, args, kwargs = job
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logger.exception("Job for room %s failed", room)
+            with self._lock:
+                self._pending -= 1
+                queue = self._queues[room]
+                if queue:
+                    job = queue.popleft()
+                else:
+                    del self._queues[room]
+                    job = None
+
+    @property
+    def pending(self) -> int:
+        """Number of accepted jobs that have not finished yet."""
+        with self._lock:
+            return self._pending
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+__all__ = ['RoomWorkerPool', 'on_thread_loop_close', 'run_on_thread_loop']